@@ -1,3 +1,5 @@
+from sqlalchemy import Integer, bindparam, case, cast, delete, func, insert, literal, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 from app import models
 from sqlalchemy.orm import Session
@@ -5,22 +7,61 @@ from . import models, schemas
 from sqlalchemy.orm import Session
 from datetime import datetime
 from app import models
+from app.utils.calibration import (
+    CALIBRATION_CHUNK, DIFFICULTY_PRIOR, expected, prior_difficulty, step_size,
+)
+from app.utils.fingerprints import answer_fingerprint
+from app.utils.leaderboard_index import leaderboard_index
+from app.utils.log_buffer import quiz_log_buffer
+from app.utils.score_distribution import SCORE_BIN_WIDTH, score_bin, summarize
+from app.utils.timing_detector import timing_detector
+from app.utils.windowed_boards import windowed_boards
+
+BULK_LOOKUP_CHUNK = 400
+STATS_REBUILD_CHUNK = 1000
+# Rolling accuracy: exponentially weighted, alpha = 0.2 (~ the last 10 answers)
+ACCURACY_ALPHA = 0.2
+ACCURACY_DECAY = 1 - ACCURACY_ALPHA
 
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
 def create_user(db: Session, name: str, email: str, password: str):
+    """`password` is stored as given: pass a hash from app.utils.credentials (or "" for Google accounts)."""
     user = models.User(name=name, email=email, password=password)
     db.add(user)
     db.commit()
     db.refresh(user)
+    leaderboard_index.update_user(user)
     return user
 
-def get_questions(db: Session, subject: str, difficulty: str, limit: int = 5):
-    return db.query(models.Question).filter(
-        models.Question.subject == subject,
-        models.Question.difficulty == difficulty
-    ).limit(limit).all()
+def set_password_hash(db: Session, user_id: int, password_hash: str):
+    db.query(models.User).filter(models.User.id == user_id).update(
+        {models.User.password: password_hash}, synchronize_session=False
+    )
+    db.commit()
+
+def get_questions(db: Session, subject: str, difficulty: str = None, limit: int = 5, user_id: int = None):
+    """
+    Questions for a subject (optionally one difficulty label). With a user_id,
+    the ones whose calibrated difficulty is closest to the learner's ability come first.
+    """
+    query = db.query(models.Question).filter(models.Question.subject == subject)
+    if difficulty:
+        query = query.filter(models.Question.difficulty == difficulty)
+    if user_id is not None:
+        ability = db.query(models.UserAbility.ability).filter(
+            models.UserAbility.user_id == user_id, models.UserAbility.subject == subject
+        ).scalar() or 0.0
+        prior = case(
+            *((models.Question.difficulty == label, value) for label, value in DIFFICULTY_PRIOR.items()),
+            else_=0.0,
+        )
+        calibrated = func.coalesce(models.QuestionStats.difficulty, prior)
+        query = query.outerjoin(
+            models.QuestionStats, models.QuestionStats.question_id == models.Question.id
+        ).order_by(func.abs(calibrated - ability), models.Question.id)
+    return query.limit(limit).all()
 def get_quiz_attempt(db: Session, user_id: int, quiz_id: int):
     return db.query(models.QuizAttempt).filter_by(user_id=user_id, quiz_id=quiz_id).first()
 
@@ -34,6 +75,9 @@ def create_quiz_attempt(db: Session, attempt: schemas.QuizAttemptSchema):
         synced=True
     )
     db.add(db_attempt)
+    update_score_rollups(db, [
+        {"user_id": attempt.user_id, "quiz_id": attempt.quiz_id, "score": attempt.score, "end_time": attempt.end_time}
+    ])
     db.commit()
     db.refresh(db_attempt)
     return db_attempt
@@ -50,6 +94,95 @@ def create_question_attempt(db: Session, quiz_id: int, question: schemas.Questio
     db.commit()
     db.refresh(db_question)
     return db_question
+def bulk_create_quiz_attempts(db: Session, attempts: list):
+    """
+    Insert a batch of quiz attempts and their question attempts in one transaction.
+    Returns [{"quiz_id", "status"}] in input order; (user_id, quiz_id) pairs that
+    already exist, or repeat earlier in the batch, are "already_submitted".
+    """
+    pairs = list({(a.user_id, a.quiz_id) for a in attempts})
+    existing = set()
+    # chunked to stay under the driver's bound-parameter limit
+    for i in range(0, len(pairs), BULK_LOOKUP_CHUNK):
+        existing.update(db.query(models.QuizAttempt.user_id, models.QuizAttempt.quiz_id).filter(
+            tuple_(models.QuizAttempt.user_id, models.QuizAttempt.quiz_id).in_(pairs[i:i + BULK_LOOKUP_CHUNK])
+        ).all())
+
+    results = []
+    new_attempts = []
+    for attempt in attempts:
+        pair = (attempt.user_id, attempt.quiz_id)
+        if pair in existing:
+            results.append({"quiz_id": attempt.quiz_id, "status": "already_submitted"})
+            continue
+        existing.add(pair)
+        new_attempts.append(attempt)
+        results.append({"quiz_id": attempt.quiz_id, "status": "submitted"})
+
+    if new_attempts:
+        attempt_ids = db.scalars(
+            insert(models.QuizAttempt).returning(models.QuizAttempt.id, sort_by_parameter_order=True),
+            [
+                {
+                    "user_id": a.user_id,
+                    "quiz_id": a.quiz_id,
+                    "start_time": a.start_time,
+                    "end_time": a.end_time,
+                    "score": a.score,
+                    "synced": True,
+                    "answer_fingerprint": answer_fingerprint((q.question_id, q.selected_option) for q in a.questions),
+                }
+                for a in new_attempts
+            ],
+        ).all()
+        question_rows = [
+            {
+                "quiz_id": attempt_id,
+                "question_id": q.question_id,
+                "selected_option": q.selected_option,
+                "time_taken": q.time_taken,
+                "correct": q.correct,
+            }
+            for attempt_id, a in zip(attempt_ids, new_attempts)
+            for q in a.questions
+        ]
+        if question_rows:
+            db.execute(insert(models.QuestionAttempt), question_rows)
+        update_score_rollups(db, [
+            {"user_id": a.user_id, "quiz_id": a.quiz_id, "score": a.score, "end_time": a.end_time}
+            for a in new_attempts
+        ])
+    db.commit()
+    timing_detector.observe_many((q.question_id, q.time_taken) for a in new_attempts for q in a.questions)
+    return results
+
+def backfill_answer_fingerprints(db):
+    """Fingerprint attempts stored before fingerprints existed (streamed, chunked updates)."""
+    attempts = models.QuizAttempt.__table__
+    questions = models.QuestionAttempt.__table__
+    source = select(questions.c.quiz_id, questions.c.question_id, questions.c.selected_option).where(
+        questions.c.quiz_id.in_(select(attempts.c.id).where(attempts.c.answer_fingerprint.is_(None)))
+    ).order_by(questions.c.quiz_id).execution_options(yield_per=STATS_REBUILD_CHUNK)
+    write = update(attempts).where(attempts.c.id == bindparam("b_id")).values(
+        answer_fingerprint=bindparam("b_fingerprint")
+    )
+
+    pending = []
+    current, selections = None, []
+    for attempt_id, question_id, option in db.execute(source):
+        if attempt_id != current:
+            if current is not None:
+                pending.append({"b_id": current, "b_fingerprint": answer_fingerprint(selections)})
+            current, selections = attempt_id, []
+        selections.append((question_id, option))
+        if len(pending) >= STATS_REBUILD_CHUNK:
+            db.execute(write, pending)
+            pending = []
+    if current is not None:
+        pending.append({"b_id": current, "b_fingerprint": answer_fingerprint(selections)})
+    if pending:
+        db.execute(write, pending)
+
 def create_quiz_session(db: Session, user_id: int, subject: str = None, difficulty: str = None):
     # deactivate existing sessions for safety
     db.query(models.QuizSession).filter(models.QuizSession.user_id == user_id, models.QuizSession.is_active == True).update({"is_active": False})
@@ -71,20 +204,397 @@ def close_session(db: Session, session_id: int):
 
 def log_quiz_answers(db: Session, user_id: int, subject: str, difficulty: str, answers: list, synced: bool = True):
     # answers is list of dicts: {question_id, chosen_answer, correct, response_time}
-    logs = []
-    for a in answers:
-        log = models.QuizLog(
-            user_id=user_id,
-            question_id=a.get("question_id"),
-            chosen_answer=a.get("chosen_answer"),
-            correct=1 if a.get("correct") else 0,
-            response_time=a.get("response_time", 0),
-            subject=subject,
-            difficulty=difficulty,
-            synced=synced
-        )
-        db.add(log)
-        logs.append(log)
-    db.commit()
-    # refresh logs if needed
-    return logs
\ No newline at end of file
+    now = datetime.utcnow()
+    rows = [
+        {
+            "user_id": user_id,
+            "question_id": a.get("question_id"),
+            "chosen_answer": a.get("chosen_answer"),
+            "correct": 1 if a.get("correct") else 0,
+            "response_time": a.get("response_time", 0),
+            "subject": subject,
+            "difficulty": difficulty,
+            "synced": synced,
+            "timestamp": now,
+        }
+        for a in answers
+    ]
+    if quiz_log_buffer.active:
+        quiz_log_buffer.submit(rows)
+    else:
+        write_quiz_logs(db, rows)
+        db.commit()
+    windowed_boards.record(user_id, subject, sum(row["correct"] for row in rows), len(rows))
+    return rows
+
+def write_quiz_logs(db, rows: list):
+    """Bulk-insert quiz_logs rows and fold them into user_subject_stats. The caller commits."""
+    if not rows:
+        return
+    db.execute(insert(models.QuizLog), rows)
+    update_user_subject_stats(db, rows)
+
+def upsert_insert(db, table):
+    """Dialect-specific INSERT that supports on_conflict_do_update."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(table)
+    if dialect == "sqlite":
+        return sqlite.insert(table)
+    raise NotImplementedError(f"Upserts are not supported on {dialect}")
+
+def fold_accuracy(state, correct) -> list:
+    """One step of the exponentially weighted accuracy: state is [weighted_sum, weight]."""
+    state[0] = state[0] * ACCURACY_DECAY + ACCURACY_ALPHA * (1 if correct else 0)
+    state[1] = state[1] * ACCURACY_DECAY + ACCURACY_ALPHA
+    return state
+
+def update_user_subject_stats(db, log_rows: list, when: datetime = None):
+    """
+    Fold new quiz_logs rows ({user_id, subject, correct, response_time, difficulty})
+    into user_subject_stats, in order. Runs in the caller's transaction; the caller commits.
+    """
+    totals = {}
+    for row in log_rows:
+        key = (row["user_id"], row["subject"])
+        t = totals.setdefault(key, [0, 0, 0.0, [0.0, 0.0], None])
+        t[0] += 1
+        t[1] += 1 if row["correct"] else 0
+        t[2] += row.get("response_time") or 0
+        fold_accuracy(t[3], row["correct"])
+        t[4] = row.get("difficulty") or t[4]
+    if not totals:
+        return
+    when = when or datetime.utcnow()
+    stats = models.UserSubjectStats
+    stmt = upsert_insert(db, stats).values([
+        {
+            "user_id": user_id,
+            "subject": subject,
+            "total_questions": answered,
+            "correct_answers": correct,
+            "total_response_time": response_time,
+            "last_activity": when,
+            "accuracy_ewma": ewma,
+            "accuracy_weight": weight,
+            "last_difficulty": difficulty,
+        }
+        for (user_id, subject), (answered, correct, response_time, (ewma, weight), difficulty) in totals.items()
+    ])
+    # A batch of n answers decays the stored state by (1 - alpha)^n, which is
+    # exactly 1 - (the batch's own weight), so the fold stays a single upsert.
+    batch_decay = 1 - stmt.excluded.accuracy_weight
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[stats.user_id, stats.subject],
+        set_={
+            "total_questions": stats.total_questions + stmt.excluded.total_questions,
+            "correct_answers": stats.correct_answers + stmt.excluded.correct_answers,
+            "total_response_time": stats.total_response_time + stmt.excluded.total_response_time,
+            "last_activity": stmt.excluded.last_activity,
+            "accuracy_ewma": stats.accuracy_ewma * batch_decay + stmt.excluded.accuracy_ewma,
+            "accuracy_weight": stats.accuracy_weight * batch_decay + stmt.excluded.accuracy_weight,
+            "last_difficulty": func.coalesce(stmt.excluded.last_difficulty, stats.last_difficulty),
+        },
+    )
+    db.execute(stmt)
+
+def rebuild_user_subject_stats(db, user_id: int = None):
+    """Recompute user_subject_stats from quiz_logs (all users, or one). Caller commits."""
+    stats = models.UserSubjectStats
+    logs = models.QuizLog
+    clear = delete(stats)
+    source = select(
+        logs.user_id,
+        logs.subject,
+        func.count(logs.id),
+        func.coalesce(func.sum(logs.correct), 0),
+        func.coalesce(func.sum(logs.response_time), 0),
+        func.max(logs.timestamp),
+    ).where(logs.subject.isnot(None)).group_by(logs.user_id, logs.subject)
+    if user_id is not None:
+        clear = clear.where(stats.user_id == user_id)
+        source = source.where(logs.user_id == user_id)
+    db.execute(clear)
+    db.execute(insert(stats).from_select(
+        ["user_id", "subject", "total_questions", "correct_answers", "total_response_time", "last_activity"],
+        source,
+    ))
+    _rebuild_rolling_accuracy(db, user_id)
+
+def _rebuild_rolling_accuracy(db, user_id: int = None):
+    """Replay quiz_logs in order to recompute the rolling accuracy state (streamed)."""
+    stats = models.UserSubjectStats
+    logs = models.QuizLog
+    source = select(logs.user_id, logs.subject, logs.correct, logs.difficulty).where(logs.subject.isnot(None))
+    if user_id is not None:
+        source = source.where(logs.user_id == user_id)
+    source = source.order_by(logs.user_id, logs.subject, logs.id).execution_options(yield_per=STATS_REBUILD_CHUNK)
+
+    table = stats.__table__  # Core UPDATE: plain executemany, no ORM session sync
+    write = update(table).where(
+        table.c.user_id == bindparam("b_user_id"), table.c.subject == bindparam("b_subject")
+    ).values(
+        accuracy_ewma=bindparam("b_ewma"), accuracy_weight=bindparam("b_weight"), last_difficulty=bindparam("b_difficulty")
+    )
+    pending = []
+    key, state, difficulty = None, None, None
+    for row_user, row_subject, correct, row_difficulty in db.execute(source):
+        if (row_user, row_subject) != key:
+            if key is not None:
+                pending.append({"b_user_id": key[0], "b_subject": key[1], "b_ewma": state[0],
+                                "b_weight": state[1], "b_difficulty": difficulty})
+            key, state, difficulty = (row_user, row_subject), [0.0, 0.0], None
+        fold_accuracy(state, correct)
+        difficulty = row_difficulty or difficulty
+        if len(pending) >= STATS_REBUILD_CHUNK:
+            db.execute(write, pending)
+            pending = []
+    if key is not None:
+        pending.append({"b_user_id": key[0], "b_subject": key[1], "b_ewma": state[0],
+                        "b_weight": state[1], "b_difficulty": difficulty})
+    if pending:
+        db.execute(write, pending)
+
+SCORE_SCOPES = {"quiz": "quiz_id", "user": "user_id"}
+
+def update_score_rollups(db, attempt_rows: list):
+    """
+    Fold new quiz_attempts rows ({user_id, quiz_id, score, end_time}) into the
+    per-quiz and per-user score aggregates and histograms. The caller commits.
+    """
+    totals = {}
+    bins = {}
+    for row in attempt_rows:
+        score = row.get("score")
+        if score is None:
+            continue
+        for scope, column in SCORE_SCOPES.items():
+            key = (scope, row[column])
+            t = totals.setdefault(key, [0, 0.0, 0.0, score, score, None])
+            t[0] += 1
+            t[1] += score
+            t[2] += score * score
+            t[3] = min(t[3], score)
+            t[4] = max(t[4], score)
+            if row.get("end_time") and (t[5] is None or row["end_time"] > t[5]):
+                t[5] = row["end_time"]
+            bin_key = key + (score_bin(score),)
+            bins[bin_key] = bins.get(bin_key, 0) + 1
+    if not totals:
+        return
+
+    rollup = models.ScoreRollup
+    stmt = upsert_insert(db, rollup).values([
+        {
+            "scope": scope,
+            "scope_id": scope_id,
+            "attempts": attempts,
+            "score_sum": score_sum,
+            "score_sumsq": score_sumsq,
+            "min_score": low,
+            "max_score": high,
+            "last_attempt": last_attempt,
+        }
+        for (scope, scope_id), (attempts, score_sum, score_sumsq, low, high, last_attempt) in totals.items()
+    ])
+    excluded = stmt.excluded
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[rollup.scope, rollup.scope_id],
+        set_={
+            "attempts": rollup.attempts + excluded.attempts,
+            "score_sum": rollup.score_sum + excluded.score_sum,
+            "score_sumsq": rollup.score_sumsq + excluded.score_sumsq,
+            "min_score": case((rollup.min_score.is_(None) | (excluded.min_score < rollup.min_score), excluded.min_score),
+                              else_=rollup.min_score),
+            "max_score": case((rollup.max_score.is_(None) | (excluded.max_score > rollup.max_score), excluded.max_score),
+                              else_=rollup.max_score),
+            "last_attempt": case((rollup.last_attempt.is_(None) | (excluded.last_attempt > rollup.last_attempt),
+                                  excluded.last_attempt), else_=rollup.last_attempt),
+        },
+    ))
+
+    histogram = models.ScoreHistogramBin
+    stmt = upsert_insert(db, histogram).values([
+        {"scope": scope, "scope_id": scope_id, "bin": b, "count": count}
+        for (scope, scope_id, b), count in bins.items()
+    ])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[histogram.scope, histogram.scope_id, histogram.bin],
+        set_={"count": histogram.count + stmt.excluded.count},
+    ))
+
+def rebuild_score_rollups(db):
+    """Recompute score_rollups and score_histogram_bins from quiz_attempts. Caller commits."""
+    attempts = models.QuizAttempt
+    rollup = models.ScoreRollup
+    histogram = models.ScoreHistogramBin
+    db.execute(delete(rollup))
+    db.execute(delete(histogram))
+    score_bin_expr = cast(attempts.score / SCORE_BIN_WIDTH, Integer)
+    for scope, column in SCORE_SCOPES.items():
+        scope_id = getattr(attempts, column)
+        db.execute(insert(rollup).from_select(
+            ["scope", "scope_id", "attempts", "score_sum", "score_sumsq", "min_score", "max_score", "last_attempt"],
+            select(
+                literal(scope), scope_id, func.count(attempts.id), func.sum(attempts.score),
+                func.sum(attempts.score * attempts.score), func.min(attempts.score), func.max(attempts.score),
+                func.max(attempts.end_time),
+            ).where(attempts.score.isnot(None), scope_id.isnot(None)).group_by(scope_id),
+        ))
+        db.execute(insert(histogram).from_select(
+            ["scope", "scope_id", "bin", "count"],
+            select(literal(scope), scope_id, score_bin_expr, func.count(attempts.id))
+            .where(attempts.score.isnot(None), scope_id.isnot(None)).group_by(scope_id, score_bin_expr),
+        ))
+
+def get_score_summary(db, scope: str, scope_id: int):
+    """Aggregates plus p50/p90 and histogram for one quiz or user, or None if nothing is recorded."""
+    row = db.get(models.ScoreRollup, (scope, scope_id))
+    if row is None:
+        return None
+    histogram = models.ScoreHistogramBin
+    bins = dict(db.query(histogram.bin, histogram.count).filter(
+        histogram.scope == scope, histogram.scope_id == scope_id
+    ).all())
+    summary = summarize(row.attempts, row.score_sum, row.score_sumsq, row.min_score, row.max_score, bins)
+    summary["last_attempt"] = row.last_attempt
+    return summary
+
+# -------------------------
+# Question calibration
+# -------------------------
+def calibration_sources():
+    """(name, id column, answer stream) for every table that records answers."""
+    logs = models.QuizLog
+    attempts = models.QuestionAttempt
+    questions = models.Question
+    return [
+        ("quiz_logs", logs.id, select(
+            logs.id, logs.user_id, logs.question_id, logs.correct, logs.response_time,
+            func.coalesce(logs.subject, questions.subject),
+        ).outerjoin(questions, questions.id == logs.question_id)),
+        ("question_attempts", attempts.id, select(
+            attempts.id, models.QuizAttempt.user_id, attempts.question_id, attempts.correct, attempts.time_taken,
+            questions.subject,
+        ).join(models.QuizAttempt, models.QuizAttempt.id == attempts.quiz_id)
+         .outerjoin(questions, questions.id == attempts.question_id)),
+    ]
+
+def calibrate_questions(db, chunk: int = CALIBRATION_CHUNK) -> dict:
+    """
+    Fold answers recorded since the last run into question_stats and
+    user_abilities, `chunk` answers per transaction: memory is bounded by
+    the chunk, not the history. Returns {source: answers folded}.
+    """
+    watermarks = dict(db.query(models.CalibrationWatermark.source, models.CalibrationWatermark.last_id).all())
+    folded = {}
+    for name, id_column, answers in calibration_sources():
+        folded[name] = 0
+        while True:
+            rows = db.execute(
+                answers.where(id_column > watermarks.get(name, 0)).order_by(id_column).limit(chunk)
+            ).all()
+            if not rows:
+                break
+            # answers whose user or question is unknown still advance the watermark
+            usable = [row for row in rows if row[1] is not None and row[2] is not None]
+            if usable:
+                _calibrate_chunk(db, usable)
+            watermarks[name] = rows[-1][0]
+            stmt = upsert_insert(db, models.CalibrationWatermark).values(source=name, last_id=rows[-1][0])
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[models.CalibrationWatermark.source], set_={"last_id": stmt.excluded.last_id}
+            ))
+            db.commit()
+            folded[name] += len(usable)
+            if len(rows) < chunk:
+                break
+    return folded
+
+def _calibrate_chunk(db, rows: list):
+    """Replay one chunk of (id, user_id, question_id, correct, seconds, subject) in order."""
+    question_ids = {row[2] for row in rows}
+    learners = list({(row[1], row[5] or "*") for row in rows})
+
+    # Current state of exactly the items and learners in this chunk;
+    # items without stats yet start from their difficulty label
+    items = {}
+    ids = list(question_ids)
+    for i in range(0, len(ids), BULK_LOOKUP_CHUNK):
+        part = ids[i:i + BULK_LOOKUP_CHUNK]
+        items.update((question_id, [difficulty, answers]) for question_id, difficulty, answers in db.query(
+            models.QuestionStats.question_id, models.QuestionStats.difficulty, models.QuestionStats.answers
+        ).filter(models.QuestionStats.question_id.in_(part)))
+        fresh = [question_id for question_id in part if question_id not in items]
+        if fresh:
+            items.update((question_id, [prior_difficulty(label), 0]) for question_id, label in db.query(
+                models.Question.id, models.Question.difficulty
+            ).filter(models.Question.id.in_(fresh)))
+    abilities = {}
+    for i in range(0, len(learners), BULK_LOOKUP_CHUNK):
+        for user_id, subject, ability, answers in db.query(
+            models.UserAbility.user_id, models.UserAbility.subject, models.UserAbility.ability, models.UserAbility.answers
+        ).filter(tuple_(models.UserAbility.user_id, models.UserAbility.subject).in_(learners[i:i + BULK_LOOKUP_CHUNK])):
+            abilities[(user_id, subject)] = [ability, answers]
+
+    # answers, correct, timed_answers, total_response_time, ability_sum, ability_sumsq, correct_ability_sum
+    sums = {}
+    for _, user_id, question_id, correct, seconds, subject in rows:
+        item = items.setdefault(question_id, [0.0, 0])
+        learner = abilities.setdefault((user_id, subject or "*"), [0.0, 0])
+        x = 1 if correct else 0
+        theta = learner[0]
+        t = sums.setdefault(question_id, [0, 0, 0, 0.0, 0.0, 0.0, 0.0])
+        t[0] += 1
+        t[1] += x
+        if seconds and seconds > 0:
+            t[2] += 1
+            t[3] += seconds
+        t[4] += theta
+        t[5] += theta * theta
+        t[6] += theta * x
+        surprise = x - expected(theta, item[0])
+        learner[0] += step_size(learner[1]) * surprise
+        item[0] -= step_size(item[1]) * surprise
+        learner[1] += 1
+        item[1] += 1
+
+    now = datetime.utcnow()
+    stats = models.QuestionStats
+    stmt = upsert_insert(db, stats).values([
+        {
+            "question_id": question_id,
+            "answers": t[0],
+            "correct": t[1],
+            "timed_answers": t[2],
+            "total_response_time": t[3],
+            "ability_sum": t[4],
+            "ability_sumsq": t[5],
+            "correct_ability_sum": t[6],
+            "difficulty": items[question_id][0],
+            "updated_at": now,
+        }
+        for question_id, t in sums.items()
+    ])
+    excluded = stmt.excluded
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[stats.question_id],
+        set_={
+            **{column: getattr(stats, column) + getattr(excluded, column) for column in (
+                "answers", "correct", "timed_answers", "total_response_time",
+                "ability_sum", "ability_sumsq", "correct_ability_sum",
+            )},
+            "difficulty": excluded.difficulty,
+            "updated_at": excluded.updated_at,
+        },
+    ))
+
+    ability = models.UserAbility
+    stmt = upsert_insert(db, ability).values([
+        {"user_id": user_id, "subject": subject, "ability": value, "answers": answers}
+        for (user_id, subject), (value, answers) in abilities.items()
+    ])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[ability.user_id, ability.subject],
+        set_={"ability": stmt.excluded.ability, "answers": stmt.excluded.answers},
+    ))
@@ -1,9 +1,9 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
-import sqlite3
 
 # Load environment variables
 load_dotenv()
@@ -11,11 +11,43 @@ load_dotenv()
 project_root = os.path.dirname(os.path.dirname(__file__))
 default_db_path = os.path.join(project_root, "gamified_learning.db")
 DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{default_db_path}")
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+
+# Applied to every SQLite connection, sync or async engine. WAL lets
+# readers run alongside the quiz-submission writer; NORMAL sync is safe in WAL.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "cache_size": -int(os.getenv("SQLITE_CACHE_KB", "65536")),  # negative = KiB
+    "mmap_size": int(os.getenv("SQLITE_MMAP_BYTES", str(256 * 1024 * 1024))),
+    "temp_store": "MEMORY",
+}
+# Every router goes through these engines, so their pools are the SQLite
+# connection provider: connections are reused across requests, and with them
+# sqlite3's per-connection prepared-statement cache.
+SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "8"))
+SQLITE_CACHED_STATEMENTS = int(os.getenv("SQLITE_CACHED_STATEMENTS", "256"))
+
+
+def apply_sqlite_pragmas(connection):
+    cursor = connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
 
 # For SQLite, need check_same_thread
-connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
+connect_args = {"check_same_thread": False, "cached_statements": SQLITE_CACHED_STATEMENTS} if IS_SQLITE else {}
+pool_args = {"pool_size": SQLITE_POOL_SIZE} if IS_SQLITE else {}
+
+engine = create_engine(DATABASE_URL, connect_args=connect_args, **pool_args)
+
+if IS_SQLITE:
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection)
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -27,13 +59,35 @@ def get_db():
     finally:
         db.close()
 
-# Optional helper for routers that use raw SQLite access
-def get_db_connection():
-    """Return a sqlite3 connection matching DATABASE_URL; rows as dict-like objects."""
-    if not DATABASE_URL.startswith("sqlite///") and not DATABASE_URL.startswith("sqlite:///"):
-        raise RuntimeError("get_db_connection is only supported for SQLite URLs")
-    # Normalize and extract file path from sqlite URL
-    db_path = DATABASE_URL.replace("sqlite:///", "")
-    connection = sqlite3.connect(db_path)
-    connection.row_factory = sqlite3.Row
-    return connection
+
+def to_async_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its async driver (aiosqlite / asyncpg)."""
+    scheme, sep, rest = url.partition("://")
+    base = scheme.split("+")[0]
+    if base == "sqlite":
+        return f"sqlite+aiosqlite{sep}{rest}"
+    if base in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg{sep}{rest}"
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args={"cached_statements": SQLITE_CACHED_STATEMENTS} if IS_SQLITE else {},
+    **pool_args,
+)
+
+if IS_SQLITE:
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _set_async_sqlite_pragmas(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Async counterpart of get_db for `async def` routes
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
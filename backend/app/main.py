@@ -17,7 +17,20 @@ from app.routers import (
     auth as auth_router,
     anti_cheating,
     session,
+    leaderboard,
 )
+from app import crud
+from app.database import SessionLocal
+from app.utils.answer_key import answer_key
+from app.utils.credentials import credentials
+from app.utils.gamification import gamification
+from app.utils.google_certs import google_tokens
+from app.utils.jwt_keys import keyring
+from app.utils.leaderboard_index import leaderboard_index
+from app.utils.log_buffer import quiz_log_buffer
+from app.utils.response_cache import user_responses
+from app.utils.timing_detector import timing_detector
+from app.utils.windowed_boards import windowed_boards
 
 app = FastAPI()
 
@@ -45,6 +58,33 @@ app.include_router(badges.router, prefix="/badges", tags=["badges"])
 app.include_router(anti_cheating.router, prefix="/anti-cheating", tags=["anti-cheating"])
 app.include_router(session.router, prefix="/session", tags=["session"])
 app.include_router(auth_router.router, prefix="/auth", tags=["auth"])
+app.include_router(leaderboard.router)  # router carries its own /leaderboard prefix
+
+
+@app.on_event("startup")
+def warm_caches():
+    db = SessionLocal()
+    try:
+        leaderboard_index.warm(db)
+        windowed_boards.warm(db)
+        answer_key.warm(db)
+        timing_detector.warm(db)
+        gamification.warm(db)
+    finally:
+        db.close()
+    # Opt-in write-behind for quiz_logs (QUIZ_LOG_WRITE_BEHIND=1); replays any spool left by a crash
+    quiz_log_buffer.start(
+        SessionLocal, crud.write_quiz_logs,
+        on_commit=lambda rows: user_responses.invalidate(row["user_id"] for row in rows),
+    )
+    if os.getenv("GOOGLE_CLIENT_ID"):
+        # Fetch Google's signing keys now so the first login doesn't wait on them
+        google_tokens.cache.prefetch()
+
+
+@app.on_event("shutdown")
+def drain_write_behind():
+    quiz_log_buffer.stop()
 
 
 @app.get("/healthz")
@@ -52,6 +92,31 @@ def healthz():
     return {"status": "ok"}
 
 
+@app.get("/metrics/quiz-log-buffer")
+def quiz_log_buffer_metrics():
+    return quiz_log_buffer.metrics()
+
+
+@app.get("/metrics/response-cache")
+def response_cache_metrics():
+    return user_responses.metrics()
+
+
+@app.get("/metrics/credentials")
+def credentials_metrics():
+    return credentials.metrics()
+
+
+@app.get("/metrics/jwt")
+def jwt_metrics():
+    return keyring.metrics()
+
+
+@app.get("/metrics/google-certs")
+def google_certs_metrics():
+    return google_tokens.cache.metrics()
+
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", "8000"))
     host = os.getenv("HOST", "0.0.0.0")
@@ -0,0 +1,466 @@
+# app/migrations.py
+"""
+Versioned schema migrations.
+
+Each step is registered with @migration(version, description) and runs in its
+own transaction; applied versions are recorded in `schema_migrations`. Steps
+are written to be idempotent (create-if-missing) so they also converge
+databases that were built by the old create_tables.py.
+"""
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from sqlalchemy import (
+    JSON, Boolean, Column, Date, DateTime, Float, ForeignKey, Index, Integer, MetaData, String, Table, inspect,
+    select, text,
+)
+from sqlalchemy.engine import Connection, Engine
+
+from app.crud import backfill_answer_fingerprints, rebuild_score_rollups, rebuild_user_subject_stats
+from app.database import Base, engine
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = []
+
+_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _meta,
+    Column("version", Integer, primary_key=True),
+    Column("description", String),
+    Column("applied_at", DateTime),
+)
+
+
+def migration(version: int, description: str):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return register
+
+
+# -------------------------
+# Helpers
+# -------------------------
+def add_column_if_missing(conn: Connection, table_name: str, column_name: str, metadata: MetaData = Base.metadata):
+    """ALTER TABLE ... ADD COLUMN for a model column the database doesn't have yet."""
+    existing = {c["name"] for c in inspect(conn).get_columns(table_name)}
+    if column_name in existing:
+        return
+    column = metadata.tables[table_name].c[column_name]
+    col_type = column.type.compile(dialect=conn.dialect)
+    conn.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {column_name} {col_type}'))
+
+
+def create_index_if_missing(conn: Connection, table_name: str, index_name: str, metadata: MetaData = Base.metadata):
+    table = metadata.tables[table_name]
+    index = next(i for i in table.indexes if i.name == index_name)
+    index.create(bind=conn, checkfirst=True)
+
+
+# -------------------------
+# Steps
+# -------------------------
+# The schema as the original create_tables.py built it, frozen here so that
+# step 1 always means the same thing; everything added since has its own step.
+_baseline_meta = MetaData()
+Table(
+    "users", _baseline_meta,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String),
+    Column("email", String, unique=True, index=True),
+    Column("password", String),
+    Column("xp", Integer),
+    Column("streak", Integer),
+    Column("badges", JSON),
+)
+Table(
+    "questions", _baseline_meta,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("subject", String),
+    Column("difficulty", String),
+    Column("question_text", String),
+    Column("options", JSON),
+    Column("correct_answer", String),
+)
+Table(
+    "quiz_attempts", _baseline_meta,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, index=True),
+    Column("quiz_id", Integer, index=True),
+    Column("start_time", DateTime),
+    Column("end_time", DateTime),
+    Column("score", Float),
+    Column("synced", Boolean),
+)
+Table(
+    "question_attempts", _baseline_meta,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("quiz_id", Integer, ForeignKey("quiz_attempts.id")),
+    Column("question_id", Integer),
+    Column("selected_option", String),
+    Column("time_taken", Float),
+    Column("correct", Boolean),
+)
+Table(
+    "quiz_sessions", _baseline_meta,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, index=True),
+    Column("subject", String),
+    Column("difficulty", String),
+    Column("start_time", DateTime),
+    Column("is_active", Boolean),
+)
+Table(
+    "quiz_logs", _baseline_meta,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, index=True),
+    Column("question_id", Integer),
+    Column("chosen_answer", String),
+    Column("correct", Integer),
+    Column("response_time", Float),
+    Column("subject", String),
+    Column("difficulty", String),
+    Column("timestamp", DateTime),
+    Column("synced", Boolean),
+)
+Table(
+    "user_progress", _baseline_meta,
+    Column("user_id", Integer, primary_key=True, index=True),
+    Column("total_xp", Integer),
+    Column("current_streak", Integer),
+    Column("last_quiz_date", Date),
+    Column("badges", JSON),
+)
+Table(
+    "badges", _baseline_meta,
+    Column("badge_id", Integer, primary_key=True, index=True),
+    Column("name", String, nullable=False),
+    Column("description", String),
+    Column("criteria", JSON, nullable=False),
+)
+
+
+@migration(1, "baseline schema")
+def _baseline(conn: Connection):
+    _baseline_meta.create_all(bind=conn)
+    # Databases created by even older models may be missing baseline columns/indexes.
+    for table_name, table in _baseline_meta.tables.items():
+        for column in table.columns:
+            if not column.primary_key:
+                add_column_if_missing(conn, table_name, column.name, _baseline_meta)
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+
+# Later steps freeze their definitions the same way, each in its own
+# MetaData with just the tables, columns and indexes its DDL touches, so an
+# old database replays exactly the DDL a fresh one ran. Data backfills call
+# crud against the live models, so they run in the latest step that shapes
+# their tables.
+_step2_meta = MetaData()
+Table(
+    "quiz_logs", _step2_meta,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer),
+    Column("synced", Boolean),
+    Column("subject", String),
+    Column("correct", Integer),
+    Index("ix_quiz_logs_user_id_synced", "user_id", "synced", "id"),
+    Index("ix_quiz_logs_user_id_subject", "user_id", "subject", "correct"),
+)
+Table(
+    "quiz_attempts", _step2_meta,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer),
+    Column("quiz_id", Integer),
+    Index("ix_quiz_attempts_user_id_quiz_id", "user_id", "quiz_id"),
+    Index("ix_quiz_attempts_quiz_id_user_id", "quiz_id", "user_id"),
+)
+
+
+@migration(2, "composite indexes for quiz_logs / quiz_attempts hot queries")
+def _hot_query_indexes(conn: Connection):
+    for index_name in ("ix_quiz_logs_user_id_synced", "ix_quiz_logs_user_id_subject"):
+        create_index_if_missing(conn, "quiz_logs", index_name, _step2_meta)
+    for index_name in ("ix_quiz_attempts_user_id_quiz_id", "ix_quiz_attempts_quiz_id_user_id"):
+        create_index_if_missing(conn, "quiz_attempts", index_name, _step2_meta)
+
+
+_step3_meta = MetaData()
+Table(
+    "user_subject_stats", _step3_meta,
+    Column("user_id", Integer, primary_key=True),
+    Column("subject", String, primary_key=True),
+    Column("total_questions", Integer, nullable=False),
+    Column("correct_answers", Integer, nullable=False),
+    Column("total_response_time", Float, nullable=False),
+    Column("last_activity", DateTime),
+)
+
+
+@migration(3, "user_subject_stats rollup")
+def _user_subject_stats(conn: Connection):
+    # Filled by step 6, once the table has its rolling-accuracy columns
+    _step3_meta.create_all(bind=conn)
+
+
+_step4_meta = MetaData()
+Table("users", _step4_meta, Column("id", Integer, primary_key=True), Column("last_quiz_date", Date))
+
+
+@migration(4, "users.last_quiz_date")
+def _users_last_quiz_date(conn: Connection):
+    add_column_if_missing(conn, "users", "last_quiz_date", _step4_meta)
+
+
+_step5_meta = MetaData()
+Table(
+    "quiz_logs", _step5_meta,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer),
+    Column("timestamp", DateTime),
+    Index("ix_quiz_logs_user_id_timestamp", "user_id", "timestamp", "id"),
+)
+
+
+@migration(5, "quiz_logs (user_id, timestamp, id) index for keyset history")
+def _history_keyset_index(conn: Connection):
+    create_index_if_missing(conn, "quiz_logs", "ix_quiz_logs_user_id_timestamp", _step5_meta)
+
+
+_step6_meta = MetaData()
+Table(
+    "user_subject_stats", _step6_meta,
+    Column("user_id", Integer, primary_key=True),
+    Column("subject", String, primary_key=True),
+    Column("last_activity", DateTime),
+    Column("accuracy_ewma", Float),
+    Column("accuracy_weight", Float),
+    Column("last_difficulty", String),
+    Index("ix_user_subject_stats_user_id_last_activity", "user_id", "last_activity"),
+)
+
+
+@migration(6, "rolling accuracy state on user_subject_stats")
+def _rolling_accuracy(conn: Connection):
+    for column in ("accuracy_ewma", "accuracy_weight", "last_difficulty"):
+        add_column_if_missing(conn, "user_subject_stats", column, _step6_meta)
+    conn.execute(text(
+        "UPDATE user_subject_stats SET accuracy_ewma = COALESCE(accuracy_ewma, 0),"
+        " accuracy_weight = COALESCE(accuracy_weight, 0)"
+    ))
+    create_index_if_missing(conn, "user_subject_stats", "ix_user_subject_stats_user_id_last_activity", _step6_meta)
+    rebuild_user_subject_stats(conn)
+
+
+_step7_meta = MetaData()
+Table(
+    "quiz_attempts", _step7_meta,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer),
+    Column("quiz_id", Integer),
+    Column("answer_fingerprint", String(40)),
+    Index("ix_quiz_attempts_quiz_id_fingerprint", "quiz_id", "answer_fingerprint", "user_id"),
+)
+
+
+@migration(7, "quiz_attempts.answer_fingerprint")
+def _answer_fingerprints(conn: Connection):
+    add_column_if_missing(conn, "quiz_attempts", "answer_fingerprint", _step7_meta)
+    create_index_if_missing(conn, "quiz_attempts", "ix_quiz_attempts_quiz_id_fingerprint", _step7_meta)
+    backfill_answer_fingerprints(conn)
+
+
+_step8_meta = MetaData()
+Table(
+    "score_rollups", _step8_meta,
+    Column("scope", String, primary_key=True),
+    Column("scope_id", Integer, primary_key=True),
+    Column("attempts", Integer, nullable=False),
+    Column("score_sum", Float, nullable=False),
+    Column("score_sumsq", Float, nullable=False),
+    Column("min_score", Float),
+    Column("max_score", Float),
+    Column("last_attempt", DateTime),
+)
+Table(
+    "score_histogram_bins", _step8_meta,
+    Column("scope", String, primary_key=True),
+    Column("scope_id", Integer, primary_key=True),
+    Column("bin", Integer, primary_key=True),
+    Column("count", Integer, nullable=False),
+)
+
+
+@migration(8, "score_rollups and score_histogram_bins")
+def _score_rollups(conn: Connection):
+    _step8_meta.create_all(bind=conn)
+    rebuild_score_rollups(conn)
+
+
+_step9_meta = MetaData()
+Table(
+    "question_stats", _step9_meta,
+    Column("question_id", Integer, primary_key=True),
+    Column("answers", Integer, nullable=False),
+    Column("correct", Integer, nullable=False),
+    Column("timed_answers", Integer, nullable=False),
+    Column("total_response_time", Float, nullable=False),
+    Column("ability_sum", Float, nullable=False),
+    Column("ability_sumsq", Float, nullable=False),
+    Column("correct_ability_sum", Float, nullable=False),
+    Column("difficulty", Float, nullable=False),
+    Column("updated_at", DateTime),
+)
+Table(
+    "user_abilities", _step9_meta,
+    Column("user_id", Integer, primary_key=True),
+    Column("subject", String, primary_key=True),
+    Column("ability", Float, nullable=False),
+    Column("answers", Integer, nullable=False),
+)
+Table(
+    "calibration_watermarks", _step9_meta,
+    Column("source", String, primary_key=True),
+    Column("last_id", Integer, nullable=False),
+)
+
+
+@migration(9, "question_stats, user_abilities and calibration_watermarks")
+def _question_calibration(conn: Connection):
+    _step9_meta.create_all(bind=conn)
+
+
+_step10_meta = MetaData()
+Table(
+    "sync_cursors", _step10_meta,
+    Column("user_id", Integer, primary_key=True),
+    Column("last_acked_id", Integer, nullable=False),
+    Column("updated_at", DateTime),
+)
+Table(
+    "sync_acks", _step10_meta,
+    Column("user_id", Integer, primary_key=True),
+    Column("idempotency_key", String(64), primary_key=True),
+    Column("response", JSON, nullable=False),
+    Column("created_at", DateTime),
+)
+
+
+@migration(10, "sync_cursors and sync_acks for chunked offline sync")
+def _chunked_sync(conn: Connection):
+    _step10_meta.create_all(bind=conn)
+
+
+_step11_meta = MetaData()
+Table(
+    "question_tombstones", _step11_meta,
+    Column("question_id", Integer, primary_key=True),
+    Column("subject", String),
+    Column("difficulty", String),
+    Column("revision", Integer, nullable=False),
+    Column("deleted_at", DateTime),
+    Index("ix_question_tombstones_subject_difficulty_revision", "subject", "difficulty", "revision"),
+)
+Table(
+    "questions", _step11_meta,
+    Column("id", Integer, primary_key=True),
+    Column("subject", String),
+    Column("difficulty", String),
+    Column("revision", Integer),
+    Index("ix_questions_subject_difficulty_revision", "subject", "difficulty", "revision"),
+)
+
+
+@migration(11, "questions.revision and question_tombstones for offline question packs")
+def _question_revisions(conn: Connection):
+    _step11_meta.tables["question_tombstones"].create(bind=conn, checkfirst=True)
+    add_column_if_missing(conn, "questions", "revision", _step11_meta)
+    conn.execute(text("UPDATE questions SET revision = 1 WHERE revision IS NULL"))
+    create_index_if_missing(conn, "questions", "ix_questions_subject_difficulty_revision", _step11_meta)
+    create_index_if_missing(
+        conn, "question_tombstones", "ix_question_tombstones_subject_difficulty_revision", _step11_meta
+    )
+
+
+_step12_meta = MetaData()
+Table(
+    "questions", _step12_meta,
+    Column("id", Integer, primary_key=True),
+    Column("revision", Integer),
+    Index("ix_questions_revision", "revision"),
+)
+Table(
+    "question_tombstones", _step12_meta,
+    Column("question_id", Integer, primary_key=True),
+    Column("revision", Integer),
+    Index("ix_question_tombstones_revision", "revision"),
+)
+
+
+@migration(12, "revision indexes for the answer-key freshness check")
+def _revision_indexes(conn: Connection):
+    create_index_if_missing(conn, "questions", "ix_questions_revision", _step12_meta)
+    create_index_if_missing(conn, "question_tombstones", "ix_question_tombstones_revision", _step12_meta)
+
+
+@migration(13, "drop ix_quiz_logs_user_id_id (ix_quiz_logs_user_id already ends in the rowid)")
+def _drop_redundant_quiz_logs_index(conn: Connection):
+    conn.execute(text("DROP INDEX IF EXISTS ix_quiz_logs_user_id_id"))
+
+
+_step14_meta = MetaData()
+Table(
+    "question_tombstones", _step14_meta,
+    Column("question_id", Integer, primary_key=True),
+    Column("subject", String, primary_key=True),
+    Column("difficulty", String, primary_key=True),
+    Column("revision", Integer, nullable=False),
+    Column("deleted_at", DateTime),
+    Index("ix_question_tombstones_subject_difficulty_revision", "subject", "difficulty", "revision"),
+    Index("ix_question_tombstones_revision", "revision"),
+)
+
+
+@migration(14, "question_tombstones keyed by (question_id, subject, difficulty)")
+def _tombstones_per_pack(conn: Connection):
+    tombstones = _step14_meta.tables["question_tombstones"]
+    key = [column.name for column in tombstones.primary_key]
+    if inspect(conn).get_pk_constraint("question_tombstones")["constrained_columns"] == key:
+        return
+    conn.execute(text("ALTER TABLE question_tombstones RENAME TO question_tombstones_old"))
+    for index in tombstones.indexes:
+        conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+    tombstones.create(bind=conn)
+    conn.execute(text(
+        "INSERT INTO question_tombstones (question_id, subject, difficulty, revision, deleted_at)"
+        " SELECT question_id, COALESCE(subject, ''), COALESCE(difficulty, ''), revision, deleted_at"
+        " FROM question_tombstones_old"
+    ))
+    conn.execute(text("DROP TABLE question_tombstones_old"))
+
+
+# -------------------------
+# Runner
+# -------------------------
+def applied_versions(bind: Engine = engine) -> List[int]:
+    with bind.begin() as conn:
+        schema_migrations.create(bind=conn, checkfirst=True)
+        return [row[0] for row in conn.execute(select(schema_migrations.c.version))]
+
+
+def migrate(bind: Engine = engine, target: int = None) -> List[Tuple[int, str]]:
+    """Apply pending migrations up to `target` (default: latest). Returns what ran."""
+    done = set(applied_versions(bind))
+    ran = []
+    for version, description, step in MIGRATIONS:
+        if version in done or (target is not None and version > target):
+            continue
+        with bind.begin() as conn:
+            step(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=version, description=description, applied_at=datetime.utcnow()
+            ))
+        ran.append((version, description))
+    return ran
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, JSON, ForeignKey, DateTime, Boolean, Date
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, JSON, ForeignKey, DateTime, Boolean, Date, Index, event, inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import column_property, relationship
 from datetime import datetime
 from app.database import Base
 
@@ -13,16 +14,84 @@ class User(Base):
     xp = Column(Integer, default=0)
     streak = Column(Integer, default=0)
     badges = Column(JSON, default=[])
+    last_quiz_date = Column(Date)
+
+
+# Every insert, update or delete of a question takes the next question-bank
+# revision; offline question packs serve deltas by revision.
+NEXT_QUESTION_REVISION = text(
+    "(SELECT COALESCE(MAX(r), 0) + 1 FROM ("
+    "SELECT MAX(revision) AS r FROM questions UNION ALL SELECT MAX(revision) FROM question_tombstones) AS revisions)"
+)
 
 
 class Question(Base):
     __tablename__ = "questions"
     id = Column(Integer, primary_key=True, index=True)
-    subject = Column(String)
-    difficulty = Column(String)  # easy / medium / hard
+    # active_history: the old pack must be known when a question moves (see _tombstone_moved_question)
+    subject = column_property(Column(String), active_history=True)
+    difficulty = column_property(Column(String), active_history=True)  # easy / medium / hard
     question_text = Column(String)
     options = Column(JSON)
     correct_answer = Column(String)
+    revision = Column(Integer, default=NEXT_QUESTION_REVISION, onupdate=NEXT_QUESTION_REVISION)
+
+    __table_args__ = (
+        Index("ix_questions_subject_difficulty_revision", "subject", "difficulty", "revision"),
+        Index("ix_questions_revision", "revision"),  # bank revision / catch-up
+    )
+
+
+class QuestionTombstone(Base):
+    """
+    Questions that left a pack (deleted, or moved to another subject/difficulty),
+    kept so pack deltas can tell devices to drop them. One row per question
+    and pack; leaving the same pack again just takes a newer revision.
+    """
+    __tablename__ = "question_tombstones"
+    question_id = Column(Integer, primary_key=True)
+    subject = Column(String, primary_key=True)
+    difficulty = Column(String, primary_key=True)
+    revision = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_question_tombstones_subject_difficulty_revision", "subject", "difficulty", "revision"),
+        Index("ix_question_tombstones_revision", "revision"),
+    )
+
+
+def _write_tombstone(connection, question_id, subject, difficulty):
+    insert = postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
+    stmt = insert(QuestionTombstone.__table__).values(
+        # "" for a question that was in no pack: still needed to advance the bank revision
+        question_id=question_id, subject=subject or "", difficulty=difficulty or "",
+        revision=NEXT_QUESTION_REVISION, deleted_at=datetime.utcnow(),
+    )
+    # SQLite reuses the ids of deleted rows, so the same question id can leave a pack twice
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=["question_id", "subject", "difficulty"],
+        set_={"revision": stmt.excluded.revision, "deleted_at": stmt.excluded.deleted_at},
+    ))
+
+
+# Both run before the row changes, so the tombstone's revision is newer than
+# the question's old one and the question's next revision is newer still.
+@event.listens_for(Question, "before_delete")
+def _tombstone_question(mapper, connection, target):
+    _write_tombstone(connection, target.id, target.subject, target.difficulty)
+
+
+@event.listens_for(Question, "before_update")
+def _tombstone_moved_question(mapper, connection, target):
+    state = inspect(target)
+    subject, difficulty = state.attrs.subject.history, state.attrs.difficulty.history
+    if not (subject.deleted or difficulty.deleted):
+        return
+    old_subject = subject.deleted[0] if subject.deleted else target.subject
+    old_difficulty = difficulty.deleted[0] if difficulty.deleted else target.difficulty
+    if (old_subject, old_difficulty) != (target.subject, target.difficulty):
+        _write_tombstone(connection, target.id, old_subject, old_difficulty)
 
 
 class QuizAttempt(Base):
@@ -34,8 +103,15 @@ class QuizAttempt(Base):
     end_time = Column(DateTime)
     score = Column(Float)
     synced = Column(Boolean, default=False)
+    answer_fingerprint = Column(String(40))  # sha1 of the ordered question selections
     questions = relationship("QuestionAttempt", back_populates="quiz", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_quiz_attempts_user_id_quiz_id", "user_id", "quiz_id"),
+        Index("ix_quiz_attempts_quiz_id_user_id", "quiz_id", "user_id"),
+        Index("ix_quiz_attempts_quiz_id_fingerprint", "quiz_id", "answer_fingerprint", "user_id"),
+    )
+
 
 class QuestionAttempt(Base):
     __tablename__ = "question_attempts"
@@ -71,6 +147,106 @@ class QuizLog(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
     synced = Column(Boolean, default=True)
 
+    __table_args__ = (
+        Index("ix_quiz_logs_user_id_synced", "user_id", "synced", "id"),          # offline sync
+        Index("ix_quiz_logs_user_id_subject", "user_id", "subject", "correct"),   # dashboard group-by
+        Index("ix_quiz_logs_user_id_timestamp", "user_id", "timestamp", "id"),    # history keyset pages
+    )
+
+
+class UserSubjectStats(Base):
+    """Rollup of quiz_logs per (user, subject), maintained on every log insert."""
+    __tablename__ = "user_subject_stats"
+    user_id = Column(Integer, primary_key=True)
+    subject = Column(String, primary_key=True)
+    total_questions = Column(Integer, default=0, nullable=False)
+    correct_answers = Column(Integer, default=0, nullable=False)
+    total_response_time = Column(Float, default=0, nullable=False)
+    last_activity = Column(DateTime)
+    # Exponentially weighted recent accuracy = accuracy_ewma / accuracy_weight
+    accuracy_ewma = Column(Float, default=0, nullable=False)
+    accuracy_weight = Column(Float, default=0, nullable=False)
+    last_difficulty = Column(String)
+
+    __table_args__ = (
+        Index("ix_user_subject_stats_user_id_last_activity", "user_id", "last_activity"),
+    )
+
+
+class ScoreRollup(Base):
+    """Running aggregates of quiz_attempts scores per quiz or per user (scope = "quiz" | "user")."""
+    __tablename__ = "score_rollups"
+    scope = Column(String, primary_key=True)
+    scope_id = Column(Integer, primary_key=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    score_sum = Column(Float, default=0, nullable=False)
+    score_sumsq = Column(Float, default=0, nullable=False)
+    min_score = Column(Float)
+    max_score = Column(Float)
+    last_attempt = Column(DateTime)
+
+
+class ScoreHistogramBin(Base):
+    """Score histogram behind a ScoreRollup: attempts per SCORE_BIN_WIDTH-wide bin."""
+    __tablename__ = "score_histogram_bins"
+    scope = Column(String, primary_key=True)
+    scope_id = Column(Integer, primary_key=True)
+    bin = Column(Integer, primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+
+
+class QuestionStats(Base):
+    """
+    Calibrated item statistics, maintained by the calibration job
+    (app/utils/calibration.py). Sums are kept so every statistic folds in
+    incrementally: p-value = correct / answers, point-biserial discrimination
+    against the learner's ability at answer time, Elo/Rasch difficulty in logits.
+    """
+    __tablename__ = "question_stats"
+    question_id = Column(Integer, primary_key=True)
+    answers = Column(Integer, default=0, nullable=False)
+    correct = Column(Integer, default=0, nullable=False)
+    timed_answers = Column(Integer, default=0, nullable=False)  # answers with a recorded response time
+    total_response_time = Column(Float, default=0, nullable=False)
+    ability_sum = Column(Float, default=0, nullable=False)
+    ability_sumsq = Column(Float, default=0, nullable=False)
+    correct_ability_sum = Column(Float, default=0, nullable=False)
+    difficulty = Column(Float, default=0, nullable=False)
+    updated_at = Column(DateTime)
+
+
+class UserAbility(Base):
+    """Per-(user, subject) Elo/Rasch ability in logits, updated alongside question_stats."""
+    __tablename__ = "user_abilities"
+    user_id = Column(Integer, primary_key=True)
+    subject = Column(String, primary_key=True)
+    ability = Column(Float, default=0, nullable=False)
+    answers = Column(Integer, default=0, nullable=False)
+
+
+class CalibrationWatermark(Base):
+    """Last answer id folded into the calibration, per source table."""
+    __tablename__ = "calibration_watermarks"
+    source = Column(String, primary_key=True)
+    last_id = Column(Integer, default=0, nullable=False)
+
+
+class SyncCursor(Base):
+    """Offline sync position per user: highest quiz_logs id the device has acknowledged."""
+    __tablename__ = "sync_cursors"
+    user_id = Column(Integer, primary_key=True)
+    last_acked_id = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime)
+
+
+class SyncAck(Base):
+    """Outcome of an acknowledged sync page, keyed by the client's idempotency key."""
+    __tablename__ = "sync_acks"
+    user_id = Column(Integer, primary_key=True)
+    idempotency_key = Column(String(64), primary_key=True)
+    response = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
 
 class UserProgress(Base):
     __tablename__ = "user_progress"
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 from app.database import get_db
 from sqlalchemy.orm import Session
-from app import models
+from app import crud, models
+from app.utils.calibration import item_report
+from app.utils.jwt_keys import authorize_user
 
 router = APIRouter()
 
@@ -23,26 +25,45 @@ def determine_next_difficulty(current_difficulty: str, score_percentage: float):
     else:
         return current_difficulty
 
-@router.get("/next-difficulty/{user_id}")
-def get_next_difficulty(user_id: int, db: Session = Depends(get_db)):
+@router.get("/next-difficulty/{user_id}", dependencies=[Depends(authorize_user)])
+def get_next_difficulty(user_id: int, subject: str = None, db: Session = Depends(get_db)):
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
         return {"error": "User not found"}
 
-    # Placeholder: calculate last quiz score percentage
-    last_quiz = db.query(models.QuizLog).filter(models.QuizLog.user_id == user_id).order_by(models.QuizLog.id.desc()).first()
-    if not last_quiz:
+    # Rolling accuracy state for the subject (or the most recently practised one)
+    stats_query = db.query(models.UserSubjectStats).filter(models.UserSubjectStats.user_id == user_id)
+    if subject:
+        stats_query = stats_query.filter(models.UserSubjectStats.subject == subject)
+    stats = stats_query.order_by(models.UserSubjectStats.last_activity.desc()).first()
+    if not stats or not stats.accuracy_weight:
         return {"next_difficulty": "easy"}
 
-    # Calculate score percentage from last quiz
-    user_answers = db.query(models.QuizLog).filter(models.QuizLog.user_id == user_id).all()
-    if not user_answers:
-        return {"next_difficulty": "easy"}
-
-    correct_count = sum([log.correct for log in user_answers])
-    total_questions = len(user_answers)
-    score_percentage = correct_count / total_questions if total_questions else 0
-
-    current_difficulty = last_quiz.difficulty
+    score_percentage = stats.accuracy_ewma / stats.accuracy_weight
+    current_difficulty = stats.last_difficulty or "easy"
     next_diff = determine_next_difficulty(current_difficulty, score_percentage)
     return {"next_difficulty": next_diff}
+
+@router.get("/questions/{user_id}", dependencies=[Depends(authorize_user)])
+def get_questions_for_user(user_id: int, subject: str, limit: int = Query(5, ge=1, le=50), db: Session = Depends(get_db)):
+    """Questions whose calibrated difficulty is closest to the learner's ability in the subject."""
+    ability = db.query(models.UserAbility.ability).filter(
+        models.UserAbility.user_id == user_id, models.UserAbility.subject == subject
+    ).scalar()
+    questions = crud.get_questions(db, subject, limit=limit, user_id=user_id)
+    return {
+        "user_id": user_id,
+        "subject": subject,
+        "ability": ability,
+        "questions": [
+            {"id": q.id, "question_text": q.question_text, "options": q.options, "difficulty": q.difficulty}
+            for q in questions
+        ]
+    }
+
+@router.get("/question-stats/{question_id}")
+def get_question_stats(question_id: int, db: Session = Depends(get_db)):
+    stats = db.get(models.QuestionStats, question_id)
+    if not stats:
+        raise HTTPException(status_code=404, detail="Question has not been calibrated yet")
+    return item_report(stats)
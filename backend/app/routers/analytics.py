@@ -1,15 +1,23 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app import models
+from app import crud, models
+from app.utils.jwt_keys import authorize_user
+from app.utils.response_cache import user_responses
 from sqlalchemy import func
 from app.models import QuizAttempt
 from datetime import datetime
 
 router = APIRouter()
 
-@router.get("/user-performance/{user_id}")
-def get_user_performance(user_id: int, db: Session = Depends(get_db)):
+MAX_PAGE_SIZE = 500
+
+@router.get("/user-performance/{user_id}", dependencies=[Depends(authorize_user)])
+def get_user_performance(user_id: int, request: Request, db: Session = Depends(get_db)):
+    cached = user_responses.lookup(request, user_id, "user-performance")
+    if cached.response:
+        return cached.response
+
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
         return {"error": "User not found"}
@@ -26,45 +34,58 @@ def get_user_performance(user_id: int, db: Session = Depends(get_db)):
     streak = user.streak
     badges = user.badges or []
 
-    return {
+    return cached.store({
         "user_id": user_id,
         "total_quizzes": total_quizzes,
         "average_score": avg_score,
         "current_streak": streak,
         "xp": xp,
         "badges": badges
-    }
-# Get overall stats for a user
-@router.get("/analytics/user/{user_id}")
+    })
+# Get overall stats for a user (served from the score rollups)
+@router.get("/analytics/user/{user_id}", dependencies=[Depends(authorize_user)])
 def user_stats(user_id: int, db: Session = Depends(get_db)):
-    attempts = db.query(QuizAttempt).filter(QuizAttempt.user_id == user_id).all()
-    total_attempts = len(attempts)
-    avg_score = sum([a.score for a in attempts]) / total_attempts if total_attempts > 0 else 0
-
-    return {
-        "user_id": user_id,
-        "total_attempts": total_attempts,
-        "average_score": avg_score,
-        "last_attempt": attempts[-1].timestamp if total_attempts > 0 else None
-    }
+    summary = crud.get_score_summary(db, "user", user_id)
+    if summary is None:
+        return {"user_id": user_id, "total_attempts": 0, "average_score": 0, "last_attempt": None}
+    return {"user_id": user_id, **summary}
 
-# Get quiz-wise stats
+# Get quiz-wise stats (served from the score rollups)
 @router.get("/analytics/quiz/{quiz_id}")
 def quiz_stats(quiz_id: int, db: Session = Depends(get_db)):
-    attempts = db.query(QuizAttempt).filter(QuizAttempt.quiz_id == quiz_id).all()
-    total_attempts = len(attempts)
-    avg_score = sum([a.score for a in attempts]) / total_attempts if total_attempts > 0 else 0
+    summary = crud.get_score_summary(db, "quiz", quiz_id)
+    if summary is None:
+        return {"quiz_id": quiz_id, "total_attempts": 0, "average_score": 0, "distribution": []}
+    summary.pop("last_attempt")
+    return {"quiz_id": quiz_id, **summary}
+
+# Individual attempts of a quiz, newest first, one keyset page at a time
+@router.get("/analytics/quiz/{quiz_id}/attempts")
+def quiz_attempts(
+    quiz_id: int,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: int = None,
+    db: Session = Depends(get_db),
+):
+    query = db.query(QuizAttempt.id, QuizAttempt.user_id, QuizAttempt.score, QuizAttempt.end_time).filter(
+        QuizAttempt.quiz_id == quiz_id
+    )
+    if cursor is not None:
+        query = query.filter(QuizAttempt.id < cursor)
+    rows = query.order_by(QuizAttempt.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
 
     return {
         "quiz_id": quiz_id,
-        "total_attempts": total_attempts,
-        "average_score": avg_score,
         "attempts": [
             {
+                "id": a.id,
                 "user_id": a.user_id,
                 "score": a.score,
-                "timestamp": a.timestamp
+                "timestamp": a.end_time
             }
-            for a in attempts
-        ]
-    }
\ No newline at end of file
+            for a in rows
+        ],
+        "next_cursor": rows[-1].id if has_more else None
+    }
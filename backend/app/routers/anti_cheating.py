@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload
 from app.database import get_db
 from app.models import QuizAttempt
+from app.utils.timing_detector import timing_detector
 from datetime import datetime, timedelta
 
 router = APIRouter()
@@ -10,38 +12,60 @@ router = APIRouter()
 MIN_DURATION = 5   # Minimum seconds for a valid attempt
 MAX_DUPLICATE_ATTEMPTS = 2
 
+def attempt_duration(attempt: QuizAttempt):
+    if attempt.start_time and attempt.end_time:
+        return (attempt.end_time - attempt.start_time).total_seconds()
+    return None
+
 @router.get("/check/{quiz_id}/{user_id}")
 def check_cheating(quiz_id: int, user_id: int, db: Session = Depends(get_db)):
-    attempts = db.query(QuizAttempt).filter(
+    attempts = db.query(QuizAttempt).options(selectinload(QuizAttempt.questions)).filter(
         QuizAttempt.quiz_id == quiz_id,
         QuizAttempt.user_id == user_id
     ).all()
 
     suspicious = []
 
+    # 1. Fast submissions
     for attempt in attempts:
-        # 1. Fast submissions
-        if attempt.duration < MIN_DURATION:
+        duration = attempt_duration(attempt)
+        if duration is not None and duration < MIN_DURATION:
             suspicious.append({
                 "type": "fast_submission",
                 "score": attempt.score,
-                "timestamp": attempt.timestamp
+                "timestamp": attempt.end_time
             })
 
-        # 2. Duplicate answers (compare with others)
-        other_attempts = db.query(QuizAttempt).filter(
+    # 2. Duplicate answers: one indexed lookup of other users sharing a fingerprint
+    by_fingerprint = {}
+    for attempt in attempts:
+        if attempt.answer_fingerprint:
+            by_fingerprint.setdefault(attempt.answer_fingerprint, []).append(attempt)
+    if by_fingerprint:
+        matches = db.query(QuizAttempt.answer_fingerprint, QuizAttempt.user_id).filter(
             QuizAttempt.quiz_id == quiz_id,
+            QuizAttempt.answer_fingerprint.in_(list(by_fingerprint)),
             QuizAttempt.user_id != user_id
-        ).all()
-
-        for other in other_attempts:
-            if attempt.answers == other.answers:
+        ).group_by(QuizAttempt.answer_fingerprint, QuizAttempt.user_id).all()
+        for fingerprint, other_user_id in matches:
+            for attempt in by_fingerprint[fingerprint]:
                 suspicious.append({
                     "type": "duplicate_answers",
-                    "user_id": other.user_id,
-                    "timestamp": attempt.timestamp
+                    "user_id": other_user_id,
+                    "timestamp": attempt.end_time
                 })
 
+    # 2b. Per-question answers far below the population's response times
+    fast_answers = sum(
+        timing_detector.is_fast(q.question_id, q.time_taken)
+        for attempt in attempts for q in attempt.questions
+    )
+    if fast_answers:
+        suspicious.append({
+            "type": "fast_answers",
+            "count": fast_answers
+        })
+
     # 3. Too many attempts
     if len(attempts) > MAX_DUPLICATE_ATTEMPTS:
         suspicious.append({
@@ -55,3 +79,42 @@ def check_cheating(quiz_id: int, user_id: int, db: Session = Depends(get_db)):
         "total_attempts": len(attempts),
         "suspicious_flags": suspicious
     }
+
+@router.get("/collisions/{quiz_id}")
+def quiz_collisions(quiz_id: int, db: Session = Depends(get_db)):
+    """
+    Batch scan of a whole quiz: every answer fingerprint shared by more than
+    one user, with the users and attempts in each cluster.
+    """
+    shared = db.query(QuizAttempt.answer_fingerprint).filter(
+        QuizAttempt.quiz_id == quiz_id,
+        QuizAttempt.answer_fingerprint.isnot(None)
+    ).group_by(QuizAttempt.answer_fingerprint).having(
+        func.count(func.distinct(QuizAttempt.user_id)) > 1
+    ).subquery()
+
+    rows = db.query(QuizAttempt.answer_fingerprint, QuizAttempt.user_id, QuizAttempt.id).filter(
+        QuizAttempt.quiz_id == quiz_id,
+        QuizAttempt.answer_fingerprint.in_(shared.select())
+    ).order_by(QuizAttempt.answer_fingerprint, QuizAttempt.user_id).all()
+
+    clusters = {}
+    for fingerprint, member_id, attempt_id in rows:
+        cluster = clusters.setdefault(fingerprint, {"fingerprint": fingerprint, "user_ids": [], "attempt_ids": []})
+        if member_id not in cluster["user_ids"]:
+            cluster["user_ids"].append(member_id)
+        cluster["attempt_ids"].append(attempt_id)
+
+    return {
+        "quiz_id": quiz_id,
+        "total_clusters": len(clusters),
+        "clusters": list(clusters.values())
+    }
+
+@router.get("/timing/{question_id}")
+def question_timing(question_id: int):
+    """Live response-time distribution the fast-answer detector judges against."""
+    summary = timing_detector.summary(question_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="No timings recorded for this question")
+    return summary
@@ -1,13 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app import crud, schemas, models
-from app.database import get_db
+from app.database import get_async_db, get_db
 from pydantic import BaseModel
 from typing import Optional
 import os
-from jose import jwt
-from datetime import datetime, timedelta
-from google.oauth2 import id_token as google_id_token
+from app.utils.credentials import CredentialServiceBusy, credentials
+from app.utils.google_certs import CertFetchError, google_tokens
+from app.utils.jwt_keys import current_user_id, keyring
 
 router = APIRouter()
 
@@ -18,12 +19,21 @@ class AuthResponse(BaseModel):
     token: str
     user: schemas.UserResponse
 
+def credentials_busy() -> HTTPException:
+    return HTTPException(status_code=503, detail="Too many logins in progress, retry shortly",
+                         headers={"Retry-After": "1"})
+
 @router.post("/signup", response_model=AuthResponse)
-def signup(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, email=user.email)
+async def signup(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    # bcrypt runs on the credential pool, the queries on the async connection
+    db_user = await db.run_sync(crud.get_user_by_email, user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    created = crud.create_user(db, user.name, user.email, user.password)
+    try:
+        password_hash = await credentials.hash_async(user.password)
+    except CredentialServiceBusy:
+        raise credentials_busy()
+    created = await db.run_sync(crud.create_user, user.name, user.email, password_hash)
     token = create_jwt(created)
     return AuthResponse(
         token=token,
@@ -38,10 +48,17 @@ def signup(user: schemas.UserCreate, db: Session = Depends(get_db)):
     )
 
 @router.get("/login", response_model=AuthResponse)
-def login(email: str, password: str, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, email=email)
-    if not db_user or db_user.password != password:
+async def login(email: str, password: str, db: AsyncSession = Depends(get_async_db)):
+    db_user = await db.run_sync(crud.get_user_by_email, email)
+    try:
+        ok, new_hash = await credentials.check_async(password, db_user.password if db_user else None)
+    except CredentialServiceBusy:
+        raise credentials_busy()
+    if not db_user or not ok:
         raise HTTPException(status_code=400, detail="Invalid credentials")
+    if new_hash:
+        # plaintext row or an older work factor: store the upgraded hash
+        await db.run_sync(crud.set_password_hash, db_user.id, new_hash)
     token = create_jwt(db_user)
     return AuthResponse(
         token=token,
@@ -56,16 +73,21 @@ def login(email: str, password: str, db: Session = Depends(get_db)):
     )
 
 def create_jwt(user: models.User) -> str:
-    secret = os.getenv("JWT_SECRET", "dev-secret")
-    algo = os.getenv("JWT_ALGORITHM", "HS256")
-    expires_minutes = int(os.getenv("JWT_EXPIRES_MIN", "120"))
-    payload = {
-        "sub": str(user.id),
-        "email": user.email,
-        "exp": datetime.utcnow() + timedelta(minutes=expires_minutes),
-        "iat": datetime.utcnow(),
-    }
-    return jwt.encode(payload, secret, algorithm=algo)
+    return keyring.sign({"sub": str(user.id), "email": user.email})
+
+@router.get("/me", response_model=schemas.UserResponse)
+async def me(user_id: int = Depends(current_user_id), db: AsyncSession = Depends(get_async_db)):
+    user = await db.get(models.User, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return schemas.UserResponse(
+        id=user.id,
+        name=user.name,
+        email=user.email,
+        xp=user.xp or 0,
+        streak=user.streak or 0,
+        badges=user.badges or [],
+    )
 
 
 @router.post("/google", response_model=AuthResponse)
@@ -74,17 +96,12 @@ def google_auth(body: GoogleAuthRequest, db: Session = Depends(get_db)):
     if not client_id:
         raise HTTPException(status_code=500, detail="GOOGLE_CLIENT_ID not configured")
     try:
-        # Lazy import to avoid hard dependency on 'requests' at startup
-        try:
-            from google.auth.transport import requests as google_requests  # type: ignore
-            request_adapter = google_requests.Request()
-        except Exception:
-            # Fallback: if transport isn't available, surface a clear error when endpoint is used
-            raise HTTPException(status_code=503, detail="Google auth transport not available. Install 'requests' or disable Google login.")
-
-        idinfo = google_id_token.verify_oauth2_token(body.id_token, request_adapter, client_id)
+        # Signing keys come from a cache that honours the key server's max-age
+        idinfo = google_tokens.verify(body.id_token, client_id)
         email = idinfo.get("email")
         name = idinfo.get("name") or email.split("@")[0]
+    except CertFetchError as e:
+        raise HTTPException(status_code=503, detail=f"Google signing keys unavailable: {e}")
     except Exception as e:
         raise HTTPException(status_code=401, detail=f"Invalid Google token: {e}")
 
@@ -1,36 +1,30 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app import crud, models
+from app import models
+from app.utils.gamification import gamification
+from app.utils.jwt_keys import authorize_user
+from app.utils.leaderboard_index import leaderboard_index
+from app.utils.response_cache import user_responses
 
 router = APIRouter()
 
-BADGE_RULES = [
-    {"name": "Beginner", "xp": 50},
-    {"name": "Scholar", "xp": 200},
-    {"name": "Master", "xp": 500},
-    {"name": "Streaker", "streak": 7}
-]
+@router.get("/user-badges/{user_id}", dependencies=[Depends(authorize_user)])
+def get_user_badges(user_id: int, request: Request, db: Session = Depends(get_db)):
+    cached = user_responses.lookup(request, user_id, "badges")
+    if cached.response:
+        return cached.response
 
-@router.get("/user-badges/{user_id}")
-def get_user_badges(user_id: int, db: Session = Depends(get_db)):
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
         return {"error": "User not found"}
-    
-    badges = user.badges or []
-    earned_badges = []
 
-    # Check XP-based badges
-    for rule in BADGE_RULES:
-        if "xp" in rule and user.xp >= rule["xp"] and rule["name"] not in badges:
-            badges.append(rule["name"])
-            earned_badges.append(rule["name"])
-        elif "streak" in rule and user.streak >= rule["streak"] and rule["name"] not in badges:
-            badges.append(rule["name"])
-            earned_badges.append(rule["name"])
+    # Award anything the user's XP / streak already qualifies for
+    progress = gamification.apply(user, activity=False)
+    if progress["new_badges"]:
+        db.commit()
+        leaderboard_index.update_user(user)
+        user_responses.invalidate_user(user_id)  # other endpoints show badges too
+        return {"user_id": user_id, "badges": progress["badges"], "newly_earned": progress["new_badges"]}
 
-    user.badges = badges
-    db.commit()
-    
-    return {"user_id": user_id, "badges": badges, "newly_earned": earned_badges}
+    return cached.store({"user_id": user_id, "badges": progress["badges"], "newly_earned": []})
@@ -1,42 +1,45 @@
-from fastapi import APIRouter, HTTPException
-from app.database import get_db_connection
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
+from app.models import User, UserSubjectStats
 from app.schemas import DashboardResponse, SubjectStats
+from app.utils.jwt_keys import authorize_user
+from app.utils.response_cache import user_responses
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
-@router.get("/{user_id}", response_model=DashboardResponse)
-def get_dashboard(user_id: int):
-    conn = get_db_connection()
-    cur = conn.cursor()
+@router.get("/{user_id}", response_model=DashboardResponse, dependencies=[Depends(authorize_user)])
+async def get_dashboard(user_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    cached = user_responses.lookup(request, user_id, "dashboard")
+    if cached.response:
+        return cached.response
 
-    cur.execute("SELECT xp, streak, badges FROM users WHERE id = ?", (user_id,))
-    user = cur.fetchone()
+    user = (await db.execute(
+        select(User.xp, User.streak, User.badges).where(User.id == user_id)
+    )).first()
     if not user:
-        conn.close()
         raise HTTPException(status_code=404, detail="User not found")
 
-    badges = user["badges"].split(",") if user["badges"] else []
-
-    cur.execute("""
-        SELECT subject, COUNT(*) as total_questions, SUM(correct) as correct_answers
-        FROM quiz_logs
-        WHERE user_id = ?
-        GROUP BY subject
-    """, (user_id,))
+    # Pre-aggregated per-subject rollup (primary-key lookup)
+    rows = (await db.execute(
+        select(UserSubjectStats.subject, UserSubjectStats.total_questions, UserSubjectStats.correct_answers)
+        .where(UserSubjectStats.user_id == user_id)
+        .order_by(UserSubjectStats.subject)
+    )).all()
     subject_stats = []
-    for row in cur.fetchall():
-        accuracy = row["correct_answers"] / row["total_questions"] if row["total_questions"] else 0
+    for row in rows:
+        accuracy = row.correct_answers / row.total_questions if row.total_questions else 0
         subject_stats.append(SubjectStats(
-            subject=row["subject"],
-            total_questions=row["total_questions"],
-            correct_answers=row["correct_answers"],
+            subject=row.subject,
+            total_questions=row.total_questions,
+            correct_answers=row.correct_answers,
             accuracy=round(accuracy * 100, 2)
         ))
 
-    conn.close()
-    return DashboardResponse(
-        xp=user["xp"],
-        streak=user["streak"],
-        badges=badges,
+    return cached.store(DashboardResponse(
+        xp=user.xp,
+        streak=user.streak,
+        badges=user.badges or [],
         subject_stats=subject_stats
-    )
+    ))
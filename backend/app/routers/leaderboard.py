@@ -1,28 +1,52 @@
-from fastapi import APIRouter
-from app.database import get_db_connection
-from app.schemas import LeaderboardResponse, LeaderboardUser
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from app.database import SessionLocal
+from app.schemas import (
+    LeaderboardResponse,
+    LeaderboardUser,
+    UserRankResponse,
+    WindowedLeaderboardResponse,
+    WindowedLeaderboardUser,
+)
+from app.utils.leaderboard_index import leaderboard_index
+from app.utils.windowed_boards import WINDOWS, windowed_boards
 
 router = APIRouter(prefix="/leaderboard", tags=["Leaderboard"])
 
+# Served from memory: the indexes are warmed at startup. If one is not (yet),
+# it is loaded on the threadpool so the event loop never runs the query.
+async def ensure_warm(*indexes):
+    for index in indexes:
+        if not index.warmed:
+            await run_in_threadpool(index.ensure_warm, SessionLocal)
+
 @router.get("/", response_model=LeaderboardResponse)
-def get_leaderboard(top_n: int = 5):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT id, name, xp, streak, badges
-        FROM users
-        ORDER BY xp DESC, streak DESC
-        LIMIT ?
-    """, (top_n,))
-    users = []
-    for row in cur.fetchall():
-        badges = row["badges"].split(",") if row["badges"] else []
-        users.append(LeaderboardUser(
-            user_id=row["id"],
-            name=row["name"],
-            xp=row["xp"],
-            streak=row["streak"],
-            badges=badges
-        ))
-    conn.close()
+async def get_leaderboard(top_n: int = 5):
+    await ensure_warm(leaderboard_index)
+    users = [LeaderboardUser(**entry) for entry in leaderboard_index.top(top_n)]
     return LeaderboardResponse(top_users=users)
+
+@router.get("/rank/{user_id}", response_model=UserRankResponse)
+async def get_user_rank(user_id: int, radius: int = 2):
+    await ensure_warm(leaderboard_index)
+    rank = leaderboard_index.rank(user_id)
+    if rank is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    neighbours = [LeaderboardUser(**entry) for entry in leaderboard_index.around(user_id, radius)]
+    return UserRankResponse(
+        user_id=user_id,
+        rank=rank,
+        total_users=len(leaderboard_index),
+        neighbours=neighbours
+    )
+
+@router.get("/board", response_model=WindowedLeaderboardResponse)
+async def get_windowed_leaderboard(window: str = "weekly", subject: str = None, top_n: int = 10):
+    if window not in WINDOWS:
+        raise HTTPException(status_code=400, detail=f"window must be one of {', '.join(WINDOWS)}")
+    await ensure_warm(leaderboard_index, windowed_boards)
+    users = [
+        WindowedLeaderboardUser(name=leaderboard_index.name_of(entry["user_id"]), **entry)
+        for entry in windowed_boards.top(window, subject, top_n)
+    ]
+    return WindowedLeaderboardResponse(window=window, subject=subject, top_users=users)
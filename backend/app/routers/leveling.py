@@ -1,33 +1,76 @@
-from fastapi import APIRouter, Depends, HTTPException
+from bisect import bisect_right
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app import models
+from app import models, schemas
+from app.utils.jwt_keys import authorize_user, check_users, current_user_id
+from app.utils.response_cache import user_responses
 
 router = APIRouter()
 
 LEVEL_XP_THRESHOLDS = [0, 50, 150, 300, 500, 800]  # Example thresholds for levels 1-6
 
+PROGRESSION_FIELDS = ["user_id", "xp", "level", "xp_to_next_level", "streak", "badges"]
+
 def calculate_level(xp: int):
-    level = 1
-    for threshold in LEVEL_XP_THRESHOLDS:
-        if xp >= threshold:
-            level += 1
-    return level - 1
-
-@router.get("/level/{user_id}")
-def get_user_level(user_id: int, db: Session = Depends(get_db)):
+    # thresholds already reached
+    return bisect_right(LEVEL_XP_THRESHOLDS, xp or 0)
+
+def xp_to_next_level(xp: int, level: int):
+    return LEVEL_XP_THRESHOLDS[level] - (xp or 0) if level < len(LEVEL_XP_THRESHOLDS) else 0
+
+@router.get("/level/{user_id}", dependencies=[Depends(authorize_user)])
+def get_user_level(user_id: int, request: Request, db: Session = Depends(get_db)):
+    cached = user_responses.lookup(request, user_id, "level")
+    if cached.response:
+        return cached.response
+
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     level = calculate_level(user.xp)
-    next_level_xp = next((t for t in LEVEL_XP_THRESHOLDS if t > user.xp), None)
-    xp_to_next_level = next_level_xp - user.xp if next_level_xp else 0
 
-    return {
+    return cached.store({
         "user_id": user.id,
         "xp": user.xp,
         "level": level,
-        "xp_to_next_level": xp_to_next_level,
+        "xp_to_next_level": xp_to_next_level(user.xp, level),
         "badges": user.badges
+    })
+
+# -------------------------
+# Batch progression (teacher views)
+# -------------------------
+@router.post("/batch")
+def get_progression_batch(payload: schemas.ProgressionBatchRequest, db: Session = Depends(get_db),
+                          caller_id: int = Depends(current_user_id)):
+    """
+    XP, level, streak and badges for up to 500 users from one IN (...) query.
+    Rows are positional to keep the payload small; see "fields". Unknown ids are listed in "missing".
+    Needs a token; only TEACHER_USER_IDS may ask for users other than themselves.
+    """
+    user_ids = list(dict.fromkeys(payload.user_ids))
+    check_users(caller_id, user_ids)
+    rows = {
+        row.id: row
+        for row in db.query(models.User.id, models.User.xp, models.User.streak, models.User.badges)
+        .filter(models.User.id.in_(user_ids))
+    }
+    found = [user_id for user_id in user_ids if user_id in rows]
+
+    # One vectorized bisect for the whole batch
+    xps = np.fromiter((rows[user_id].xp or 0 for user_id in found), dtype=np.int64, count=len(found))
+    levels = np.searchsorted(LEVEL_XP_THRESHOLDS, xps, side="right")
+    next_thresholds = np.append(LEVEL_XP_THRESHOLDS, 0)[levels]
+    to_next = np.where(levels < len(LEVEL_XP_THRESHOLDS), next_thresholds - xps, 0)
+
+    return {
+        "fields": PROGRESSION_FIELDS,
+        "users": [
+            [user_id, xp, level, next_xp, rows[user_id].streak or 0, rows[user_id].badges or []]
+            for user_id, xp, level, next_xp in zip(found, xps.tolist(), levels.tolist(), to_next.tolist())
+        ],
+        "missing": [user_id for user_id in user_ids if user_id not in rows],
     }
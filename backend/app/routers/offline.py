@@ -1,43 +1,175 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app import models
+from app import models, schemas
 from app.database import get_db
+from app.utils.jwt_keys import authorize_user
+from app.utils.question_packs import question_packs
 
 router = APIRouter()
 
-@router.post("/sync/{user_id}")
+MAX_SYNC_PAGE = 500
+
+def serialize(a: models.QuizLog) -> dict:
+    return {
+        "id": a.id,
+        "question_id": a.question_id,
+        "chosen_answer": a.chosen_answer,
+        "correct": a.correct,
+        "response_time": a.response_time,
+        "subject": a.subject,
+        "difficulty": a.difficulty,
+        "timestamp": a.timestamp.isoformat() if a.timestamp else None
+    }
+
+def mark_synced(db: Session, user_id: int, ids: list) -> int:
+    """One bulk UPDATE ... WHERE id IN (...); returns how many rows flipped."""
+    return db.execute(
+        update(models.QuizLog)
+        .where(models.QuizLog.user_id == user_id, models.QuizLog.id.in_(ids), models.QuizLog.synced == False)
+        .values(synced=True)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+@router.post("/sync/{user_id}", dependencies=[Depends(authorize_user)])
 def sync_offline_attempts(user_id: int, db: Session = Depends(get_db)):
     """
     Sync all unsynced offline quiz attempts for a user.
     - Marks them as synced
     - Returns them to frontend
+    Large backlogs should use the paged /sync/{user_id}/pending + /ack protocol.
     """
     attempts = db.query(models.QuizLog).filter(
         models.QuizLog.user_id == user_id,
         models.QuizLog.synced == False
-    ).all()
+    ).order_by(models.QuizLog.id).all()
 
     if not attempts:
         raise HTTPException(status_code=404, detail="No offline attempts to sync")
 
     # Mark attempts as synced
-    for attempt in attempts:
-        attempt.synced = True
+    synced_attempts = [serialize(a) for a in attempts]
+    mark_synced(db, user_id, [a.id for a in attempts])
     db.commit()
 
     return {
         "message": f"{len(attempts)} attempts synced successfully.",
-        "synced_attempts": [ 
-            {
-                "id": a.id,
-                "question_id": a.question_id,
-                "chosen_answer": a.chosen_answer,
-                "correct": a.correct,
-                "response_time": a.response_time,
-                "subject": a.subject,
-                "difficulty": a.difficulty,
-                "timestamp": a.timestamp.isoformat() if hasattr(a, "timestamp") else None
-            }
-            for a in attempts
-        ]
+        "synced_attempts": synced_attempts
+    }
+
+# -------------------------
+# Chunked, resumable sync
+# -------------------------
+# 1. GET  /sync/{user_id}/pending?after=<id>  -> one page of unsynced logs, oldest first
+# 2. POST /sync/{user_id}/ack {idempotency_key, ids} once the page is stored on the device
+# Unacknowledged rows stay pending, so a dropped connection just resumes from the
+# last acknowledged page; replaying an ack with the same key returns the original result.
+@router.get("/sync/{user_id}/pending", dependencies=[Depends(authorize_user)])
+def pending_offline_attempts(
+    user_id: int,
+    after: int = None,
+    limit: int = Query(MAX_SYNC_PAGE, ge=1, le=MAX_SYNC_PAGE),
+    db: Session = Depends(get_db),
+):
+    cursor = db.get(models.SyncCursor, user_id)
+    pending = db.query(models.QuizLog).filter(
+        models.QuizLog.user_id == user_id,
+        models.QuizLog.synced == False
+    )
+    remaining = pending.with_entities(func.count(models.QuizLog.id)).scalar()
+    if after is not None:
+        pending = pending.filter(models.QuizLog.id > after)
+    logs = pending.order_by(models.QuizLog.id).limit(limit + 1).all()
+    has_more = len(logs) > limit
+    logs = logs[:limit]
+
+    return {
+        "user_id": user_id,
+        "last_acked_id": cursor.last_acked_id if cursor else 0,
+        "remaining": remaining,
+        "attempts": [serialize(a) for a in logs],
+        "next_after": logs[-1].id if has_more else None
     }
+
+@router.post("/sync/{user_id}/ack", dependencies=[Depends(authorize_user)])
+def ack_offline_attempts(user_id: int, payload: schemas.SyncAckRequest, db: Session = Depends(get_db)):
+    if len(payload.ids) > MAX_SYNC_PAGE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SYNC_PAGE} ids per acknowledgement")
+
+    replay = db.get(models.SyncAck, (user_id, payload.idempotency_key))
+    if replay:
+        return replay.response
+
+    acknowledged = mark_synced(db, user_id, payload.ids) if payload.ids else 0
+
+    cursor = db.get(models.SyncCursor, user_id)
+    if cursor is None:
+        cursor = models.SyncCursor(user_id=user_id, last_acked_id=0)
+        db.add(cursor)
+    if payload.ids:
+        # only ids that really are this user's logs move the cursor
+        highest = db.query(func.max(models.QuizLog.id)).filter(
+            models.QuizLog.user_id == user_id, models.QuizLog.id.in_(payload.ids)
+        ).scalar()
+        cursor.last_acked_id = max(cursor.last_acked_id or 0, highest or 0)
+    cursor.updated_at = datetime.utcnow()
+
+    response = {
+        "user_id": user_id,
+        "idempotency_key": payload.idempotency_key,
+        "acknowledged": acknowledged,
+        "last_acked_id": cursor.last_acked_id
+    }
+    # The key is recorded in the same transaction as the UPDATE: either both land or neither
+    db.add(models.SyncAck(user_id=user_id, idempotency_key=payload.idempotency_key, response=response))
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent retry with the same key won the race; return its result
+        db.rollback()
+        replay = db.get(models.SyncAck, (user_id, payload.idempotency_key))
+        if replay:
+            return replay.response
+        raise HTTPException(status_code=409, detail="Concurrent acknowledgement, retry")
+    return response
+
+# -------------------------
+# Question packs (download for offline use)
+# -------------------------
+@router.get("/packs")
+def list_question_packs(db: Session = Depends(get_db)):
+    """Every (subject, difficulty) pack with its size and current version."""
+    packs = {}
+    for subject, difficulty, count, version in db.query(
+        models.Question.subject, models.Question.difficulty,
+        func.count(models.Question.id), func.max(models.Question.revision)
+    ).group_by(models.Question.subject, models.Question.difficulty):
+        packs[(subject, difficulty)] = {"subject": subject, "difficulty": difficulty,
+                                        "questions": count, "version": version or 0}
+    for subject, difficulty, version in db.query(
+        models.QuestionTombstone.subject, models.QuestionTombstone.difficulty, func.max(models.QuestionTombstone.revision)
+    ).group_by(models.QuestionTombstone.subject, models.QuestionTombstone.difficulty):
+        pack = packs.setdefault((subject, difficulty), {"subject": subject, "difficulty": difficulty,
+                                                        "questions": 0, "version": 0})
+        pack["version"] = max(pack["version"], version)
+    return {"packs": list(packs.values())}
+
+@router.get("/packs/{subject}/{difficulty}")
+def download_question_pack(subject: str, difficulty: str, request: Request, since: int = Query(0, ge=0),
+                           db: Session = Depends(get_db)):
+    """
+    msgpack question pack. Pass the version of the pack already on the device
+    as `since` to get only what changed (new/edited questions and deleted ids).
+    """
+    pack = question_packs.get(db, subject, difficulty, since)
+    if not pack.version:
+        raise HTTPException(status_code=404, detail="No questions for this subject and difficulty")
+
+    headers = {"ETag": pack.etag, "X-Pack-Version": str(pack.version), "Vary": "Accept-Encoding"}
+    if pack.etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        return Response(pack.gzipped, media_type="application/msgpack", headers={**headers, "Content-Encoding": "gzip"})
+    return Response(pack.raw, media_type="application/msgpack", headers=headers)
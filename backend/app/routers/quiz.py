@@ -1,19 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
-from typing import List
+from typing import Dict, List, Optional
 from app import crud, schemas, models
 from app.database import get_db
-from app.utils.gamification import calculate_quiz_xp, update_gamification_for_user
+from app.utils.answer_key import answer_key
+from app.utils.batch_grading import grade_offline_batch
+from app.utils.gamification import calculate_quiz_xp, gamification
+from app.utils.jwt_keys import check_user, token_claims
+from app.utils.leaderboard_index import leaderboard_index
+from app.utils.log_buffer import quiz_log_buffer
+from app.utils.response_cache import user_responses
+from app.utils.timing_detector import timing_detector
+from app.utils.windowed_boards import windowed_boards
 
 router = APIRouter(prefix="/quiz", tags=["Quiz"])
 
-# XP calculation
-def calculate_xp(score: int, total_questions: int, fast_answers: int = 0):
-    base_xp = score * 10
-    bonus_xp = fast_answers * 5
-    return base_xp + bonus_xp
-
 # Determine next difficulty
 def get_next_difficulty(current_difficulty: str, accuracy: float):
     if accuracy >= 0.8:
@@ -27,49 +28,56 @@ def get_next_difficulty(current_difficulty: str, accuracy: float):
 # Online quiz submission
 # -------------------------
 @router.post("/submit", response_model=schemas.SubmitQuizResponse)
-def submit_quiz(payload: schemas.SubmitQuizRequest, db: Session = Depends(get_db)):
-    # Fetch correct answers
-    questions = crud.get_questions(db, payload.subject, payload.current_difficulty, limit=len(payload.answers))
-    correct_answers = {q.id: q.correct_answer for q in questions}
-
-    # Calculate score and fast answers
-    score = 0
-    fast_answers_count = 0
-    for ans in payload.answers:
-        if ans.question_id in correct_answers and ans.chosen_answer == correct_answers[ans.question_id]:
-            score += 1
-            fast_answers_count += 1  # optional
-
+def submit_quiz(payload: schemas.SubmitQuizRequest, db: Session = Depends(get_db),
+                claims: Optional[Dict] = Depends(token_claims)):
+    # A plain def on purpose: grading, gamification, the ORM writes and (with
+    # write-behind) the spool fsync all block, so they belong on the threadpool,
+    # not on the event loop.
+    check_user(claims, payload.user_id)
+    return _submit_quiz(db, payload)
+
+def _submit_quiz(db: Session, payload: schemas.SubmitQuizRequest):
+    # Correct answers come from the cached answer key
+    correct_answers = answer_key.lookup(db, (ans.question_id for ans in payload.answers))
+
+    # Calculate score
+    correct_flags = [
+        ans.question_id in correct_answers and ans.chosen_answer == correct_answers[ans.question_id]
+        for ans in payload.answers
+    ]
+    score = sum(correct_flags)
     total_questions = len(payload.answers)
     accuracy = score / total_questions if total_questions > 0 else 0
-    xp_gained = calculate_xp(score, total_questions, fast_answers_count)
 
     # Fetch user
     user = db.query(models.User).filter(models.User.id == payload.user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Update streak
-    today = datetime.now().date()
-    last_quiz_date = user.last_quiz_date
-    if last_quiz_date and last_quiz_date == today - timedelta(days=1):
-        user.streak += 1
-    elif last_quiz_date != today:
-        user.streak = 1  # reset streak
-
-    # Update XP and badges
-    user.xp += xp_gained
-    badges = user.badges or []
-    if user.xp >= 50 and "Beginner" not in badges:
-        badges.append("Beginner")
-    if user.xp >= 200 and "Scholar" not in badges:
-        badges.append("Scholar")
-    user.badges = badges
-    user.last_quiz_date = today
+    # Correct answers given implausibly fast for their question cost XP
+    fast_flags = timing_detector.observe_many((ans.question_id, ans.response_time) for ans in payload.answers)
+    fast_flag_count = sum(1 for fast, correct in zip(fast_flags, correct_flags) if fast and correct)
+    xp_gained = calculate_quiz_xp(score, total_questions, fast_flag_count=fast_flag_count)
+
+    # Log each answer (also feeds the windowed leaderboards)
+    crud.log_quiz_answers(db, user.id, payload.subject, payload.current_difficulty, [
+        {
+            "question_id": ans.question_id,
+            "chosen_answer": ans.chosen_answer,
+            "correct": correct,
+            "response_time": ans.response_time or 0,
+        }
+        for ans, correct in zip(payload.answers, correct_flags)
+    ])
+
+    # XP, streak and badges
+    gamification.apply(user, xp_gained)
 
     # Commit updates
     db.commit()
     db.refresh(user)
+    leaderboard_index.update_user(user)
+    user_responses.invalidate_user(user.id)
 
     # Determine next difficulty
     next_difficulty = get_next_difficulty(payload.current_difficulty, accuracy)
@@ -86,63 +94,48 @@ def submit_quiz(payload: schemas.SubmitQuizRequest, db: Session = Depends(get_db
 # Offline batch submission
 # -------------------------
 @router.post("/submit-offline", response_model=schemas.SubmitOfflineResponse)
-def submit_offline_quizzes(payload: schemas.SubmitOfflineRequest, db: Session = Depends(get_db)):
+def submit_offline_quizzes(payload: schemas.SubmitOfflineRequest, db: Session = Depends(get_db),
+                           claims: Optional[Dict] = Depends(token_claims)):
+    check_user(claims, payload.user_id)
     user = db.query(models.User).filter(models.User.id == payload.user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    total_xp = 0
-    next_difficulties = []
-    badges = user.badges or []
-
-    for quiz in payload.quizzes:
-        # Fetch correct answers
-        questions = crud.get_questions(db, quiz.subject, quiz.current_difficulty, limit=len(quiz.answers))
-        correct_answers = {q.id: q.correct_answer for q in questions}
-
-        # Calculate score
-        score = sum(1 for ans in quiz.answers if ans.question_id in correct_answers and ans.chosen_answer == correct_answers[ans.question_id])
-        total_questions = len(quiz.answers)
-        accuracy = score / total_questions if total_questions > 0 else 0
-
-        # XP calculation
-        xp_gained = score * 10
-        total_xp += xp_gained
-
-        # Determine next difficulty
-        next_diff = get_next_difficulty(quiz.current_difficulty, accuracy)
-        next_difficulties.append(next_diff)
-
-        # Log each answer
-        for ans in quiz.answers:
-            db.add(models.QuizLog(
-                user_id=user.id,
-                question_id=ans.question_id,
-                chosen_answer=ans.chosen_answer,
-                correct=int(ans.chosen_answer == correct_answers.get(ans.question_id)),
-                response_time=5,  # offline assumed
-                subject=quiz.subject,
-                difficulty=quiz.current_difficulty
-            ))
-
-    # Update user stats
-    user.xp += total_xp
-    user.streak = user.streak + 1 if user.streak else 1  # simple streak update
-
-    # Update badges
-    if user.xp >= 50 and "Beginner" not in badges:
-        badges.append("Beginner")
-    if user.xp >= 200 and "Scholar" not in badges:
-        badges.append("Scholar")
-    user.badges = badges
+    # Grade the whole upload in one vectorized pass against the cached answer key
+    correct_answers = answer_key.lookup(db, (ans.question_id for quiz in payload.quizzes for ans in quiz.answers))
+    graded = grade_offline_batch(payload, correct_answers)
+    quiz_scores = graded.scores.tolist()
+
+    # XP calculation: same rule as online quizzes (no timing penalty, offline times aren't measured)
+    total_xp = sum(calculate_quiz_xp(score, len(quiz.answers)) for quiz, score in zip(payload.quizzes, quiz_scores))
+
+    # Determine next difficulties
+    next_difficulties = [
+        get_next_difficulty(quiz.current_difficulty, accuracy)
+        for quiz, accuracy in zip(payload.quizzes, graded.accuracies().tolist())
+    ]
+
+    # Log every answer with a single bulk insert (or hand them to the write-behind queue)
+    log_rows = graded.log_rows(user.id, payload)
+    if quiz_log_buffer.active:
+        quiz_log_buffer.submit(log_rows)
+    else:
+        crud.write_quiz_logs(db, log_rows)
+
+    # XP, streak and badges
+    progress = gamification.apply(user, total_xp)
 
     db.commit()
     db.refresh(user)
+    leaderboard_index.update_user(user)
+    user_responses.invalidate_user(user.id)
+    for quiz, score in zip(payload.quizzes, quiz_scores):
+        windowed_boards.record(user.id, quiz.subject, score, len(quiz.answers))
 
     return schemas.SubmitOfflineResponse(
         total_xp_gained=total_xp,
         new_streak=user.streak,
-        badges_unlocked=badges,
+        badges_unlocked=progress["badges"],
         next_difficulties=next_difficulties
     )
 
@@ -150,23 +143,11 @@ def submit_offline_quizzes(payload: schemas.SubmitOfflineRequest, db: Session =
 # Batch quiz submission (alternative endpoint)
 # -------------------------
 @router.post("/offline/submit")
-def submit_offline_batch(batch: schemas.BatchQuizSubmissionSchema, db: Session = Depends(get_db)):
-    response_data = []
-
-    for attempt in batch.attempts:
-        # Check if attempt already exists
-        existing = crud.get_quiz_attempt(db, user_id=attempt.user_id, quiz_id=attempt.quiz_id)
-        if existing:
-            response_data.append({"quiz_id": attempt.quiz_id, "status": "already_submitted"})
-            continue
-
-        # Save quiz attempt
-        quiz_db = crud.create_quiz_attempt(db, attempt)
-
-        # Save question attempts
-        for question in attempt.questions:
-            crud.create_question_attempt(db, quiz_id=quiz_db.id, question=question)
-
-        response_data.append({"quiz_id": attempt.quiz_id, "status": "submitted"})
-
+def submit_offline_batch(batch: schemas.BatchQuizSubmissionSchema, db: Session = Depends(get_db),
+                         claims: Optional[Dict] = Depends(token_claims)):
+    for user_id in {attempt.user_id for attempt in batch.attempts}:
+        check_user(claims, user_id)
+    # One dedupe query, bulk inserts and a single commit for the whole batch
+    response_data = crud.bulk_create_quiz_attempts(db, batch.attempts)
+    user_responses.invalidate(attempt.user_id for attempt in batch.attempts)
     return {"message": "Batch submission complete", "results": response_data}
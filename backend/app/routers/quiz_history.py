@@ -1,27 +1,101 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
+import base64
+import json
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import AsyncSessionLocal, get_async_db
 from app import models
+from app.utils.jwt_keys import authorize_user
 
 router = APIRouter()
 
-@router.get("/quiz-history/{user_id}")
-def quiz_history(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+MAX_PAGE_SIZE = 500
+STREAM_CHUNK = 500
+
+# History is ordered newest first on (timestamp, id), then rows without a
+# timestamp by id. The two parts are paged as separate phases so each page is
+# one seek on the (user_id, timestamp, id) index: a row-value comparison for
+# dated rows, `timestamp IS NULL AND id < ?` for the undated tail.
+def encode_cursor(log: models.QuizLog) -> str:
+    raw = f"{log.timestamp.isoformat() if log.timestamp else ''}|{log.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        ts, log_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return (datetime.fromisoformat(ts) if ts else None), int(log_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def history_queries(user_id: int, subject: str = None, difficulty: str = None, cursor: str = None) -> list:
+    """The statements to read in order from `cursor` on: dated rows, then undated ones."""
+    log = models.QuizLog
+    base = select(log).where(log.user_id == user_id)
+    if subject:
+        base = base.where(log.subject == subject)
+    if difficulty:
+        base = base.where(log.difficulty == difficulty)
+    dated = base.where(log.timestamp.isnot(None))
+    undated = base.where(log.timestamp.is_(None))
+    if cursor:
+        ts, log_id = decode_cursor(cursor)
+        if ts is None:
+            return [undated.where(log.id < log_id).order_by(log.id.desc())]
+        dated = base.where(tuple_(log.timestamp, log.id) < tuple_(ts, log_id))
+    return [dated.order_by(log.timestamp.desc(), log.id.desc()), undated.order_by(log.id.desc())]
+
+def serialize(log: models.QuizLog) -> dict:
+    return {
+        "id": log.id,
+        "question_id": log.question_id,
+        "chosen_answer": log.chosen_answer,
+        "correct": bool(log.correct),
+        "response_time": log.response_time,
+        "subject": log.subject,
+        "difficulty": log.difficulty,
+        "timestamp": log.timestamp.isoformat() if log.timestamp else None
+    }
+
+async def stream_history_ndjson(stmts):
+    # Own session: the request-scoped one is closed before a streamed body is sent.
+    async with AsyncSessionLocal() as db:
+        for stmt in stmts:
+            result = await db.stream(stmt.execution_options(yield_per=STREAM_CHUNK))
+            async for log in result.scalars():
+                yield json.dumps(serialize(log)) + "\n"
+
+@router.get("/quiz-history/{user_id}", dependencies=[Depends(authorize_user)])
+async def quiz_history(
+    user_id: int,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str = None,
+    subject: str = None,
+    difficulty: str = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    user = await db.get(models.User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    
-    logs = db.query(models.QuizLog).filter(models.QuizLog.user_id == user_id).all()
-    
-    history = []
-    for log in logs:
-        history.append({
-            "question_id": log.question_id,
-            "chosen_answer": log.chosen_answer,
-            "correct": bool(log.correct),
-            "response_time": log.response_time,
-            "subject": log.subject,
-            "difficulty": log.difficulty
-        })
-    
-    return {"user_id": user_id, "quiz_history": history}
+
+    stmts = history_queries(user_id, subject, difficulty, cursor)
+
+    if format == "ndjson":
+        # Every matching row (from the cursor on), streamed from a server-side cursor
+        return StreamingResponse(stream_history_ndjson(stmts), media_type="application/x-ndjson")
+
+    logs = []
+    for stmt in stmts:
+        logs += (await db.execute(stmt.limit(limit + 1 - len(logs)))).scalars().all()
+        if len(logs) > limit:
+            break
+    has_more = len(logs) > limit
+    logs = logs[:limit]
+
+    return {
+        "user_id": user_id,
+        "quiz_history": [serialize(log) for log in logs],
+        "next_cursor": encode_cursor(logs[-1]) if has_more else None
+    }
@@ -3,10 +3,11 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app import crud, schemas
+from app.utils.jwt_keys import authorize_user
 
 router = APIRouter()
 
-@router.post("/start")
+@router.post("/start", dependencies=[Depends(authorize_user)])
 def start_session(user_id: int, subject: str = None, difficulty: str = None, db: Session = Depends(get_db)):
     session = crud.create_quiz_session(db, user_id=user_id, subject=subject, difficulty=difficulty)
     return {"session_id": session.id, "message": "Session started"}
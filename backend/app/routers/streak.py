@@ -1,44 +1,30 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
 from app.database import get_db
 from app import models
+from app.utils.gamification import gamification
+from app.utils.jwt_keys import authorize_user
+from app.utils.leaderboard_index import leaderboard_index
+from app.utils.response_cache import user_responses
 
 router = APIRouter()
 
-@router.get("/streak/{user_id}")
+@router.get("/streak/{user_id}", dependencies=[Depends(authorize_user)])
 def get_streak(user_id: int, db: Session = Depends(get_db)):
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    today = datetime.now().date()
-    last_quiz_date = datetime.strptime(user.last_quiz_date, "%Y-%m-%d").date() if user.last_quiz_date else None
-
-    if last_quiz_date == today - timedelta(days=1):
-        streak = user.streak + 1
-    elif last_quiz_date == today:
-        streak = user.streak
-    else:
-        streak = 1  # reset streak
-
-    # Example reward logic
-    badges = user.badges if user.badges else []
-    if streak == 5 and "Consistent Learner" not in badges:
-        badges.append("Consistent Learner")
-    if streak == 10 and "Dedicated Scholar" not in badges:
-        badges.append("Dedicated Scholar")
-
-    # Update user
-    user.streak = streak
-    user.badges = badges
-    user.last_quiz_date = today.strftime("%Y-%m-%d")
+    # Checking in counts as today's activity
+    progress = gamification.apply(user)
     db.commit()
     db.refresh(user)
+    leaderboard_index.update_user(user)
+    user_responses.invalidate_user(user.id)
 
     return {
         "user_id": user.id,
-        "streak": streak,
-        "badges": badges,
+        "streak": user.streak,
+        "badges": progress["badges"],
         "xp": user.xp
     }
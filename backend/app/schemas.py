@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from pydantic import BaseModel
 from typing import List
@@ -34,6 +34,7 @@ class QuizSubmit(BaseModel):
 class Answer(BaseModel):
     question_id: int
     chosen_answer: str
+    response_time: Optional[float] = None   # seconds — frontend should send if available
 
 class SubmitQuizRequest(BaseModel):
     user_id: int
@@ -81,10 +82,11 @@ class QuizAttemptSchema(BaseModel):
 
 class BatchQuizSubmissionSchema(BaseModel):
     attempts: List[QuizAttemptSchema]
-class Answer(BaseModel):
-    question_id: int
-    chosen_answer: str
-    response_time: Optional[float] = None   # seconds — frontend should send if available
+
+# Chunked offline sync
+class SyncAckRequest(BaseModel):
+    idempotency_key: str = Field(..., min_length=1, max_length=64)
+    ids: List[int]
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 from datetime import date
@@ -121,6 +123,29 @@ class LeaderboardUser(BaseModel):
     xp: int
     streak: int
     badges: List[str]
+    rank: Optional[int] = None
 
 class LeaderboardResponse(BaseModel):
-    top_users: List[LeaderboardUser]
\ No newline at end of file
+    top_users: List[LeaderboardUser]
+
+class WindowedLeaderboardUser(BaseModel):
+    user_id: int
+    name: str
+    correct_answers: int
+    total_questions: int
+    accuracy: float
+    rank: int
+
+class WindowedLeaderboardResponse(BaseModel):
+    window: str
+    subject: Optional[str] = None
+    top_users: List[WindowedLeaderboardUser]
+
+class UserRankResponse(BaseModel):
+    user_id: int
+    rank: int
+    total_users: int
+    neighbours: List[LeaderboardUser]
+
+class ProgressionBatchRequest(BaseModel):
+    user_ids: List[int] = Field(..., min_length=1, max_length=500)
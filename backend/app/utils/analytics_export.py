@@ -0,0 +1,127 @@
+# app/utils/analytics_export.py
+import json
+import os
+from typing import Dict
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from app.models import Question, QuestionAttempt, QuizAttempt, QuizLog
+
+# Rows per read transaction / Parquet write. Each chunk is a short keyset read
+# (id > high-water mark), so the export never holds a long read against live writes.
+EXPORT_CHUNK = 50_000
+STATE_FILE = "_export_state.json"
+PARTITION_COLS = ["date", "subject"]
+
+QUIZ_LOGS_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("user_id", pa.int64()),
+    ("question_id", pa.int64()),
+    ("chosen_answer", pa.string()),
+    ("correct", pa.int8()),
+    ("response_time", pa.float64()),
+    ("subject", pa.string()),
+    ("difficulty", pa.string()),
+    ("timestamp", pa.timestamp("us")),
+    ("date", pa.string()),
+])
+
+QUESTION_ATTEMPTS_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("attempt_id", pa.int64()),
+    ("user_id", pa.int64()),
+    ("quiz_id", pa.int64()),
+    ("question_id", pa.int64()),
+    ("selected_option", pa.string()),
+    ("time_taken", pa.float64()),
+    ("correct", pa.bool_()),
+    ("subject", pa.string()),
+    ("timestamp", pa.timestamp("us")),
+    ("date", pa.string()),
+])
+
+# question_attempts carry neither a date nor a subject; both come from the
+# owning quiz attempt and the question.
+SOURCES = {
+    "quiz_logs": (
+        QuizLog.id,
+        select(QuizLog.id, QuizLog.user_id, QuizLog.question_id, QuizLog.chosen_answer, QuizLog.correct,
+               QuizLog.response_time, QuizLog.subject, QuizLog.difficulty, QuizLog.timestamp),
+        QUIZ_LOGS_SCHEMA,
+    ),
+    "question_attempts": (
+        QuestionAttempt.id,
+        select(QuestionAttempt.id, QuestionAttempt.quiz_id, QuizAttempt.user_id, QuizAttempt.quiz_id,
+               QuestionAttempt.question_id, QuestionAttempt.selected_option, QuestionAttempt.time_taken,
+               QuestionAttempt.correct, Question.subject, QuizAttempt.end_time)
+        .outerjoin(QuizAttempt, QuizAttempt.id == QuestionAttempt.quiz_id)
+        .outerjoin(Question, Question.id == QuestionAttempt.question_id),
+        QUESTION_ATTEMPTS_SCHEMA,
+    ),
+}
+
+
+def load_state(out_dir: str) -> Dict[str, int]:
+    path = os.path.join(out_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(out_dir: str, state: Dict[str, int]):
+    # write-then-rename so a crash never leaves a torn high-water mark
+    path = os.path.join(out_dir, STATE_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def to_arrow(rows, schema: pa.Schema) -> pa.Table:
+    columns = [list(col) for col in zip(*rows)]
+    timestamps = columns[-1]
+    columns.append([ts.date().isoformat() if ts else None for ts in timestamps])
+    return pa.Table.from_arrays(
+        [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+        schema=schema,
+    )
+
+
+def export_table(engine: Engine, out_dir: str, name: str, state: Dict[str, int], chunk: int = EXPORT_CHUNK) -> int:
+    """
+    Append rows with id > state[name] to <out_dir>/<name>/date=.../subject=.../*.parquet,
+    advancing and persisting the high-water mark after every chunk. Returns rows exported.
+    """
+    id_column, query, schema = SOURCES[name]
+    root = os.path.join(out_dir, name)
+    exported = 0
+    while True:
+        with engine.connect() as conn:
+            rows = conn.execute(
+                query.where(id_column > state.get(name, 0)).order_by(id_column).limit(chunk)
+            ).all()
+        if not rows:
+            return exported
+        # Files are named after the chunk's first id: re-running an interrupted
+        # export rewrites the same files instead of duplicating rows.
+        pq.write_to_dataset(
+            to_arrow(rows, schema), root,
+            partition_cols=PARTITION_COLS,
+            basename_template=f"part-{rows[0][0]}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        exported += len(rows)
+        state[name] = rows[-1][0]
+        save_state(out_dir, state)
+        if len(rows) < chunk:
+            return exported
+
+
+def export_all(engine: Engine, out_dir: str, chunk: int = EXPORT_CHUNK) -> Dict[str, int]:
+    """Incrementally export every source table. Returns {table: rows exported}."""
+    os.makedirs(out_dir, exist_ok=True)
+    state = load_state(out_dir)
+    return {name: export_table(engine, out_dir, name, state, chunk) for name in SOURCES}
@@ -0,0 +1,104 @@
+# app/utils/analytics_query.py
+# Dashboard / analytics aggregates computed from the Parquet export
+# (see export_analytics.py) instead of the live database.
+import os
+from typing import Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.string()), ("subject", pa.string())]), flavor="hive")
+
+
+def load(out_dir: str, name: str, columns: List[str], user_id: Optional[int] = None,
+         since: Optional[str] = None, until: Optional[str] = None) -> pa.Table:
+    """
+    Read one exported table. Date bounds ("YYYY-MM-DD", inclusive) prune whole
+    partitions; the user filter is pushed down into the Parquet scan.
+    """
+    root = os.path.join(out_dir, name)
+    if not os.path.isdir(root):
+        return pa.table({column: pa.array([]) for column in columns})
+    dataset = ds.dataset(root, format="parquet", partitioning=PARTITIONING)
+    condition = None
+    for expr in (
+        ds.field("user_id") == user_id if user_id is not None else None,
+        ds.field("date") >= since if since else None,
+        ds.field("date") <= until if until else None,
+    ):
+        if expr is not None:
+            condition = expr if condition is None else condition & expr
+    return dataset.to_table(columns=columns, filter=condition)
+
+
+def subject_stats(out_dir: str, user_id: Optional[int] = None, **bounds) -> List[Dict]:
+    """Per (user, subject) answered / correct / accuracy / mean response time, as on the dashboard."""
+    logs = load(out_dir, "quiz_logs", ["user_id", "subject", "correct", "response_time"], user_id, **bounds)
+    if not logs.num_rows:
+        return []
+    grouped = logs.group_by(["user_id", "subject"]).aggregate([
+        ("correct", "count"),
+        ("correct", "sum"),
+        ("response_time", "mean"),
+    ])
+    grouped = grouped.append_column(
+        "accuracy", pc.round(pc.multiply(pc.divide(pc.cast(grouped["correct_sum"], pa.float64()),
+                                                   grouped["correct_count"]), 100), 2)
+    )
+    return [
+        {
+            "user_id": row["user_id"],
+            "subject": row["subject"],
+            "total_questions": row["correct_count"],
+            "correct_answers": row["correct_sum"],
+            "accuracy": row["accuracy"],
+            "avg_response_time": row["response_time_mean"],
+        }
+        for row in grouped.sort_by([("user_id", "ascending"), ("subject", "ascending")]).to_pylist()
+    ]
+
+
+def user_performance(out_dir: str, user_id: int, **bounds) -> Dict:
+    """Total answers and average score for one user (as /analytics/user-performance)."""
+    correct = load(out_dir, "quiz_logs", ["correct"], user_id, **bounds)["correct"]
+    total = len(correct)
+    return {
+        "user_id": user_id,
+        "total_quizzes": total,
+        "average_score": pc.mean(correct).as_py() if total else 0,
+    }
+
+
+def daily_activity(out_dir: str, user_id: Optional[int] = None, **bounds) -> List[Dict]:
+    """Answers and accuracy per day."""
+    logs = load(out_dir, "quiz_logs", ["date", "correct"], user_id, **bounds)
+    if not logs.num_rows:
+        return []
+    grouped = logs.group_by("date").aggregate([("correct", "count"), ("correct", "mean")])
+    return [
+        {"date": row["date"], "answers": row["correct_count"], "accuracy": row["correct_mean"]}
+        for row in grouped.sort_by("date").to_pylist()
+    ]
+
+
+def question_stats(out_dir: str, **bounds) -> List[Dict]:
+    """Per question: attempts, share answered correctly and mean time, from question_attempts."""
+    attempts = load(out_dir, "question_attempts", ["question_id", "correct", "time_taken"], **bounds)
+    if not attempts.num_rows:
+        return []
+    attempts = attempts.set_column(1, "correct", pc.cast(attempts["correct"], pa.int8()))
+    grouped = attempts.group_by("question_id").aggregate([
+        ("correct", "count"),
+        ("correct", "mean"),
+        ("time_taken", "mean"),
+    ])
+    return [
+        {
+            "question_id": row["question_id"],
+            "attempts": row["correct_count"],
+            "p_correct": row["correct_mean"],
+            "mean_time": row["time_taken_mean"],
+        }
+        for row in grouped.sort_by("question_id").to_pylist()
+    ]
@@ -0,0 +1,119 @@
+# app/utils/answer_key.py
+import threading
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app.models import Question, QuestionTombstone
+
+
+class AnswerKeyCache:
+    """
+    In-process {question_id: correct_answer} map used for grading.
+
+    Warmed in bulk at startup; ids that are not cached yet are fetched in
+    one IN query and kept. Every ORM write to a question, from this or any
+    other process (seed scripts, admin tools), takes the next question-bank
+    revision, so each lookup first reads the bank revision (two index
+    seeks) and, if it moved, reloads only the questions and tombstones
+    newer than the one the cache has seen. Writes through a session in this
+    process also invalidate the touched ids on commit; every change bumps
+    `version`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._answers: Dict[int, str] = {}
+        self.revision = 0
+        self.version = 0
+        self.warmed = False
+
+    @staticmethod
+    def bank_revision(db: Session) -> int:
+        live, deleted = db.execute(select(
+            select(func.max(Question.revision)).scalar_subquery(),
+            select(func.max(QuestionTombstone.revision)).scalar_subquery(),
+        )).one()
+        return max(live or 0, deleted or 0)
+
+    def warm(self, db: Session):
+        # read the revision first: anything written meanwhile is newer and gets caught up
+        revision = self.bank_revision(db)
+        answers = {
+            question_id: correct_answer
+            for question_id, correct_answer in db.query(Question.id, Question.correct_answer).yield_per(1000)
+        }
+        with self._lock:
+            self._answers = answers
+            self.revision = revision
+            self.version += 1
+            self.warmed = True
+
+    def _catch_up(self, db: Session):
+        """Apply question writes made (by any process) since the cached revision."""
+        revision = self.bank_revision(db)
+        with self._lock:
+            seen = self.revision
+        if revision == seen:
+            return
+        deleted = [question_id for (question_id,) in db.query(QuestionTombstone.question_id).filter(
+            QuestionTombstone.revision > seen)]
+        changed = db.query(Question.id, Question.correct_answer).filter(Question.revision > seen).all()
+        with self._lock:
+            # deletes first: an id deleted and then reused is live again
+            for question_id in deleted:
+                self._answers.pop(question_id, None)
+            for question_id, correct_answer in changed:
+                self._answers[question_id] = correct_answer
+            self.revision = max(self.revision, revision)
+            self.version += 1
+
+    def invalidate(self, question_ids: Optional[Iterable[int]] = None):
+        """Drop the given ids, or everything when no ids are passed."""
+        with self._lock:
+            if question_ids is None:
+                self._answers = {}
+                self.warmed = False
+            else:
+                for question_id in question_ids:
+                    self._answers.pop(question_id, None)
+            self.version += 1
+
+    def lookup(self, db: Session, question_ids: Iterable[int]) -> Dict[int, str]:
+        """Correct answers for the requested ids; unknown ids are simply absent."""
+        self._catch_up(db)
+        wanted = set(question_ids)
+        with self._lock:
+            found = {qid: self._answers[qid] for qid in wanted if qid in self._answers}
+        missing = wanted - found.keys()
+        if missing:
+            rows = db.query(Question.id, Question.correct_answer).filter(Question.id.in_(missing)).all()
+            with self._lock:
+                for question_id, correct_answer in rows:
+                    self._answers[question_id] = correct_answer
+                    found[question_id] = correct_answer
+        return found
+
+
+answer_key = AnswerKeyCache()
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_question_writes(session, flush_context):
+    touched = session.info.setdefault("answer_key_touched", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Question) and obj.id is not None:
+            touched.add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_question_writes(session):
+    touched = session.info.pop("answer_key_touched", None)
+    if touched:
+        answer_key.invalidate(touched)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_question_writes(session):
+    session.info.pop("answer_key_touched", None)
@@ -0,0 +1,78 @@
+# app/utils/batch_grading.py
+from dataclasses import dataclass
+from typing import Dict, List
+
+import numpy as np
+
+from app import schemas
+
+
+def _answer_hash(answer) -> int:
+    # str hashes are salted per process, but both sides are hashed in-process
+    return hash(str(answer)) if answer is not None else 0
+
+
+@dataclass
+class GradedBatch:
+    """Result of grading a whole offline upload in one pass."""
+    question_ids: np.ndarray   # int64, one entry per answer, in upload order
+    correct: np.ndarray        # bool, aligned with question_ids
+    quiz_index: np.ndarray     # int64, which quiz each answer belongs to
+    scores: np.ndarray         # int64, correct answers per quiz
+    totals: np.ndarray         # int64, answers per quiz
+
+    def accuracies(self) -> np.ndarray:
+        return np.divide(self.scores, self.totals, out=np.zeros(len(self.totals)), where=self.totals > 0)
+
+    def log_rows(self, user_id: int, payload: schemas.SubmitOfflineRequest) -> List[Dict]:
+        """quiz_logs rows ready for a single bulk insert."""
+        correct = self.correct.astype(np.int8).tolist()
+        rows = []
+        i = 0
+        for quiz in payload.quizzes:
+            for ans in quiz.answers:
+                rows.append({
+                    "user_id": user_id,
+                    "question_id": ans.question_id,
+                    "chosen_answer": ans.chosen_answer,
+                    "correct": correct[i],
+                    "response_time": None,  # offline answers carry no timing
+                    "subject": quiz.subject,
+                    "difficulty": quiz.current_difficulty,
+                    "synced": True,
+                })
+                i += 1
+        return rows
+
+
+def grade_offline_batch(payload: schemas.SubmitOfflineRequest, correct_answers: Dict[int, str]) -> GradedBatch:
+    """
+    Grade every answer of every quiz at once against the answer key.
+
+    Answers are flattened into arrays of question ids and answer hashes, matched
+    to the (sorted) key with searchsorted, and summed per quiz with bincount.
+    """
+    totals = np.fromiter((len(quiz.answers) for quiz in payload.quizzes), dtype=np.int64, count=len(payload.quizzes))
+    n_answers = int(totals.sum())
+    quiz_index = np.repeat(np.arange(len(totals), dtype=np.int64), totals)
+    question_ids = np.fromiter(
+        (ans.question_id for quiz in payload.quizzes for ans in quiz.answers), dtype=np.int64, count=n_answers
+    )
+    chosen = np.fromiter(
+        (_answer_hash(ans.chosen_answer) for quiz in payload.quizzes for ans in quiz.answers),
+        dtype=np.int64, count=n_answers,
+    )
+
+    key_ids = np.fromiter(sorted(correct_answers), dtype=np.int64, count=len(correct_answers))
+    key_hashes = np.fromiter(
+        (_answer_hash(correct_answers[qid]) for qid in key_ids.tolist()), dtype=np.int64, count=len(key_ids)
+    )
+
+    if len(key_ids):
+        pos = np.minimum(np.searchsorted(key_ids, question_ids), len(key_ids) - 1)
+        correct = (key_ids[pos] == question_ids) & (key_hashes[pos] == chosen)
+    else:
+        correct = np.zeros(n_answers, dtype=bool)
+
+    scores = np.bincount(quiz_index, weights=correct, minlength=len(totals)).astype(np.int64)
+    return GradedBatch(question_ids=question_ids, correct=correct, quiz_index=quiz_index, scores=scores, totals=totals)
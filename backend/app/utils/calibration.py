@@ -0,0 +1,51 @@
+# app/utils/calibration.py
+import math
+from typing import Dict, Optional
+
+# Rasch / Elo model in logits: P(correct) = 1 / (1 + exp(difficulty - ability)).
+# Uncalibrated questions start from their hand-set label.
+DIFFICULTY_PRIOR = {"easy": -1.0, "medium": 0.0, "hard": 1.0}
+CALIBRATION_CHUNK = 5000
+
+# Step size shrinks as a learner / item accumulates answers, so estimates move
+# fast while new and settle once there is evidence behind them.
+ELO_K = 0.4
+ELO_K_DECAY = 0.05
+ELO_K_MIN = 0.04
+
+
+def expected(ability: float, difficulty: float) -> float:
+    return 1.0 / (1.0 + math.exp(difficulty - ability))
+
+
+def step_size(answers: int) -> float:
+    return max(ELO_K_MIN, ELO_K / (1 + ELO_K_DECAY * answers))
+
+
+def prior_difficulty(label: Optional[str]) -> float:
+    return DIFFICULTY_PRIOR.get(label, 0.0)
+
+
+def discrimination(answers: int, correct: int, ability_sum: float, ability_sumsq: float,
+                   correct_ability_sum: float) -> Optional[float]:
+    """Point-biserial correlation between answering correctly and the learner's ability."""
+    ability_var = answers * ability_sumsq - ability_sum * ability_sum
+    correct_var = answers * correct - correct * correct
+    if answers < 2 or ability_var <= 0 or correct_var <= 0:
+        return None
+    return (answers * correct_ability_sum - correct * ability_sum) / math.sqrt(ability_var * correct_var)
+
+
+def item_report(stats) -> Dict:
+    """API view of a QuestionStats row."""
+    answers = stats.answers
+    r = discrimination(answers, stats.correct, stats.ability_sum, stats.ability_sumsq, stats.correct_ability_sum)
+    return {
+        "question_id": stats.question_id,
+        "answers": answers,
+        "p_value": stats.correct / answers if answers else None,
+        "discrimination": round(r, 4) if r is not None else None,
+        "mean_response_time": stats.total_response_time / stats.timed_answers if stats.timed_answers else None,
+        "difficulty": round(stats.difficulty, 4),
+        "updated_at": stats.updated_at,
+    }
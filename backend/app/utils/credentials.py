@@ -0,0 +1,119 @@
+# app/utils/credentials.py
+import asyncio
+import hmac
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))  # work factor; each +1 doubles the cost
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "256"))  # queued + running jobs
+
+
+class CredentialServiceBusy(Exception):
+    """Too many hashes queued; the caller should shed the request."""
+
+
+class CredentialService:
+    """
+    bcrypt hashing and verification on a bounded thread pool.
+
+    bcrypt releases the GIL while it works, so a thread pool sized to the
+    CPUs runs hashes in parallel without blocking the event loop; at most
+    `max_pending` jobs may wait, beyond that callers get
+    CredentialServiceBusy instead of an ever-growing queue.
+
+    check() also returns a replacement hash when the stored one is stale:
+    made with another work factor, or a plaintext password from before
+    hashing was turned on (migrated on that user's next login).
+    """
+
+    def __init__(self, rounds: int = BCRYPT_ROUNDS, workers: int = PASSWORD_HASH_WORKERS,
+                 max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_pending = max_pending
+        self._context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+        # verified against when the email is unknown, so that costs as much as a wrong password
+        self._dummy_hash = self._context.hash("not a password")
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._pending = 0
+        # metrics
+        self.hashes = 0
+        self.verifications = 0
+        self.rehashes = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+
+    @staticmethod
+    def is_hashed(stored: Optional[str]) -> bool:
+        return bool(stored) and stored.startswith("$2")
+
+    def hash(self, password: str) -> str:
+        started = time.perf_counter()
+        hashed = self._context.hash(password)
+        with self._lock:
+            self.hashes += 1
+            self.total_seconds += time.perf_counter() - started
+        return hashed
+
+    def check(self, password: str, stored: Optional[str]) -> Tuple[bool, Optional[str]]:
+        """(matches, new hash to store or None). Empty stored passwords (Google accounts) never match."""
+        started = time.perf_counter()
+        new_hash = None
+        if self.is_hashed(stored):
+            ok, new_hash = self._context.verify_and_update(password, stored)
+        elif stored:
+            # legacy plaintext row
+            ok = hmac.compare_digest(password.encode(), stored.encode())
+            if ok:
+                new_hash = self._context.hash(password)
+        else:
+            self._context.verify(password, self._dummy_hash)
+            ok = False
+        with self._lock:
+            self.verifications += 1
+            self.rehashes += bool(ok and new_hash)
+            self.total_seconds += time.perf_counter() - started
+        return ok, new_hash if ok else None
+
+    async def _submit(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise CredentialServiceBusy("Password hashing queue is full")
+            self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def hash_async(self, password: str) -> str:
+        return await self._submit(self.hash, password)
+
+    async def check_async(self, password: str, stored: Optional[str]) -> Tuple[bool, Optional[str]]:
+        return await self._submit(self.check, password, stored)
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            operations = self.hashes + self.verifications
+            return {
+                "rounds": self.rounds,
+                "workers": self.workers,
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "hashes": self.hashes,
+                "verifications": self.verifications,
+                "rehashes": self.rehashes,
+                "rejected": self.rejected,
+                "avg_ms": round(self.total_seconds / operations * 1000, 3) if operations else 0.0,
+            }
+
+
+credentials = CredentialService()
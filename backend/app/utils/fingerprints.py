@@ -0,0 +1,16 @@
+# app/utils/fingerprints.py
+import hashlib
+from typing import Iterable, Optional, Tuple
+
+
+def answer_fingerprint(selections: Iterable[Tuple[int, Optional[str]]]) -> Optional[str]:
+    """
+    Stable hash of an attempt's answers: (question_id, selected_option) pairs
+    sorted by question id, so the same answer sheet always hashes the same way
+    regardless of submission order. None for an attempt with no answers.
+    """
+    ordered = sorted(selections, key=lambda pair: pair[0])
+    if not ordered:
+        return None
+    payload = "\x1e".join(f"{question_id}\x1f{option or ''}" for question_id, option in ordered)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
@@ -0,0 +1,215 @@
+# app/utils/google_certs.py
+import base64
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from google.auth import jwt as google_jwt
+
+logger = logging.getLogger(__name__)
+
+# PEM map ({kid: x509 cert}); a JWKS URL ({"keys": [...]}) works too
+GOOGLE_CERTS_URL = os.getenv("GOOGLE_CERTS_URL", "https://www.googleapis.com/oauth2/v1/certs")
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+CERTS_FETCH_TIMEOUT = float(os.getenv("GOOGLE_CERTS_TIMEOUT", "5"))  # seconds
+CERTS_DEFAULT_MAX_AGE = 300     # seconds, when the response carries no max-age
+CERTS_REFRESH_AHEAD = 0.1       # refresh in the background for the last 10% of max-age
+CERTS_RETRY_INTERVAL = 30       # after a failed fetch, keep serving the old keys this long
+CERTS_MIN_FORCED_REFRESH = 60   # unknown `kid` refetches at most this often
+
+_MAX_AGE = re.compile(r"(?:^|,)\s*max-age\s*=\s*(\d+)", re.IGNORECASE)
+
+
+class CertFetchError(Exception):
+    """No signing keys could be fetched and none are cached."""
+
+
+def parse_max_age(cache_control: str) -> Optional[int]:
+    match = _MAX_AGE.search(cache_control or "")
+    return int(match.group(1)) if match else None
+
+
+def _b64_int(value: str) -> int:
+    return int.from_bytes(base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)), "big")
+
+
+def parse_certs(document: Dict) -> Dict[str, str]:
+    """{kid: PEM} from either Google's PEM map or a JWKS document."""
+    if "keys" not in document:
+        return dict(document)
+    import rsa  # google-auth's own RSA backend
+
+    certs = {}
+    for key in document["keys"]:
+        if key.get("kty") == "RSA" and key.get("kid"):
+            certs[key["kid"]] = rsa.PublicKey(_b64_int(key["n"]), _b64_int(key["e"])).save_pkcs1().decode()
+    return certs
+
+
+class HttpCertSource:
+    """
+    Fetches signing keys over one pooled requests.Session, so refreshes reuse
+    a kept-alive TLS connection. Point `url` at a local key server in tests.
+    """
+
+    def __init__(self, url: str = GOOGLE_CERTS_URL, timeout: float = CERTS_FETCH_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._session = None
+
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=1))
+                session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=1))
+                self._session = session
+            return self._session
+
+    def fetch(self) -> Tuple[Dict[str, str], Optional[int]]:
+        """(certs, max-age in seconds or None)."""
+        response = self.session().get(self.url, timeout=self.timeout)
+        response.raise_for_status()
+        return parse_certs(response.json()), parse_max_age(response.headers.get("Cache-Control", ""))
+
+
+class GoogleCertCache:
+    """
+    Signing keys cached for the max-age the key server sends.
+
+    Once most of the max-age has passed, the next lookup starts a background
+    refresh and keeps serving the cached keys, so logins only wait on the
+    network for the very first fetch. A failed refresh keeps the old keys
+    (Google publishes new keys well before using them) and retries later.
+    `source` is anything with fetch() -> (certs, max_age).
+    """
+
+    def __init__(self, source, default_max_age: int = CERTS_DEFAULT_MAX_AGE,
+                 refresh_ahead: float = CERTS_REFRESH_AHEAD):
+        self.source = source
+        self.default_max_age = default_max_age
+        self.refresh_ahead = refresh_ahead
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self._certs: Dict[str, str] = {}
+        self._expires = 0.0
+        self._refresh_at = 0.0
+        self._fetched_at = 0.0
+        self._refreshing = False
+        # metrics
+        self.fetches = 0
+        self.failures = 0
+        self.background_refreshes = 0
+        self.last_error: Optional[str] = None
+
+    def get(self, force: bool = False) -> Dict[str, str]:
+        """
+        Cached keys; fetched inline only when there are none or they expired.
+        force=True refetches (rate-limited) for a token signed by an unknown key.
+        """
+        now = time.monotonic()
+        with self._lock:
+            certs, expires, refresh_at, fetched_at = self._certs, self._expires, self._refresh_at, self._fetched_at
+        if force and now - fetched_at < CERTS_MIN_FORCED_REFRESH:
+            force = False
+        if certs and not force and now < expires:
+            if now >= refresh_at:
+                self._refresh_in_background()
+            return certs
+        return self._refresh(now)
+
+    def _refresh(self, asked: float) -> Dict[str, str]:
+        # Single flight: callers queued behind a fetch reuse its result
+        with self._fetch_lock:
+            with self._lock:
+                if self._fetched_at >= asked and self._certs:
+                    return self._certs
+            try:
+                certs, max_age = self.source.fetch()
+            except Exception as exc:
+                return self._failed(exc)
+            now = time.monotonic()
+            max_age = self.default_max_age if max_age is None else max_age
+            with self._lock:
+                self._certs = certs
+                self._fetched_at = now
+                self._expires = now + max_age
+                self._refresh_at = now + max_age * (1 - self.refresh_ahead)
+                self.fetches += 1
+            return certs
+
+    def _failed(self, exc: Exception) -> Dict[str, str]:
+        now = time.monotonic()
+        with self._lock:
+            self.failures += 1
+            self.last_error = repr(exc)
+            if not self._certs:
+                raise CertFetchError(f"Could not fetch signing keys: {exc}") from exc
+            self._expires = max(self._expires, now + CERTS_RETRY_INTERVAL)
+            self._refresh_at = now + CERTS_RETRY_INTERVAL
+            logger.warning("Signing key refresh failed, serving cached keys: %r", exc)
+            return self._certs
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+            self.background_refreshes += 1
+
+        def run():
+            try:
+                self._refresh(time.monotonic())
+            except CertFetchError:
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name="google-certs-refresh", daemon=True).start()
+
+    def prefetch(self):
+        """Start the first fetch in the background (e.g. at startup)."""
+        self._refresh_in_background()
+
+    def metrics(self) -> Dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "keys": sorted(self._certs),
+                "expires_in": round(self._expires - now, 1) if self._certs else None,
+                "fetches": self.fetches,
+                "failed_fetches": self.failures,
+                "background_refreshes": self.background_refreshes,
+                "last_error": self.last_error,
+            }
+
+
+class GoogleTokenVerifier:
+    """verify_oauth2_token() against cached keys instead of a fetch per call."""
+
+    def __init__(self, cache: GoogleCertCache, issuers=GOOGLE_ISSUERS):
+        self.cache = cache
+        self.issuers = issuers
+
+    def verify(self, token: str, audience: str) -> Dict:
+        """Decoded claims; raises ValueError for a bad token, CertFetchError without keys."""
+        certs = self.cache.get()
+        kid = google_jwt.decode_header(token).get("kid")
+        if kid and kid not in certs:
+            # Keys rotated before our copy expired
+            certs = self.cache.get(force=True)
+        idinfo = google_jwt.decode(token, certs=certs, audience=audience)
+        if idinfo.get("iss") not in self.issuers:
+            raise ValueError(f"Wrong issuer: {idinfo.get('iss')}")
+        return idinfo
+
+
+google_tokens = GoogleTokenVerifier(GoogleCertCache(HttpCertSource()))
@@ -0,0 +1,162 @@
+# app/utils/jwt_keys.py
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JWTError, jwt
+
+logger = logging.getLogger(__name__)
+
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "4096"))  # verified tokens kept until their exp
+# Opt-in: AUTH_REQUIRED=1 rejects user routes called without a bearer token.
+# Otherwise a token is checked only when one is sent, and calls without one
+# are counted per route (/metrics/jwt) so the flag can be turned on safely.
+AUTH_REQUIRED = os.getenv("AUTH_REQUIRED", "").lower() in ("1", "true", "yes")
+# Users who may read other users' progress in bulk (teacher views), e.g. "3,17"
+TEACHER_USER_IDS = frozenset(int(v) for v in os.getenv("TEACHER_USER_IDS", "").split(",") if v.strip())
+
+
+class JWTKeyring:
+    """
+    Signing and verification keys for our own JWTs, read from the environment once.
+
+    New tokens are signed with JWT_SECRET and carry JWT_KEY_ID as `kid`.
+    JWT_VERIFY_KEYS ("kid=secret,kid2=secret2") lists older keys that are
+    still accepted, so a key can be rotated without logging everybody out:
+    move the old secret there, set a new JWT_SECRET / JWT_KEY_ID, and drop
+    the old entry once its tokens have expired. Tokens without a `kid`
+    (issued before key ids) are checked against the current key.
+
+    verify() keeps an LRU of recently verified tokens until their `exp`, so
+    a client polling with the same token pays for the signature check once.
+    Tokens without an `exp` are rejected.
+    """
+
+    def __init__(self, cache_size: int = JWT_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.unauthenticated: Dict[str, int] = {}  # route path -> calls without a token
+        self.load()
+
+    def load(self, environ=os.environ):
+        """(Re)read the keys; forgets every cached verification."""
+        key_id = environ.get("JWT_KEY_ID", "default")
+        keys = {key_id: environ.get("JWT_SECRET", "dev-secret")}
+        for entry in environ.get("JWT_VERIFY_KEYS", "").split(","):
+            kid, _, secret = entry.strip().partition("=")
+            if kid and secret:
+                keys.setdefault(kid, secret)
+        with self._lock:
+            self.key_id = key_id
+            self.algorithm = environ.get("JWT_ALGORITHM", "HS256")
+            self.expires = timedelta(minutes=int(environ.get("JWT_EXPIRES_MIN", "120")))
+            self._keys = keys
+            self._cache.clear()
+
+    def sign(self, claims: Dict) -> str:
+        with self._lock:
+            key_id, secret, algorithm, expires = self.key_id, self._keys[self.key_id], self.algorithm, self.expires
+        now = datetime.utcnow()
+        payload = {**claims, "exp": now + expires, "iat": now}
+        return jwt.encode(payload, secret, algorithm=algorithm, headers={"kid": key_id})
+
+    def verify(self, token: str) -> Dict:
+        """The token's claims; raises JWTError if it is invalid, expired or signed by an unknown key."""
+        now = time.time()
+        with self._lock:
+            cached = self._cache.get(token)
+            if cached is not None:
+                if cached[0] > now:
+                    self._cache.move_to_end(token)
+                    self.hits += 1
+                    return cached[1]
+                del self._cache[token]
+            self.misses += 1
+            keys, algorithm, key_id = self._keys, self.algorithm, self.key_id
+
+        secret = keys.get(jwt.get_unverified_header(token).get("kid", key_id))
+        if secret is None:
+            raise JWTError("Token signed with an unknown key")
+        claims = jwt.decode(token, secret, algorithms=[algorithm], options={"require_exp": True})
+        with self._lock:
+            # a load() meanwhile may have dropped that key
+            if self._keys is keys:
+                self._cache[token] = (float(claims["exp"]), claims)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return claims
+
+    def record_unauthenticated(self, path: str):
+        with self._lock:
+            first = path not in self.unauthenticated
+            self.unauthenticated[path] = self.unauthenticated.get(path, 0) + 1
+        if first:
+            logger.warning("%s called without a bearer token; AUTH_REQUIRED=1 would reject it", path)
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            return {
+                "key_id": self.key_id,
+                "verify_keys": sorted(self._keys),
+                "cached_tokens": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+                "auth_required": AUTH_REQUIRED,
+                "unauthenticated_calls": dict(self.unauthenticated),
+            }
+
+
+keyring = JWTKeyring()
+
+# -------------------------
+# FastAPI dependencies
+# -------------------------
+_bearer = HTTPBearer(auto_error=False)
+
+
+def token_claims(request: Request,
+                 credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)) -> Optional[Dict]:
+    """Claims of the request's bearer token; None when no token was sent (and AUTH_REQUIRED is off)."""
+    if credentials is None:
+        if AUTH_REQUIRED:
+            raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+        route = request.scope.get("route")
+        keyring.record_unauthenticated(route.path if route else request.url.path)
+        return None
+    try:
+        return keyring.verify(credentials.credentials)
+    except JWTError as e:
+        raise HTTPException(status_code=401, detail=f"Invalid token: {e}", headers={"WWW-Authenticate": "Bearer"})
+
+
+def current_user_id(claims: Optional[Dict] = Depends(token_claims)) -> int:
+    """The authenticated user's id; a token is required."""
+    if claims is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    return int(claims["sub"])
+
+
+def check_user(claims: Optional[Dict], user_id: int):
+    """A token, when present, may only act for its own user."""
+    if claims is not None and claims.get("sub") != str(user_id):
+        raise HTTPException(status_code=403, detail="Token does not belong to this user")
+
+
+def authorize_user(user_id: int, claims: Optional[Dict] = Depends(token_claims)):
+    """Route dependency for paths with a {user_id} parameter."""
+    check_user(claims, user_id)
+
+
+def check_users(caller_id: int, user_ids) -> None:
+    """Teachers may read any user; everyone else only themselves."""
+    if caller_id not in TEACHER_USER_IDS and any(user_id != caller_id for user_id in user_ids):
+        raise HTTPException(status_code=403, detail="Not allowed to view these users")
@@ -0,0 +1,250 @@
+# app/utils/leaderboard_index.py
+import json
+import random
+import threading
+from math import log
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models import User
+
+MAX_LEVELS = 32
+
+# Keys sort ascending in leaderboard order: highest xp first, then highest
+# streak, then lowest user id as a stable tie-breaker.
+LeaderboardKey = Tuple[int, int, int]
+
+
+def make_key(user_id: int, xp: Optional[int], streak: Optional[int]) -> LeaderboardKey:
+    return (-(xp or 0), -(streak or 0), user_id)
+
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, levels: int):
+        self.key = key
+        self.next: List[Optional["_Node"]] = [None] * levels
+        # width[level] = number of positions skipped by following next[level]
+        self.width: List[int] = [1] * levels
+
+
+class IndexableSkipList:
+    """Skip list that also tracks link widths, so position lookups are O(log n)."""
+
+    def __init__(self):
+        self.size = 0
+        self.head = _Node(None, MAX_LEVELS)
+
+    def __len__(self):
+        return self.size
+
+    def _random_levels(self) -> int:
+        return min(MAX_LEVELS, 1 - int(log(1.0 - random.random(), 2.0)))
+
+    def insert(self, key):
+        chain: List[_Node] = [self.head] * MAX_LEVELS
+        steps_at_level = [0] * MAX_LEVELS
+        node = self.head
+        for level in reversed(range(MAX_LEVELS)):
+            nxt = node.next[level]
+            while nxt is not None and nxt.key <= key:
+                steps_at_level[level] += node.width[level]
+                node = nxt
+                nxt = node.next[level]
+            chain[level] = node
+
+        levels = self._random_levels()
+        new_node = _Node(key, levels)
+        steps = 0
+        for level in range(levels):
+            prev = chain[level]
+            new_node.next[level] = prev.next[level]
+            prev.next[level] = new_node
+            new_node.width[level] = prev.width[level] - steps
+            prev.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(levels, MAX_LEVELS):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, key):
+        chain: List[_Node] = [self.head] * MAX_LEVELS
+        node = self.head
+        for level in reversed(range(MAX_LEVELS)):
+            nxt = node.next[level]
+            while nxt is not None and nxt.key < key:
+                node = nxt
+                nxt = node.next[level]
+            chain[level] = node
+
+        target = chain[0].next[0]
+        if target is None or target.key != key:
+            raise KeyError(key)
+        for level in range(len(target.next)):
+            prev = chain[level]
+            prev.width[level] += target.width[level] - 1
+            prev.next[level] = target.next[level]
+        for level in range(len(target.next), MAX_LEVELS):
+            chain[level].width[level] -= 1
+        self.size -= 1
+
+    def rank(self, key) -> int:
+        """0-based position of key (number of keys strictly smaller)."""
+        position = 0
+        node = self.head
+        for level in reversed(range(MAX_LEVELS)):
+            nxt = node.next[level]
+            while nxt is not None and nxt.key < key:
+                position += node.width[level]
+                node = nxt
+                nxt = node.next[level]
+        return position
+
+    def _node_at(self, index: int) -> _Node:
+        if index < 0 or index >= self.size:
+            raise IndexError(index)
+        remaining = index + 1
+        node = self.head
+        for level in reversed(range(MAX_LEVELS)):
+            while node.next[level] is not None and node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        return node
+
+    def slice(self, start: int, count: int) -> List:
+        """Keys at positions [start, start + count), walking the bottom level."""
+        start = max(start, 0)
+        if count <= 0 or start >= self.size:
+            return []
+        node = self._node_at(start)
+        keys = []
+        while node is not None and len(keys) < count:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+
+def _parse_badges(badges) -> List[str]:
+    if not badges:
+        return []
+    if isinstance(badges, str):
+        try:
+            parsed = json.loads(badges)
+        except ValueError:
+            return [b for b in badges.split(",") if b]
+        return parsed if isinstance(parsed, list) else []
+    return list(badges)
+
+
+class LeaderboardIndex:
+    """
+    In-process ranked view of the users table.
+
+    Warmed once from `users`, then kept current by the write paths that change
+    xp/streak (quiz submission, offline submission, streak check-in). Each
+    process keeps its own copy, so multi-worker deployments warm per worker.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._ranked = IndexableSkipList()
+        self._keys: Dict[int, LeaderboardKey] = {}
+        self._profiles: Dict[int, Dict] = {}
+        self.warmed = False
+
+    def __len__(self):
+        return len(self._ranked)
+
+    def warm(self, db: Session):
+        rows = db.query(User.id, User.name, User.xp, User.streak, User.badges).yield_per(1000)
+        with self._lock:
+            self._ranked = IndexableSkipList()
+            self._keys.clear()
+            self._profiles.clear()
+            for user_id, name, xp, streak, badges in rows:
+                self._upsert(user_id, xp, streak, name, badges)
+            self.warmed = True
+
+    def ensure_warm(self, session_factory):
+        if self.warmed:
+            return
+        with self._lock:
+            if self.warmed:
+                return
+            db = session_factory()
+            try:
+                self.warm(db)
+            finally:
+                db.close()
+
+    def _upsert(self, user_id: int, xp, streak, name=None, badges=None):
+        key = make_key(user_id, xp, streak)
+        old_key = self._keys.get(user_id)
+        if old_key != key:
+            if old_key is not None:
+                self._ranked.remove(old_key)
+            self._ranked.insert(key)
+            self._keys[user_id] = key
+        profile = self._profiles.setdefault(user_id, {"name": None, "badges": []})
+        if name is not None:
+            profile["name"] = name
+        if badges is not None:
+            profile["badges"] = _parse_badges(badges)
+
+    def update(self, user_id: int, xp, streak, name=None, badges=None):
+        with self._lock:
+            self._upsert(user_id, xp, streak, name, badges)
+
+    def update_user(self, user: User):
+        """Sync one ORM user into the index (call after commit)."""
+        self.update(user.id, user.xp, user.streak, name=user.name, badges=user.badges)
+
+    def remove(self, user_id: int):
+        with self._lock:
+            key = self._keys.pop(user_id, None)
+            if key is not None:
+                self._ranked.remove(key)
+            self._profiles.pop(user_id, None)
+
+    def _entry(self, key: LeaderboardKey, position: int) -> Dict:
+        neg_xp, neg_streak, user_id = key
+        profile = self._profiles.get(user_id, {})
+        return {
+            "user_id": user_id,
+            "name": profile.get("name") or "",
+            "xp": -neg_xp,
+            "streak": -neg_streak,
+            "badges": list(profile.get("badges") or []),
+            "rank": position + 1,
+        }
+
+    def name_of(self, user_id: int) -> str:
+        return (self._profiles.get(user_id) or {}).get("name") or ""
+
+    def top(self, n: int) -> List[Dict]:
+        with self._lock:
+            keys = self._ranked.slice(0, n)
+            return [self._entry(key, i) for i, key in enumerate(keys)]
+
+    def rank(self, user_id: int) -> Optional[int]:
+        """1-based rank of a user, or None if unknown."""
+        with self._lock:
+            key = self._keys.get(user_id)
+            if key is None:
+                return None
+            return self._ranked.rank(key) + 1
+
+    def around(self, user_id: int, radius: int = 2) -> List[Dict]:
+        """The user plus up to `radius` neighbours on either side."""
+        with self._lock:
+            key = self._keys.get(user_id)
+            if key is None:
+                return []
+            start = max(self._ranked.rank(key) - radius, 0)
+            keys = self._ranked.slice(start, 2 * radius + 1)
+            return [self._entry(k, start + i) for i, k in enumerate(keys)]
+
+
+leaderboard_index = LeaderboardIndex()
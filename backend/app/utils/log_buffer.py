@@ -0,0 +1,263 @@
+# app/utils/log_buffer.py
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: QUIZ_LOG_WRITE_BEHIND=1. Otherwise quiz_logs are written inside the request.
+WRITE_BEHIND = os.getenv("QUIZ_LOG_WRITE_BEHIND", "").lower() in ("1", "true", "yes")
+SPOOL_DIR = os.getenv("QUIZ_LOG_SPOOL_DIR", "quiz_log_spool")
+FLUSH_ROWS = int(os.getenv("QUIZ_LOG_FLUSH_ROWS", "1000"))        # size trigger
+FLUSH_INTERVAL = float(os.getenv("QUIZ_LOG_FLUSH_INTERVAL", "1"))  # time trigger, seconds
+FLUSH_RETRIES = int(os.getenv("QUIZ_LOG_FLUSH_RETRIES", "5"))      # then the batch goes to a dead-letter file
+STOP_TIMEOUT = float(os.getenv("QUIZ_LOG_STOP_TIMEOUT", "30"))     # seconds stop() waits for the last flush
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class QuizLogBuffer:
+    """
+    Write-behind queue for quiz_logs rows.
+
+    submit() appends the rows to this process's spool file (fsynced) and
+    returns; a background thread writes everything pending in one batched
+    insert per flush. The spool is swapped out before each flush and deleted
+    only after the batch commits, so a crash at any point leaves the rows on
+    disk to be replayed at the next start. Replay is at-least-once: a crash
+    between commit and delete can write that batch twice.
+
+    A batch that still fails after `flush_retries` attempts (a bad row, a
+    constraint violation) is moved to a dead_letter.*.jsonl file in the
+    spool directory for inspection, so it cannot block the batches behind it.
+    """
+
+    def __init__(self, spool_dir: str = SPOOL_DIR, flush_rows: int = FLUSH_ROWS,
+                 flush_interval: float = FLUSH_INTERVAL, enabled: bool = WRITE_BEHIND,
+                 flush_retries: int = FLUSH_RETRIES):
+        self.enabled = enabled
+        self.spool_dir = spool_dir
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.flush_retries = max(flush_retries, 1)
+        self._lock = threading.Condition()
+        self._pending: List[Dict] = []
+        self._in_flight = 0
+        self._spool = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._session_factory = None
+        self._writer: Optional[Callable] = None
+        self._on_commit: Optional[Callable] = None
+        # metrics
+        self.submitted = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.failures = 0
+        self.dead_lettered = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.total_flush_seconds = 0.0
+        self.last_error: Optional[str] = None
+
+    # -------------------------
+    # Spool files
+    # -------------------------
+    def _spool_path(self, suffix: str = "") -> str:
+        return os.path.join(self.spool_dir, f"quiz_logs.{os.getpid()}.jsonl{suffix}")
+
+    @staticmethod
+    def _encode(row: Dict) -> Dict:
+        return {k: v.isoformat() if isinstance(v, datetime) else v for k, v in row.items()}
+
+    @staticmethod
+    def _decode(line: str) -> Dict:
+        row = json.loads(line)
+        if row.get("timestamp"):
+            row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+        return row
+
+    def _read_spool(self, path: str) -> List[Dict]:
+        rows = []
+        with open(path) as f:
+            for line in f:
+                if line.endswith("\n"):  # a torn last line was never acknowledged
+                    rows.append(self._decode(line))
+        return rows
+
+    # -------------------------
+    # Lifecycle
+    # -------------------------
+    @property
+    def active(self) -> bool:
+        """True once start() has run; until then callers write synchronously."""
+        return self._thread is not None
+
+    def start(self, session_factory, writer: Callable, on_commit: Optional[Callable] = None):
+        """
+        Replay spools left by dead processes, then start the flush thread.
+        writer(db, rows) stages a batch; on_commit(rows) runs after it commits.
+        """
+        if not self.enabled or self._thread:
+            return
+        self._session_factory = session_factory
+        self._writer = writer
+        self._on_commit = on_commit
+        os.makedirs(self.spool_dir, exist_ok=True)
+        for path in sorted(glob.glob(os.path.join(self.spool_dir, "quiz_logs.*.jsonl*"))):
+            pid = int(os.path.basename(path).split(".")[1])
+            if pid != os.getpid() and _pid_alive(pid):
+                continue
+            rows = self._read_spool(path)
+            if rows and not self._write_with_retries(rows):
+                self._dead_letter(path, rows)
+                continue
+            os.remove(path)
+            logger.info("Replayed %d spooled quiz_logs rows from %s", len(rows), path)
+        self._spool = open(self._spool_path(), "a")
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="quiz-log-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = STOP_TIMEOUT):
+        """Flush what is pending and stop the background thread, waiting at most `timeout` seconds."""
+        if not self._thread:
+            return
+        with self._lock:
+            self._stopping = True
+            self._lock.notify()
+        self._thread.join(timeout)
+        thread, self._thread = self._thread, None
+        if thread.is_alive():
+            # Unwritten rows are still in the spool and get replayed at the next start
+            logger.warning("quiz_logs flush still running after %.1fs; leaving the spool for replay", timeout)
+            return
+        self._spool.close()
+        if os.path.exists(self._spool_path()) and not os.path.getsize(self._spool_path()):
+            os.remove(self._spool_path())
+
+    # -------------------------
+    # Queue
+    # -------------------------
+    def submit(self, rows: List[Dict]):
+        """Durably enqueue quiz_logs rows; returns once they are on disk."""
+        if not rows:
+            return
+        payload = "".join(json.dumps(self._encode(row)) + "\n" for row in rows)
+        with self._lock:
+            self._spool.write(payload)
+            self._spool.flush()
+            os.fsync(self._spool.fileno())
+            self._pending.extend(rows)
+            self.submitted += len(rows)
+            if len(self._pending) >= self.flush_rows:
+                self._lock.notify()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._stopping and len(self._pending) < self.flush_rows:
+                    self._lock.wait(self.flush_interval)
+                stopping = self._stopping
+                batch, self._pending = self._pending, []
+                self._in_flight = len(batch)
+                if batch:
+                    # New submissions go to a fresh spool while this batch is written
+                    self._spool.close()
+                    os.replace(self._spool_path(), self._spool_path(".flushing"))
+                    self._spool = open(self._spool_path(), "a")
+            if batch:
+                self._flush(batch)
+            if stopping:
+                with self._lock:
+                    if not self._pending:
+                        return
+
+    def _flush(self, batch: List[Dict]):
+        # The batch's spool segment stays on disk until it lands (or is set aside)
+        if self._write_with_retries(batch):
+            os.remove(self._spool_path(".flushing"))
+        else:
+            self._dead_letter(self._spool_path(".flushing"), batch)
+        self._in_flight = 0
+
+    def _write_with_retries(self, rows: List[Dict]) -> bool:
+        for attempt in range(1, self.flush_retries + 1):
+            try:
+                self._write(rows)
+            except Exception as exc:
+                self.failures += 1
+                self.last_error = repr(exc)
+                logger.exception("quiz_logs flush of %d rows failed (attempt %d of %d)",
+                                 len(rows), attempt, self.flush_retries)
+                if attempt < self.flush_retries:
+                    time.sleep(self.flush_interval * attempt)
+                continue
+            # Outside the retry: the rows are committed, a failing hook must not write them again
+            if self._on_commit:
+                try:
+                    self._on_commit(rows)
+                except Exception:
+                    logger.exception("quiz_logs on_commit hook failed")
+            return True
+        return False
+
+    def _dead_letter(self, path: str, rows: List[Dict]):
+        # Not matched by the replay glob, so it is never retried automatically
+        dead = os.path.join(self.spool_dir, f"dead_letter.{os.getpid()}.{time.time_ns()}.jsonl")
+        os.replace(path, dead)
+        self.dead_lettered += len(rows)
+        logger.error("Gave up on %d quiz_logs rows; moved them to %s", len(rows), dead)
+
+    def _write(self, rows: List[Dict]):
+        started = time.perf_counter()
+        db = self._session_factory()
+        try:
+            self._writer(db, rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        elapsed = time.perf_counter() - started
+        self.flushes += 1
+        self.flushed += len(rows)
+        self.last_flush_seconds = elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+        self.total_flush_seconds += elapsed
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            depth = len(self._pending)
+        return {
+            "enabled": self.enabled,
+            "active": self.active,
+            "queue_depth": depth,
+            "in_flight_rows": self._in_flight,
+            "submitted_rows": self.submitted,
+            "flushed_rows": self.flushed,
+            "flushes": self.flushes,
+            "failed_flushes": self.failures,
+            "dead_lettered_rows": self.dead_lettered,
+            "last_flush_ms": round(self.last_flush_seconds * 1000, 3),
+            "max_flush_ms": round(self.max_flush_seconds * 1000, 3),
+            "avg_flush_ms": round(self.total_flush_seconds / self.flushes * 1000, 3) if self.flushes else 0.0,
+            "last_error": self.last_error,
+        }
+
+
+quiz_log_buffer = QuizLogBuffer()
@@ -0,0 +1,113 @@
+# app/utils/question_packs.py
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Tuple
+
+import msgpack
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models import Question, QuestionTombstone
+
+PACK_CACHE_SIZE = 256  # encoded packs kept in memory (full packs and deltas)
+PACK_FIELDS = ["id", "question_text", "options", "revision"]
+
+
+class PackBody:
+    __slots__ = ("version", "etag", "raw", "gzipped", "questions", "deleted")
+
+    def __init__(self, version: int, raw: bytes, questions: int, deleted: int):
+        self.version = version
+        self.raw = raw
+        self.gzipped = gzip.compress(raw, compresslevel=6)
+        self.etag = '"' + hashlib.sha1(raw).hexdigest()[:20] + '"'
+        self.questions = questions
+        self.deleted = deleted
+
+
+class QuestionPackCache:
+    """
+    Offline question packs, one per (subject, difficulty).
+
+    A pack's version is the highest question revision in it (tombstones
+    included), found with an index seek per request, so every process sees
+    edits immediately. The msgpack body for (pack, since, version) is built
+    once, gzipped once and kept in a small LRU: repeat downloads and
+    If-None-Match revalidations cost no encoding work.
+
+    Correct answers are never shipped; offline answers are graded on upload.
+    """
+
+    def __init__(self, max_entries: int = PACK_CACHE_SIZE):
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple, PackBody]" = OrderedDict()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def current_version(db: Session, subject: str, difficulty: str) -> int:
+        live = db.query(func.max(Question.revision)).filter(
+            Question.subject == subject, Question.difficulty == difficulty
+        ).scalar()
+        deleted = db.query(func.max(QuestionTombstone.revision)).filter(
+            QuestionTombstone.subject == subject, QuestionTombstone.difficulty == difficulty
+        ).scalar()
+        return max(live or 0, deleted or 0)
+
+    def get(self, db: Session, subject: str, difficulty: str, since: int = 0) -> PackBody:
+        """The pack (since=0) or the delta since a client's pack version."""
+        version = self.current_version(db, subject, difficulty)
+        since = min(max(since, 0), version)
+        key = (subject, difficulty, since, version)
+        with self._lock:
+            body = self._cache.get(key)
+            if body is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return body
+            self.misses += 1
+
+        body = self._build(db, subject, difficulty, since, version)
+        with self._lock:
+            self._cache[key] = body
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return body
+
+    def _build(self, db: Session, subject: str, difficulty: str, since: int, version: int) -> PackBody:
+        questions = db.query(Question.id, Question.question_text, Question.options, Question.revision).filter(
+            Question.subject == subject,
+            Question.difficulty == difficulty,
+            Question.revision > since,
+            Question.revision <= version,
+        ).order_by(Question.id).all()
+        deleted = []
+        if since:
+            # an id that left the pack and is back (reused id, or moved back) is live, not deleted
+            live = select(Question.id).where(Question.subject == subject, Question.difficulty == difficulty)
+            deleted = [question_id for (question_id,) in db.query(QuestionTombstone.question_id).filter(
+                QuestionTombstone.subject == subject,
+                QuestionTombstone.difficulty == difficulty,
+                QuestionTombstone.revision > since,
+                QuestionTombstone.revision <= version,
+                QuestionTombstone.question_id.not_in(live),
+            ).order_by(QuestionTombstone.question_id)]
+        raw = msgpack.packb({
+            "subject": subject,
+            "difficulty": difficulty,
+            "version": version,
+            "since": since,
+            "full": since == 0,
+            # rows are positional to keep the payload small; see "fields"
+            "fields": PACK_FIELDS,
+            "questions": [list(row) for row in questions],
+            "deleted": deleted,
+        })
+        return PackBody(version, raw, len(questions), len(deleted))
+
+
+question_packs = QuestionPackCache()
@@ -0,0 +1,154 @@
+# app/utils/response_cache.py
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "60"))                     # seconds
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+INVALIDATION_SLACK = 1024  # invalidation stamps kept beyond the users with entries before pruning
+
+
+class _Entry:
+    __slots__ = ("body", "etag", "expires")
+
+    def __init__(self, body: bytes, etag: str, expires: float):
+        self.body = body
+        self.etag = etag
+        self.expires = expires
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    return etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]
+
+
+def _response(request: Request, entry: _Entry) -> Response:
+    headers = {"ETag": entry.etag, "Cache-Control": "private, no-cache"}
+    if _not_modified(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
+
+
+class CacheLookup:
+    """Result of UserResponseCache.lookup(): a ready response, or a slot to store()."""
+    __slots__ = ("response", "_cache", "_key", "_generation", "_request")
+
+    def __init__(self, cache, key, generation, request, response=None):
+        self.response = response
+        self._cache = cache
+        self._key = key
+        self._generation = generation
+        self._request = request
+
+    def store(self, payload) -> Response:
+        """Encode, cache (unless the user was invalidated meanwhile) and return `payload`."""
+        body = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode()
+        entry = _Entry(body, '"' + hashlib.sha1(body).hexdigest()[:20] + '"', time.monotonic() + self._cache.ttl)
+        self._cache._put(self._key, entry, self._generation)
+        return _response(self._request, entry)
+
+
+class UserResponseCache:
+    """
+    Read-through cache of rendered JSON responses keyed by (user_id, endpoint).
+
+    LRU within a byte budget, plus a TTL. Writes that change what a user's
+    endpoints return call invalidate(user_id), which stamps the user with the
+    next value of a global counter; a response computed from a lookup taken
+    before that stamp is not stored. Stamps of users without entries are
+    pruned in sweeps, and the newest pruned stamp becomes a floor that
+    applies to every user, so the map stays bounded without letting a stale
+    response in. Each process has its own cache, so with several workers the
+    TTL bounds how long another worker can serve a stale entry.
+    """
+
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL, max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[int, str], _Entry]" = OrderedDict()
+        self._by_user: Dict[int, Set[Tuple[int, str]]] = {}
+        self._invalidated: Dict[int, int] = {}  # user_id -> stamp of the last invalidation
+        self._clock = 0
+        self._floor = 0  # newest pruned stamp
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, request: Request, user_id: int, endpoint: str) -> CacheLookup:
+        key = (user_id, endpoint)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= now:
+                self._drop(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            generation = self._clock
+        return CacheLookup(self, key, generation, request, _response(request, entry) if entry else None)
+
+    def _put(self, key: Tuple[int, str], entry: _Entry, generation: int):
+        size = len(entry.body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if self._invalidated.get(key[0], self._floor) > generation:
+                return  # invalidated after the lookup: the payload may be stale
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            self._by_user.setdefault(key[0], set()).add(key)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: Tuple[int, str]):
+        entry = self._entries.pop(key)
+        self.bytes -= len(entry.body)
+        keys = self._by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[key[0]]
+
+    def invalidate(self, user_ids: Iterable[int]):
+        with self._lock:
+            for user_id in set(user_ids):
+                self._clock += 1
+                self._invalidated[user_id] = self._clock
+                for key in list(self._by_user.get(user_id, ())):
+                    self._drop(key)
+            if len(self._invalidated) > len(self._by_user) + INVALIDATION_SLACK:
+                self._prune_invalidations()
+
+    def _prune_invalidations(self):
+        for user_id in [user_id for user_id in self._invalidated if user_id not in self._by_user]:
+            self._floor = max(self._floor, self._invalidated.pop(user_id))
+
+    def invalidate_user(self, user_id: Optional[int]):
+        if user_id is not None:
+            self.invalidate((user_id,))
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "invalidation_stamps": len(self._invalidated),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+user_responses = UserResponseCache()
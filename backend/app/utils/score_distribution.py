@@ -0,0 +1,58 @@
+# app/utils/score_distribution.py
+import math
+from typing import Dict, List, Optional
+
+# Attempt scores are bucketed into fixed-width bins; CAST(score / width AS INTEGER)
+# in SQL and int(score / width) here agree, so rebuilds and live upserts match.
+SCORE_BIN_WIDTH = 1.0
+
+
+def score_bin(score: float) -> int:
+    return int(score / SCORE_BIN_WIDTH)
+
+
+def percentile(bins: Dict[int, int], q: float, low: Optional[float] = None, high: Optional[float] = None) -> Optional[float]:
+    """
+    Approximate q-th percentile (0..1) from {bin: count}, interpolating inside
+    the bin that holds it and clamping to the observed [low, high] range.
+    """
+    total = sum(bins.values())
+    if not total:
+        return None
+    target = q * total
+    seen = 0
+    for b in sorted(bins):
+        count = bins[b]
+        if seen + count >= target:
+            value = (b + (target - seen) / count) * SCORE_BIN_WIDTH
+            if low is not None:
+                value = max(value, low)
+            if high is not None:
+                value = min(value, high)
+            return round(value, 3)
+        seen += count
+    return high
+
+
+def summarize(attempts: int, score_sum: float, score_sumsq: float,
+              low: Optional[float], high: Optional[float], bins: Dict[int, int]) -> Dict:
+    """Mean, standard deviation, p50/p90 and the histogram from running aggregates."""
+    mean = score_sum / attempts if attempts else 0
+    variance = (score_sumsq - attempts * mean * mean) / (attempts - 1) if attempts > 1 else 0
+    return {
+        "total_attempts": attempts,
+        "average_score": mean,
+        "stddev_score": math.sqrt(max(variance, 0)),
+        "min_score": low,
+        "max_score": high,
+        "p50_score": percentile(bins, 0.5, low, high),
+        "p90_score": percentile(bins, 0.9, low, high),
+        "distribution": distribution(bins),
+    }
+
+
+def distribution(bins: Dict[int, int]) -> List[Dict]:
+    return [
+        {"score_from": b * SCORE_BIN_WIDTH, "score_to": (b + 1) * SCORE_BIN_WIDTH, "count": bins[b]}
+        for b in sorted(bins)
+    ]
@@ -0,0 +1,122 @@
+# app/utils/timing_detector.py
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models import QuestionAttempt, QuizLog
+
+# An answer is flagged when its log response time sits more than Z_THRESHOLD
+# standard deviations below the question's mean. Response times are strongly
+# right-skewed, so the statistics are kept on log(seconds).
+Z_THRESHOLD = 2.5
+MIN_SAMPLES = 30  # don't judge a question until the population is big enough
+MIN_SECONDS = 0.05
+
+
+class _RunningStats:
+    """Welford's online mean/variance."""
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x: float):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+
+class TimingAnomalyDetector:
+    """
+    Per-question response-time distribution, updated as answers arrive.
+    Each observation is O(1): the answer is judged against the population
+    seen so far, then folded into it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[int, _RunningStats] = {}
+        self.observed = 0
+        self.flagged = 0
+
+    def _is_fast(self, stats: Optional[_RunningStats], log_seconds: float) -> bool:
+        if stats is None or stats.n < MIN_SAMPLES:
+            return False
+        std = stats.std
+        return std > 0 and log_seconds < stats.mean - Z_THRESHOLD * std
+
+    def is_fast(self, question_id: int, seconds: Optional[float]) -> bool:
+        """Judge a recorded answer time without folding it in again."""
+        if seconds is None or seconds <= 0:
+            return False
+        with self._lock:
+            return self._is_fast(self._stats.get(question_id), math.log(max(seconds, MIN_SECONDS)))
+
+    def observe(self, question_id: int, seconds: Optional[float]) -> bool:
+        """Record one answer time; True if it is anomalously fast."""
+        if seconds is None or seconds <= 0:
+            return False
+        with self._lock:
+            fast = self._fold(question_id, math.log(max(seconds, MIN_SECONDS)))
+            self.observed += 1
+            self.flagged += fast
+        return fast
+
+    def _fold(self, question_id: int, log_seconds: float) -> bool:
+        # Caller holds the lock
+        stats = self._stats.get(question_id)
+        fast = self._is_fast(stats, log_seconds)
+        if stats is None:
+            stats = self._stats[question_id] = _RunningStats()
+        if not fast:
+            # flagged answers stay out so they can't drag the threshold down
+            stats.add(log_seconds)
+        return fast
+
+    def observe_many(self, answers: Iterable[Tuple[int, Optional[float]]]) -> List[bool]:
+        return [self.observe(question_id, seconds) for question_id, seconds in answers]
+
+    def warm(self, db: Session):
+        """
+        Rebuild the distributions by streaming recorded answer times once,
+        in insertion order, judging each one the way observe() did, so the
+        answers it flagged stay out again. Only measured times count:
+        offline answers are stored without one.
+        """
+        with self._lock:
+            self._stats = {}
+        sources = (
+            db.query(QuizLog.question_id, QuizLog.response_time)
+            .filter(QuizLog.response_time > 0).order_by(QuizLog.id),
+            db.query(QuestionAttempt.question_id, QuestionAttempt.time_taken)
+            .filter(QuestionAttempt.time_taken > 0).order_by(QuestionAttempt.id),
+        )
+        with self._lock:
+            for query in sources:
+                for question_id, seconds in query.yield_per(5000):
+                    self._fold(question_id, math.log(max(seconds, MIN_SECONDS)))
+
+    def summary(self, question_id: int) -> Optional[Dict]:
+        with self._lock:
+            stats = self._stats.get(question_id)
+            if stats is None:
+                return None
+            return {
+                "question_id": question_id,
+                "samples": stats.n,
+                "median_seconds": round(math.exp(stats.mean), 3),
+                "fast_threshold_seconds": round(math.exp(stats.mean - Z_THRESHOLD * stats.std), 3)
+                if stats.n >= MIN_SAMPLES else None,
+            }
+
+
+timing_detector = TimingAnomalyDetector()
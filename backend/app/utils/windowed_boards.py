@@ -0,0 +1,133 @@
+# app/utils/windowed_boards.py
+import heapq
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models import QuizLog
+
+WINDOWS = ("daily", "weekly", "all_time")
+ALL_SUBJECTS = "*"
+ALL_TIME_START = date.min
+
+
+def window_start(window: str, when: datetime) -> date:
+    day = when.date()
+    if window == "daily":
+        return day
+    if window == "weekly":
+        return day - timedelta(days=day.weekday())
+    if window == "all_time":
+        return ALL_TIME_START
+    raise ValueError(f"Unknown leaderboard window: {window}")
+
+
+def _as_date(value) -> Optional[date]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+class WindowedLeaderboards:
+    """
+    Per-subject x per-window answer tallies, fed by the quiz log write paths.
+
+    Buckets are nested window -> window start -> subject -> user -> [correct, answered].
+    Only the current daily/weekly window is kept; when a write or read lands in
+    a newer window the stale one is dropped with a single dict pop. Timestamps
+    are UTC, matching QuizLog.timestamp.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Dict[date, Dict[str, Dict[int, List[int]]]]] = {w: {} for w in WINDOWS}
+        self.warmed = False
+
+    def _roll_off(self, window: str, current: date):
+        starts = self._buckets[window]
+        for start in [s for s in starts if s < current]:
+            del starts[start]
+
+    def _add(self, window: str, start: date, subject: str, user_id: int, correct: int, answered: int):
+        subjects = self._buckets[window].setdefault(start, {})
+        for key in (subject, ALL_SUBJECTS):
+            tally = subjects.setdefault(key, {}).setdefault(user_id, [0, 0])
+            tally[0] += correct
+            tally[1] += answered
+
+    def record(self, user_id: int, subject: str, correct: int, answered: int, when: Optional[datetime] = None):
+        """Count `answered` answers (`correct` of them right) for a user in every window."""
+        if not answered:
+            return
+        when = when or datetime.utcnow()
+        with self._lock:
+            for window in WINDOWS:
+                start = window_start(window, when)
+                current = window_start(window, datetime.utcnow())
+                if start < current:
+                    continue  # late write for a window that already rolled off
+                self._roll_off(window, start)
+                self._add(window, start, subject, user_id, correct, answered)
+
+    def warm(self, db: Session, now: Optional[datetime] = None):
+        now = now or datetime.utcnow()
+        week_start = window_start("weekly", now)
+        today = window_start("daily", now)
+        with self._lock:
+            self._buckets = {w: {} for w in WINDOWS}
+
+            totals = db.query(
+                QuizLog.user_id, QuizLog.subject, func.sum(QuizLog.correct), func.count(QuizLog.id)
+            ).group_by(QuizLog.user_id, QuizLog.subject)
+            for user_id, subject, correct, answered in totals:
+                self._add("all_time", ALL_TIME_START, subject, user_id, int(correct or 0), answered)
+
+            day = func.date(QuizLog.timestamp)
+            recent = db.query(
+                QuizLog.user_id, QuizLog.subject, day, func.sum(QuizLog.correct), func.count(QuizLog.id)
+            ).filter(
+                QuizLog.timestamp >= datetime.combine(week_start, datetime.min.time())
+            ).group_by(QuizLog.user_id, QuizLog.subject, day)
+            for user_id, subject, log_day, correct, answered in recent:
+                log_day = _as_date(log_day)
+                self._add("weekly", week_start, subject, user_id, int(correct or 0), answered)
+                if log_day == today:
+                    self._add("daily", today, subject, user_id, int(correct or 0), answered)
+            self.warmed = True
+
+    def ensure_warm(self, session_factory):
+        if self.warmed:
+            return
+        db = session_factory()
+        try:
+            self.warm(db)
+        finally:
+            db.close()
+
+    def top(self, window: str, subject: Optional[str] = None, n: int = 10) -> List[Dict]:
+        current = window_start(window, datetime.utcnow())
+        with self._lock:
+            self._roll_off(window, current)
+            bucket = self._buckets[window].get(current, {}).get(subject or ALL_SUBJECTS, {})
+            # Most correct answers first; fewer attempts breaks ties, then lower user id.
+            best = heapq.nlargest(n, bucket.items(), key=lambda kv: (kv[1][0], -kv[1][1], -kv[0]))
+        return [
+            {
+                "user_id": user_id,
+                "correct_answers": correct,
+                "total_questions": answered,
+                "accuracy": round(correct / answered * 100, 2) if answered else 0,
+                "rank": position + 1,
+            }
+            for position, (user_id, (correct, answered)) in enumerate(best)
+        ]
+
+
+windowed_boards = WindowedLeaderboards()
@@ -0,0 +1,135 @@
+# benchmarks/async_load.py
+# Requests/second of the async hot endpoints against sync twins that use the
+# old get_db/threadpool path, served by a real uvicorn on a throwaway SQLite DB.
+#
+#   python benchmarks/async_load.py [concurrency] [seconds]
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "load.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from fastapi import Depends  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app import crud, models  # noqa: E402
+from app.database import SessionLocal, get_db  # noqa: E402
+from app.main import app  # noqa: E402
+from app.migrations import migrate  # noqa: E402
+
+CONCURRENCY = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+SECONDS = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+PORT = 8765
+USERS = 200
+QUESTIONS = 50
+
+
+# Sync twins: same work, but a plain `def` on the sync session (threadpool path).
+@app.get("/bench/sync/dashboard/{user_id}")
+def sync_dashboard(user_id: int, db: Session = Depends(get_db)):
+    user = db.query(models.User).filter(models.User.id == user_id).first()
+    stats = db.query(models.UserSubjectStats).filter(models.UserSubjectStats.user_id == user_id).all()
+    return {"xp": user.xp, "subjects": len(stats)}
+
+
+@app.get("/bench/sync/history/{user_id}")
+def sync_history(user_id: int, db: Session = Depends(get_db)):
+    logs = db.query(models.QuizLog).filter(models.QuizLog.user_id == user_id).all()
+    return {"user_id": user_id, "quiz_history": [{"question_id": log.question_id} for log in logs]}
+
+
+def seed():
+    migrate()
+    db = SessionLocal()
+    for i in range(USERS):
+        db.add(models.User(name=f"user{i}", email=f"user{i}@example.com", password="x", xp=0, streak=0, badges=[]))
+    for i in range(QUESTIONS):
+        db.add(models.Question(subject="Math", difficulty="easy", question_text=f"q{i}",
+                               options=["a", "b"], correct_answer=random.choice("ab")))
+    db.commit()
+    for user_id in range(1, USERS + 1):
+        crud.log_quiz_answers(db, user_id, "Math", "easy", [
+            {"question_id": random.randint(1, QUESTIONS), "chosen_answer": "a",
+             "correct": random.random() < 0.5, "response_time": 3}
+            for _ in range(20)
+        ])
+    db.close()
+
+
+def submit_body():
+    return {
+        "user_id": random.randint(1, USERS),
+        "subject": "Math",
+        "current_difficulty": "easy",
+        "answers": [{"question_id": random.randint(1, QUESTIONS), "chosen_answer": random.choice("ab")}
+                    for _ in range(5)],
+    }
+
+
+SCENARIOS = {
+    "/quiz/submit": (
+        lambda c: c.post("/quiz/quiz/submit", json=submit_body()),  # blocking work: runs on the threadpool
+        None,
+    ),
+    "/dashboard": (
+        lambda c: c.get(f"/dashboard/dashboard/{random.randint(1, USERS)}"),
+        lambda c: c.get(f"/bench/sync/dashboard/{random.randint(1, USERS)}"),
+    ),
+    "/leaderboard": (
+        lambda c: c.get("/leaderboard/?top_n=10"),
+        None,
+    ),
+    "/history": (
+        lambda c: c.get(f"/history/quiz-history/{random.randint(1, USERS)}"),
+        lambda c: c.get(f"/bench/sync/history/{random.randint(1, USERS)}"),
+    ),
+}
+
+
+async def hammer(make_request) -> tuple:
+    done = errors = 0
+    deadline = time.perf_counter() + SECONDS
+    limits = httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", limits=limits, timeout=30) as client:
+        async def worker():
+            nonlocal done, errors
+            while time.perf_counter() < deadline:
+                response = await make_request(client)
+                if response.status_code == 200:
+                    done += 1
+                else:
+                    errors += 1
+        await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    return done / SECONDS, errors
+
+
+def main():
+    seed()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=PORT, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    print(f"concurrency={CONCURRENCY} duration={SECONDS}s per run")
+    print(f"{'endpoint':16s} {'async rps':>10s} {'sync rps':>10s}")
+    for name, (async_request, sync_request) in SCENARIOS.items():
+        async_rps, async_errors = asyncio.run(hammer(async_request))
+        sync_rps, sync_errors = asyncio.run(hammer(sync_request)) if sync_request else (float("nan"), 0)
+        note = f"  (errors: async={async_errors} sync={sync_errors})" if async_errors or sync_errors else ""
+        print(f"{name:16s} {async_rps:10.1f} {sync_rps:10.1f}{note}")
+
+    server.should_exit = True
+    thread.join()
+
+
+if __name__ == "__main__":
+    main()
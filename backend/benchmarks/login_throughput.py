@@ -0,0 +1,110 @@
+# benchmarks/login_throughput.py
+# Logins/second through /auth/login (bcrypt on the credential pool) against a
+# sync twin that verifies inline on the request threadpool, plus /healthz
+# latency during each login storm, on a real uvicorn and a throwaway SQLite DB.
+#
+#   python benchmarks/login_throughput.py [concurrency] [seconds] [bcrypt_rounds]
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "logins.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+CONCURRENCY = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+SECONDS = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+os.environ["BCRYPT_ROUNDS"] = sys.argv[3] if len(sys.argv) > 3 else os.getenv("BCRYPT_ROUNDS", "12")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from fastapi import Depends, HTTPException  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app import crud, models  # noqa: E402
+from app.database import SessionLocal, get_db  # noqa: E402
+from app.main import app  # noqa: E402
+from app.migrations import migrate  # noqa: E402
+from app.utils.credentials import credentials  # noqa: E402
+
+PORT = 8766
+USERS = 500
+PASSWORD = "correct horse battery staple"
+
+
+# Sync twin: the same check, run inline on the request threadpool.
+@app.get("/bench/sync/login")
+def sync_login(email: str, password: str, db: Session = Depends(get_db)):
+    user = crud.get_user_by_email(db, email)
+    ok, _ = credentials.check(password, user.password if user else None)
+    if not ok:
+        raise HTTPException(status_code=400, detail="Invalid credentials")
+    return {"id": user.id}
+
+
+def seed():
+    migrate()
+    db = SessionLocal()
+    password_hash = credentials.hash(PASSWORD)  # one hash for everyone keeps seeding fast
+    db.add_all(models.User(name=f"user{i}", email=f"user{i}@example.com", password=password_hash,
+                           xp=0, streak=0, badges=[]) for i in range(USERS))
+    db.commit()
+    db.close()
+
+
+async def storm(path: str) -> tuple:
+    done = errors = 0
+    probes = []
+    deadline = time.perf_counter() + SECONDS
+    limits = httpx.Limits(max_connections=CONCURRENCY + 1, max_keepalive_connections=CONCURRENCY + 1)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", limits=limits, timeout=60) as client:
+        async def worker(i):
+            nonlocal done, errors
+            while time.perf_counter() < deadline:
+                params = {"email": f"user{i % USERS}@example.com", "password": PASSWORD}
+                response = await client.get(path, params=params)
+                if response.status_code == 200:
+                    done += 1
+                else:
+                    errors += 1
+                i += CONCURRENCY
+
+        async def probe():
+            # how long a cheap request waits while the logins run
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                await client.get("/healthz")
+                probes.append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(0.05)
+
+        await asyncio.gather(probe(), *(worker(i) for i in range(CONCURRENCY)))
+    p95 = sorted(probes)[int(len(probes) * 0.95)] if probes else float("nan")
+    return done / SECONDS, errors, statistics.median(probes) if probes else float("nan"), p95
+
+
+def main():
+    seed()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=PORT, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    print(f"bcrypt rounds={credentials.rounds} pool workers={credentials.workers} "
+          f"concurrency={CONCURRENCY} duration={SECONDS}s per run")
+    print(f"{'path':24s} {'logins/s':>9s} {'healthz p50':>12s} {'healthz p95':>12s}")
+    for name, path in (("credential pool", "/auth/login"), ("inline (threadpool)", "/bench/sync/login")):
+        rate, errors, p50, p95 = asyncio.run(storm(path))
+        note = f"  (errors: {errors})" if errors else ""
+        print(f"{name:24s} {rate:9.1f} {p50:10.2f}ms {p95:10.2f}ms{note}")
+    print(credentials.metrics())
+
+    server.should_exit = True
+    thread.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# benchmarks/quiz_logs_indexes.py
+# Query plans and latencies of the quiz_logs / quiz_attempts hot queries on
+# the baseline schema (migration 1) and after every later migration.
+#
+#   python benchmarks/quiz_logs_indexes.py [users] [logs_per_user]
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.migrations import migrate  # noqa: E402
+
+USERS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+LOGS_PER_USER = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+RUNS = 200
+
+QUERIES = {
+    "offline sync (user_id + synced)":
+        "SELECT * FROM quiz_logs WHERE user_id = :user AND synced = 0",
+    "dashboard (group by subject)":
+        "SELECT subject, COUNT(*), SUM(correct) FROM quiz_logs WHERE user_id = :user GROUP BY subject",
+    "adaptive (latest log)":
+        "SELECT * FROM quiz_logs WHERE user_id = :user ORDER BY id DESC LIMIT 1",
+    "attempt dedupe (user_id, quiz_id)":
+        "SELECT id FROM quiz_attempts WHERE user_id = :user AND quiz_id = :quiz",
+    "anti-cheating (quiz_id, user_id)":
+        "SELECT id FROM quiz_attempts WHERE quiz_id = :quiz AND user_id = :user",
+}
+
+
+def populate(conn):
+    subjects = ["Math", "Science", "Coding", "Vocab", "Finance"]
+    logs = (
+        (user, random.randint(1, 500), "a", random.randint(0, 1), random.random() * 20,
+         random.choice(subjects), "easy", "2024-01-01 00:00:00", random.random() < 0.9)
+        for user in range(1, USERS + 1)
+        for _ in range(LOGS_PER_USER)
+    )
+    conn.executemany(
+        "INSERT INTO quiz_logs (user_id, question_id, chosen_answer, correct, response_time,"
+        " subject, difficulty, timestamp, synced) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", logs
+    )
+    attempts = (
+        (user, quiz, "2024-01-01 00:00:00", "2024-01-01 00:05:00", random.random() * 100, True)
+        for user in range(1, USERS + 1)
+        for quiz in random.sample(range(1, 200), 20)
+    )
+    conn.executemany(
+        "INSERT INTO quiz_attempts (user_id, quiz_id, start_time, end_time, score, synced)"
+        " VALUES (?, ?, ?, ?, ?, ?)", attempts
+    )
+    conn.commit()
+
+
+def measure(conn, label):
+    print(f"\n=== {label} ===")
+    for name, sql in QUERIES.items():
+        params = {"user": USERS // 2, "quiz": 50}
+        plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+        timings = []
+        for _ in range(RUNS):
+            params = {"user": random.randint(1, USERS), "quiz": random.randint(1, 200)}
+            start = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"{name:36s} p50={statistics.median(timings):7.3f} ms  "
+              f"p95={sorted(timings)[int(RUNS * 0.95)]:7.3f} ms")
+        for step in plan:
+            print(f"    {step}")
+
+
+def main():
+    # "before" = the frozen baseline schema the old one-shot create_tables.py produced
+    migrate(target=1)
+    conn = sqlite3.connect(DB_PATH)
+    print(f"Populating {USERS * LOGS_PER_USER} quiz_logs rows and {USERS * 20} quiz_attempts rows...")
+    populate(conn)
+    measure(conn, "before migration")
+    conn.close()
+
+    for version, description in migrate():
+        print(f"Applied migration {version}: {description}")
+
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("ANALYZE")
+    measure(conn, "after migration")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+# calibrate_questions.py
+# Folds answers recorded since the last run (quiz_logs and question_attempts)
+# into question_stats: p-values, discrimination, mean response time and an
+# Elo/Rasch difficulty, plus the learner abilities used to pick questions.
+# Incremental and bounded-memory; schedule it, or keep it running with --every.
+#
+#   python calibrate_questions.py                # one pass
+#   python calibrate_questions.py --every 300    # a pass every 5 minutes
+import sys
+import time
+from app.database import SessionLocal
+from app.crud import calibrate_questions
+
+every = float(sys.argv[2]) if len(sys.argv) > 2 and sys.argv[1] == "--every" else None
+
+while True:
+    db = SessionLocal()
+    try:
+        folded = calibrate_questions(db)
+    finally:
+        db.close()
+    print("Calibrated " + ", ".join(f"{count} {name} answers" for name, count in folded.items()) + "!")
+    if every is None:
+        break
+    time.sleep(every)
@@ -1,7 +1,10 @@
 # create_tables.py
-from app.database import Base, engine
-from app import models
+# Brings the database schema up to date by applying pending migrations.
+import sys
+from app.migrations import migrate
 
-# Create all tables from SQLAlchemy models
-Base.metadata.create_all(bind=engine)
-print("Tables created successfully!")
+target = int(sys.argv[1]) if len(sys.argv) > 1 else None
+applied = migrate(target=target)
+for version, description in applied:
+    print(f"Applied migration {version}: {description}")
+print("Schema is up to date!" if applied else "No pending migrations.")
@@ -0,0 +1,18 @@
+# export_analytics.py
+# Incrementally exports quiz_logs and question_attempts to Parquet, partitioned
+# by date and subject, for offline analysis (see app/utils/analytics_query.py).
+# Only rows past the last run's high-water mark are read; schedule it nightly.
+#
+#   python export_analytics.py              # -> ./analytics_export
+#   python export_analytics.py <out_dir>
+import os
+import sys
+from app.database import engine
+from app.utils.analytics_export import export_all
+
+out_dir = sys.argv[1] if len(sys.argv) > 1 else os.getenv("ANALYTICS_EXPORT_DIR", "analytics_export")
+
+exported = export_all(engine, out_dir)
+for name, count in exported.items():
+    print(f"Exported {count} {name} rows")
+print(f"Analytics export is up to date in {out_dir}!")
@@ -0,0 +1,22 @@
+# rebuild_stats.py
+# Recomputes the quiz_logs rollups (user_subject_stats) from scratch,
+# e.g. after a backfill or a manual data fix. A full run also rebuilds the
+# quiz_attempts score rollups (score_rollups / score_histogram_bins).
+#
+#   python rebuild_stats.py            # every user
+#   python rebuild_stats.py <user_id>  # one user
+import sys
+from app.database import SessionLocal
+from app.crud import rebuild_score_rollups, rebuild_user_subject_stats
+
+user_id = int(sys.argv[1]) if len(sys.argv) > 1 else None
+
+db = SessionLocal()
+try:
+    rebuild_user_subject_stats(db, user_id=user_id)
+    if user_id is None:
+        rebuild_score_rollups(db)
+    db.commit()
+finally:
+    db.close()
+print("User subject stats rebuilt" + (f" for user {user_id}" if user_id is not None else "") + "!")
@@ -17,6 +17,7 @@ print("Sample questions added!")
 
 # Optional: Add a test user
 from app.crud import create_user
-create_user(db, "Test User", "test@example.com", "password123")
+from app.utils.credentials import credentials
+create_user(db, "Test User", "test@example.com", credentials.hash("password123"))
 
 db.close()
@@ -0,0 +1,35 @@
+# tests/conftest.py
+# Every test session runs against a throwaway SQLite database built by the migrations.
+import os
+import sys
+import tempfile
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "test.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")  # the minimum: keeps hashing tests fast
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+from app.database import SessionLocal  # noqa: E402
+from app.migrations import migrate  # noqa: E402
+
+migrate()
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    return TestClient(app)
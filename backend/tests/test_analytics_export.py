@@ -0,0 +1,49 @@
+# tests/test_analytics_export.py
+import os
+from datetime import datetime
+
+import pyarrow.dataset as ds
+from sqlalchemy import create_engine, insert
+
+from app.database import Base
+from app.models import QuizLog
+from app.utils.analytics_export import export_all, load_state
+
+
+def add_logs(engine, ids):
+    with engine.begin() as conn:
+        conn.execute(insert(QuizLog), [
+            {"id": n, "user_id": 1, "question_id": n, "chosen_answer": "a", "correct": 1, "response_time": 2.0,
+             "subject": "math" if n % 2 else "science", "difficulty": "easy",
+             "timestamp": datetime(2024, 5, 1 + n % 3, 12)}
+            for n in ids
+        ])
+
+
+def exported_ids(out_dir):
+    table = ds.dataset(os.path.join(out_dir, "quiz_logs"), format="parquet", partitioning="hive").to_table()
+    return sorted(table.column("id").to_pylist())
+
+
+def test_second_export_only_appends_new_rows(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'source.db'}")
+    Base.metadata.create_all(bind=engine)
+    out_dir = str(tmp_path / "export")
+
+    add_logs(engine, range(1, 11))
+    assert export_all(engine, out_dir, chunk=4)["quiz_logs"] == 10
+    first_files = {
+        os.path.join(root, name): os.path.getmtime(os.path.join(root, name))
+        for root, _, names in os.walk(os.path.join(out_dir, "quiz_logs")) for name in names
+    }
+
+    add_logs(engine, range(11, 16))
+    assert export_all(engine, out_dir, chunk=4)["quiz_logs"] == 5
+    assert exported_ids(out_dir) == list(range(1, 16))
+    assert load_state(out_dir)["quiz_logs"] == 15
+    # the files of the first run were left alone
+    assert all(os.path.getmtime(path) == mtime for path, mtime in first_files.items())
+
+    # nothing new: nothing written
+    assert export_all(engine, out_dir, chunk=4)["quiz_logs"] == 0
+    assert exported_ids(out_dir) == list(range(1, 16))
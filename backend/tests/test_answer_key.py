@@ -0,0 +1,56 @@
+# tests/test_answer_key.py
+import os
+import subprocess
+import sys
+import textwrap
+
+from app import models
+from app.utils.answer_key import AnswerKeyCache
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_elsewhere(code: str):
+    """Run `code` in a separate process against the same database, like seed_data.py."""
+    subprocess.run([sys.executable, "-c", textwrap.dedent(code)], cwd=BACKEND, env=os.environ, check=True)
+
+
+def test_edits_from_another_process_are_picked_up(db):
+    question = models.Question(subject="AK", difficulty="easy", question_text="1+1?",
+                               options=["1", "2"], correct_answer="1")
+    db.add(question)
+    db.commit()
+    cache = AnswerKeyCache()
+    cache.warm(db)
+    assert cache.lookup(db, [question.id]) == {question.id: "1"}
+
+    run_elsewhere(f"""
+        from app.database import SessionLocal
+        from app import models
+        db = SessionLocal()
+        db.get(models.Question, {question.id}).correct_answer = "2"
+        db.commit()
+    """)
+    assert cache.lookup(db, [question.id]) == {question.id: "2"}
+
+
+def test_reused_id_from_another_process_is_picked_up(db):
+    question = models.Question(subject="AK", difficulty="easy", question_text="2+2?",
+                               options=["4", "5"], correct_answer="4")
+    db.add(question)
+    db.commit()
+    question_id = question.id
+    cache = AnswerKeyCache()
+    cache.warm(db)
+
+    run_elsewhere(f"""
+        from app.database import SessionLocal
+        from app import models
+        db = SessionLocal()
+        db.delete(db.get(models.Question, {question_id}))
+        db.commit()
+        db.add(models.Question(id={question_id}, subject="AK", difficulty="easy", question_text="3+3?",
+                               options=["6", "7"], correct_answer="6"))
+        db.commit()
+    """)
+    assert cache.lookup(db, [question_id]) == {question_id: "6"}
@@ -0,0 +1,34 @@
+# tests/test_batch_grading.py
+import random
+
+from app import schemas
+from app.utils.batch_grading import grade_offline_batch
+
+
+def test_vectorized_grading_matches_per_answer_grading():
+    rng = random.Random(5)
+    key = {qid: rng.choice("abcd") for qid in range(1, 200, 2)}  # even ids are unknown questions
+    payload = schemas.SubmitOfflineRequest(user_id=1, quizzes=[
+        schemas.OfflineQuiz(subject="BG", current_difficulty="easy", answers=[
+            schemas.OfflineAnswer(question_id=rng.randint(0, 220), chosen_answer=rng.choice("abcd"))
+            for _ in range(rng.randint(0, 15))
+        ])
+        for _ in range(40)
+    ])
+
+    graded = grade_offline_batch(payload, key)
+
+    expected = [[key.get(ans.question_id) == ans.chosen_answer for ans in quiz.answers] for quiz in payload.quizzes]
+    assert graded.correct.tolist() == [flag for quiz in expected for flag in quiz]
+    assert graded.scores.tolist() == [sum(quiz) for quiz in expected]
+    assert graded.totals.tolist() == [len(quiz) for quiz in expected]
+    assert graded.accuracies().tolist() == [sum(quiz) / len(quiz) if quiz else 0.0 for quiz in expected]
+    rows = graded.log_rows(1, payload)
+    assert [row["correct"] for row in rows] == [int(flag) for quiz in expected for flag in quiz]
+    assert all(row["response_time"] is None for row in rows)
+
+
+def test_empty_key_grades_everything_wrong():
+    payload = schemas.SubmitOfflineRequest(user_id=1, quizzes=[schemas.OfflineQuiz(
+        subject="BG", current_difficulty="easy", answers=[schemas.OfflineAnswer(question_id=1, chosen_answer="a")])])
+    assert grade_offline_batch(payload, {}).scores.tolist() == [0]
@@ -0,0 +1,37 @@
+# tests/test_bulk_attempts.py
+from app import models
+
+
+def attempt(user_id, quiz_id, score, *options):
+    return {
+        "user_id": user_id, "quiz_id": quiz_id, "score": score,
+        "start_time": "2024-05-01T10:00:00", "end_time": "2024-05-01T10:05:00",
+        "questions": [{"question_id": n + 1, "selected_option": option, "time_taken": 5.0, "correct": option == "a"}
+                      for n, option in enumerate(options)],
+    }
+
+
+def test_batch_ingests_each_attempt_once(client, db):
+    user = models.User(name="bulk", email="bulk@example.com", password="", xp=0, streak=0, badges=[])
+    db.add(user)
+    db.commit()
+
+    batch = [attempt(user.id, 9001, 2, "a", "a"), attempt(user.id, 9002, 1, "a", "b"),
+             attempt(user.id, 9001, 0, "b", "b")]  # the same quiz again within the batch
+    response = client.post("/quiz/quiz/offline/submit", json={"attempts": batch})
+    assert response.status_code == 200
+    assert response.json()["results"] == [
+        {"quiz_id": 9001, "status": "submitted"},
+        {"quiz_id": 9002, "status": "submitted"},
+        {"quiz_id": 9001, "status": "already_submitted"},
+    ]
+
+    stored = db.query(models.QuizAttempt).filter(models.QuizAttempt.user_id == user.id).order_by(
+        models.QuizAttempt.quiz_id).all()
+    assert [(a.quiz_id, a.score) for a in stored] == [(9001, 2), (9002, 1)]
+    assert [[q.selected_option for q in a.questions] for a in stored] == [["a", "a"], ["a", "b"]]
+
+    # replaying the whole upload changes nothing
+    again = client.post("/quiz/quiz/offline/submit", json={"attempts": batch[:2]}).json()["results"]
+    assert {r["status"] for r in again} == {"already_submitted"}
+    assert db.query(models.QuizAttempt).filter(models.QuizAttempt.user_id == user.id).count() == 2
@@ -0,0 +1,47 @@
+# tests/test_calibration.py
+import math
+import random
+
+import numpy as np
+from sqlalchemy import insert
+
+from app import crud, models
+
+
+def test_recovers_simulated_rasch_difficulties(db):
+    rng = random.Random(16)
+    true_difficulty = [-2.5 + 5 * i / 19 for i in range(20)]
+    true_ability = [rng.gauss(0, 1) for _ in range(300)]
+
+    # every question labeled "medium", so any spread in the estimates comes from the answers
+    questions = [models.Question(subject="CAL", difficulty="medium", question_text=f"q{i}",
+                                 options=["a", "b"], correct_answer="a") for i in range(len(true_difficulty))]
+    users = [models.User(name=f"cal{i}", email=f"cal{i}@example.com", password="", xp=0, streak=0, badges=[])
+             for i in range(len(true_ability))]
+    db.add_all(questions + users)
+    db.commit()
+
+    answers = [(u, q) for u in range(len(users)) for q in range(len(questions))]
+    rng.shuffle(answers)
+    db.execute(insert(models.QuizLog), [
+        {"user_id": users[u].id, "question_id": questions[q].id, "subject": "CAL", "difficulty": "medium",
+         "correct": int(rng.random() < 1 / (1 + math.exp(true_difficulty[q] - true_ability[u]))),
+         "response_time": 10.0}
+        for u, q in answers
+    ])
+    db.commit()
+
+    crud.calibrate_questions(db, chunk=2000)
+
+    stats = {row.question_id: row for row in db.query(models.QuestionStats).filter(
+        models.QuestionStats.question_id.in_([q.id for q in questions]))}
+    assert all(stats[q.id].answers == len(users) for q in questions)
+    estimated = [stats[q.id].difficulty for q in questions]
+    assert np.corrcoef(true_difficulty, estimated)[0, 1] > 0.95
+
+    abilities = dict(db.query(models.UserAbility.user_id, models.UserAbility.ability).filter(
+        models.UserAbility.subject == "CAL"))
+    assert np.corrcoef(true_ability, [abilities[u.id] for u in users])[0, 1] > 0.8
+
+    # a second run has nothing new to fold
+    assert crud.calibrate_questions(db)["quiz_logs"] == 0
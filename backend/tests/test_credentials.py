@@ -0,0 +1,70 @@
+# tests/test_credentials.py
+import pytest
+
+from app import models
+from app.routers import auth
+from app.utils.credentials import CredentialService
+
+
+def stored_password(db, email):
+    db.expire_all()
+    return db.query(models.User.password).filter(models.User.email == email).scalar()
+
+
+def add_user(db, email, password):
+    db.add(models.User(name=email.split("@")[0], email=email, password=password, xp=0, streak=0, badges=[]))
+    db.commit()
+
+
+def login(client, email, password):
+    return client.get("/auth/login", params={"email": email, "password": password})
+
+
+def test_signup_stores_a_bcrypt_hash(client, db):
+    response = client.post("/auth/signup", json={"name": "cr", "email": "cr@example.com", "password": "s3cret"})
+    assert response.status_code == 200
+    stored = stored_password(db, "cr@example.com")
+    assert stored.startswith("$2") and "s3cret" not in stored
+    assert login(client, "cr@example.com", "s3cret").status_code == 200
+    assert login(client, "cr@example.com", "wrong").status_code == 400
+
+
+def test_plaintext_password_is_upgraded_on_login(client, db):
+    add_user(db, "legacy@example.com", "hunter2")
+    assert login(client, "legacy@example.com", "nope").status_code == 400
+    assert stored_password(db, "legacy@example.com") == "hunter2"
+
+    assert login(client, "legacy@example.com", "hunter2").status_code == 200
+    assert stored_password(db, "legacy@example.com").startswith("$2")
+    assert login(client, "legacy@example.com", "hunter2").status_code == 200
+
+
+def test_rehash_when_the_work_factor_changes(client, db, monkeypatch):
+    add_user(db, "rounds@example.com", CredentialService(rounds=4, workers=1).hash("pw"))
+    monkeypatch.setattr(auth, "credentials", CredentialService(rounds=5, workers=1))
+    assert login(client, "rounds@example.com", "pw").status_code == 200
+    assert stored_password(db, "rounds@example.com").startswith("$2b$05$")
+
+
+def test_google_accounts_have_no_password(client, db):
+    add_user(db, "google@example.com", "")
+    assert login(client, "google@example.com", "").status_code == 400
+    assert CredentialService(rounds=4, workers=1).check("", "") == (False, None)
+
+
+def test_unknown_email_is_rejected(client):
+    assert login(client, "nobody@example.com", "pw").status_code == 400
+
+
+def test_full_queue_is_503(client, db, monkeypatch):
+    add_user(db, "busy@example.com", "pw")
+    monkeypatch.setattr(auth, "credentials", CredentialService(rounds=4, workers=1, max_pending=0))
+    response = login(client, "busy@example.com", "pw")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert auth.credentials.metrics()["rejected"] == 1
+
+
+@pytest.mark.parametrize("stored", [None, ""])
+def test_missing_stored_password_never_matches(stored):
+    assert CredentialService(rounds=4, workers=1).check("pw", stored) == (False, None)
@@ -0,0 +1,22 @@
+# tests/test_database.py
+from sqlalchemy import event
+
+from app.database import SQLITE_POOL_SIZE, engine
+
+
+def test_connections_are_pooled_and_tuned():
+    assert engine.pool.size() == SQLITE_POOL_SIZE
+    opened = []
+    listener = lambda dbapi_connection, record: opened.append(dbapi_connection)
+    event.listen(engine, "connect", listener)
+    try:
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+            assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+        # checked back in and handed out again: no new SQLite connection is opened
+        for _ in range(3):
+            with engine.connect() as conn:
+                conn.exec_driver_sql("SELECT 1")
+        assert len(opened) <= 1
+    finally:
+        event.remove(engine, "connect", listener)
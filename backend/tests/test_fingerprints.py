@@ -0,0 +1,42 @@
+# tests/test_fingerprints.py
+from app import models
+from app.utils.fingerprints import answer_fingerprint
+
+
+def test_fingerprint_ignores_submission_order():
+    sheet = [(1, "a"), (2, "c"), (3, None)]
+    assert answer_fingerprint(sheet) == answer_fingerprint(reversed(sheet))
+    assert answer_fingerprint(sheet) != answer_fingerprint([(1, "a"), (2, "b"), (3, None)])
+    assert answer_fingerprint([]) is None
+
+
+def test_identical_sheets_collide(client, db):
+    users = [models.User(name=f"fp{i}", email=f"fp{i}@example.com", password="", xp=0, streak=0, badges=[])
+             for i in range(3)]
+    db.add_all(users)
+    db.commit()
+
+    def attempt(user, *selections):
+        return {
+            "user_id": user.id, "quiz_id": 9100, "score": 1,
+            "start_time": "2024-05-01T10:00:00", "end_time": "2024-05-01T10:05:00",
+            "questions": [{"question_id": qid, "selected_option": option, "time_taken": 5.0, "correct": False}
+                          for qid, option in selections],
+        }
+
+    copied, original, honest = users
+    client.post("/quiz/quiz/offline/submit", json={"attempts": [
+        attempt(original, (1, "a"), (2, "b")),
+        attempt(copied, (2, "b"), (1, "a")),  # same sheet, other order
+        attempt(honest, (1, "a"), (2, "c")),
+    ]})
+
+    clusters = client.get("/anti-cheating/collisions/9100").json()["clusters"]
+    assert len(clusters) == 1
+    assert sorted(clusters[0]["user_ids"]) == sorted([original.id, copied.id])
+
+    flags = client.get(f"/anti-cheating/check/9100/{copied.id}").json()["suspicious_flags"]
+    assert [(f["type"], f["user_id"]) for f in flags if f["type"] == "duplicate_answers"] == [
+        ("duplicate_answers", original.id)]
+    flags = client.get(f"/anti-cheating/check/9100/{honest.id}").json()["suspicious_flags"]
+    assert not [f for f in flags if f["type"] == "duplicate_answers"]
@@ -0,0 +1,63 @@
+# tests/test_gamification.py
+from datetime import date, timedelta
+
+import pytest
+
+from app import models
+from app.utils.gamification import BADGE_RULES, GamificationEngine, next_streak
+
+TODAY = date(2024, 5, 10)
+
+
+@pytest.mark.parametrize("streak, last, expected", [
+    (4, TODAY, 4),                          # already counted today
+    (None, TODAY, 1),
+    (4, TODAY - timedelta(days=1), 5),      # yesterday: extends
+    (None, TODAY - timedelta(days=1), 1),
+    (4, TODAY - timedelta(days=2), 1),      # a gap: restarts
+    (4, None, 1),
+])
+def test_next_streak(streak, last, expected):
+    assert next_streak(streak, last, TODAY) == expected
+
+
+@pytest.mark.parametrize("metric, threshold, name", BADGE_RULES)
+def test_qualified_at_and_below_each_threshold(metric, threshold, name):
+    engine = GamificationEngine()
+    assert name in engine.qualified(metric, threshold)
+    assert name not in engine.qualified(metric, threshold - 1)
+
+
+def test_warm_merges_badge_criteria(db):
+    db.add_all([
+        models.Badge(name="Marathon", description="", criteria={"xp": 1000}),
+        models.Badge(name="Hat Trick", description="", criteria={"streak": 3}),
+        models.Badge(name="Collector", description="", criteria={"quizzes": 10}),  # not an xp/streak rule
+        models.Badge(name="Beginner", description="", criteria={"xp": 50}),       # same as a built-in
+    ])
+    db.commit()
+    engine = GamificationEngine()
+    engine.warm(db)
+    assert engine.qualified("xp", 999)[-1] == "Master"
+    assert engine.qualified("xp", 1000)[-1] == "Marathon"
+    assert engine.qualified("streak", 3) == ["Hat Trick"]
+    assert engine.qualified("xp", 10 ** 6).count("Beginner") == 1
+    assert "Collector" not in engine.qualified("quizzes", 100)
+
+
+def test_apply_reassigns_the_badges_list(db):
+    user = models.User(name="gm", email="gm@example.com", password="", xp=40, streak=4,
+                       badges=["Beginner"], last_quiz_date=TODAY - timedelta(days=1))
+    db.add(user)
+    db.commit()
+    owned = user.badges
+
+    progress = GamificationEngine().apply(user, xp_gained=170, today=TODAY)
+    assert progress["new_badges"] == ["Scholar", "Consistent Learner"]
+    assert user.badges is not owned and owned == ["Beginner"]
+    db.commit()
+
+    db.expire_all()
+    stored = db.get(models.User, user.id)
+    assert (stored.xp, stored.streak, stored.last_quiz_date) == (210, 5, TODAY)
+    assert stored.badges == ["Beginner", "Scholar", "Consistent Learner"]
@@ -0,0 +1,167 @@
+# tests/test_google_certs.py
+import base64
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+import rsa
+from google.auth import crypt
+from google.auth import jwt as google_jwt
+
+from app.utils import google_certs
+from app.utils.google_certs import (
+    CertFetchError, GoogleCertCache, GoogleTokenVerifier, HttpCertSource, parse_max_age,
+)
+
+AUDIENCE = "test-client-id"
+PUBLIC_KEY, PRIVATE_KEY = rsa.newkeys(1024)
+PEM = PUBLIC_KEY.save_pkcs1().decode()
+
+
+def id_token(kid: str, **claims) -> str:
+    signer = crypt.RSASigner.from_string(PRIVATE_KEY.save_pkcs1().decode(), key_id=kid)
+    now = int(time.time())
+    payload = {"iss": "https://accounts.google.com", "aud": AUDIENCE, "iat": now, "exp": now + 300,
+               "email": "someone@example.com", **claims}
+    return google_jwt.encode(signer, payload).decode()
+
+
+class StubSource:
+    """fetch() returns the queued responses in turn; an Exception in the queue is raised."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def fetch(self):
+        self.calls += 1
+        response = self.responses[min(self.calls, len(self.responses)) - 1]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(google_certs.time, "monotonic", lambda: now[0])
+    return now
+
+
+def wait_for(condition, seconds=5.0):
+    deadline = time.time() + seconds
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_parse_max_age():
+    assert parse_max_age("public, max-age=19845, must-revalidate, no-transform") == 19845
+    assert parse_max_age("Max-Age = 60") == 60
+    assert parse_max_age("s-maxage=30, no-cache") is None
+    assert parse_max_age("") is None
+
+
+def test_refreshes_in_the_background_near_expiry(clock):
+    source = StubSource(({"k1": PEM}, 100), ({"k2": PEM}, 100))
+    cache = GoogleCertCache(source)
+    assert cache.get() == {"k1": PEM}
+
+    clock[0] += 89
+    assert cache.get() == {"k1": PEM}
+    assert source.calls == 1
+
+    clock[0] += 2  # inside the last 10% of max-age: still served from cache, refreshed behind it
+    assert cache.get() == {"k1": PEM}
+    wait_for(lambda: cache.metrics()["fetches"] == 2)
+    assert cache.get() == {"k2": PEM}
+    assert cache.metrics()["background_refreshes"] == 1
+
+
+def test_default_max_age_without_cache_control(clock):
+    cache = GoogleCertCache(StubSource(({"k1": PEM}, None)), default_max_age=50)
+    cache.get()
+    assert cache.metrics()["expires_in"] == 50
+
+
+def test_unknown_kid_forces_a_rate_limited_refetch(clock):
+    source = StubSource(({"old": PEM}, 3600), ({"new": PEM}, 3600))
+    verifier = GoogleTokenVerifier(GoogleCertCache(source))
+    token = id_token("new")
+
+    # keys were just fetched: no second fetch yet, so the token cannot be checked
+    with pytest.raises(ValueError):
+        verifier.verify(token, AUDIENCE)
+    assert source.calls == 1
+
+    clock[0] += google_certs.CERTS_MIN_FORCED_REFRESH
+    assert verifier.verify(token, AUDIENCE)["email"] == "someone@example.com"
+    assert source.calls == 2
+
+
+def test_wrong_issuer_is_rejected(clock):
+    verifier = GoogleTokenVerifier(GoogleCertCache(StubSource(({"k1": PEM}, 3600))))
+    with pytest.raises(ValueError):
+        verifier.verify(id_token("k1", iss="https://evil.example.com"), AUDIENCE)
+
+
+def test_failed_refresh_keeps_serving_cached_keys(clock):
+    source = StubSource(({"k1": PEM}, 100), ConnectionError("key server down"))
+    cache = GoogleCertCache(source)
+    cache.get()
+
+    clock[0] += 101  # expired: refetched inline, which fails
+    assert cache.get() == {"k1": PEM}
+    metrics = cache.metrics()
+    assert metrics["failed_fetches"] == 1
+    assert "key server down" in metrics["last_error"]
+    # retried only after CERTS_RETRY_INTERVAL
+    clock[0] += google_certs.CERTS_RETRY_INTERVAL * 0.5
+    cache.get()
+    assert source.calls == 2
+
+
+def test_no_keys_at_all_raises(clock):
+    cache = GoogleCertCache(StubSource(ConnectionError("key server down")))
+    with pytest.raises(CertFetchError):
+        cache.get()
+
+
+def test_google_login_without_keys_is_503(client, monkeypatch):
+    monkeypatch.setenv("GOOGLE_CLIENT_ID", AUDIENCE)
+    unreachable = GoogleTokenVerifier(GoogleCertCache(StubSource(ConnectionError("key server down"))))
+    monkeypatch.setattr("app.routers.auth.google_tokens", unreachable)
+    response = client.post("/auth/google", json={"id_token": id_token("k1")})
+    assert response.status_code == 503
+
+
+def test_jwks_from_a_local_key_server():
+    def b64(n: int) -> str:
+        raw = n.to_bytes((n.bit_length() + 7) // 8, "big")
+        return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+    jwks = json.dumps({"keys": [{"kty": "RSA", "kid": "k1", "n": b64(PUBLIC_KEY.n), "e": b64(PUBLIC_KEY.e)}]})
+
+    class KeyServer(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Cache-Control", "public, max-age=1234")
+            self.end_headers()
+            self.wfile.write(jwks.encode())
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), KeyServer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        source = HttpCertSource(f"http://127.0.0.1:{server.server_port}/certs")
+        certs, max_age = source.fetch()
+        assert list(certs) == ["k1"] and max_age == 1234
+        verifier = GoogleTokenVerifier(GoogleCertCache(source))
+        assert verifier.verify(id_token("k1"), AUDIENCE)["aud"] == AUDIENCE
+    finally:
+        server.shutdown()
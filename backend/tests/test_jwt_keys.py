@@ -0,0 +1,78 @@
+# tests/test_jwt_keys.py
+from datetime import datetime, timedelta
+
+import pytest
+from jose import JWTError, jwt
+
+from app import models
+from app.utils import jwt_keys
+from app.utils.jwt_keys import JWTKeyring
+
+
+def test_rotated_key_still_verifies():
+    old = JWTKeyring()
+    old.load({"JWT_SECRET": "old-secret", "JWT_KEY_ID": "k1"})
+    token = old.sign({"sub": "1"})
+
+    rotated = JWTKeyring()
+    rotated.load({"JWT_SECRET": "new-secret", "JWT_KEY_ID": "k2", "JWT_VERIFY_KEYS": "k1=old-secret"})
+    assert rotated.verify(token)["sub"] == "1"
+    assert jwt.get_unverified_header(rotated.sign({"sub": "1"}))["kid"] == "k2"
+
+    # once the old key is dropped, its tokens stop working
+    rotated.load({"JWT_SECRET": "new-secret", "JWT_KEY_ID": "k2"})
+    with pytest.raises(JWTError):
+        rotated.verify(token)
+
+
+def test_unknown_kid_is_rejected():
+    keyring = JWTKeyring()
+    keyring.load({"JWT_SECRET": "secret", "JWT_KEY_ID": "k1"})
+    token = jwt.encode({"sub": "1", "exp": datetime.utcnow() + timedelta(minutes=5)}, "secret",
+                       algorithm="HS256", headers={"kid": "nope"})
+    with pytest.raises(JWTError):
+        keyring.verify(token)
+
+
+def test_token_without_exp_is_rejected():
+    keyring = JWTKeyring()
+    keyring.load({"JWT_SECRET": "secret", "JWT_KEY_ID": "k1"})
+    token = jwt.encode({"sub": "1"}, "secret", algorithm="HS256", headers={"kid": "k1"})
+    with pytest.raises(JWTError):
+        keyring.verify(token)
+    assert keyring.metrics()["cached_tokens"] == 0
+
+
+def test_verified_tokens_are_cached():
+    keyring = JWTKeyring(cache_size=2)
+    keyring.load({"JWT_SECRET": "secret"})
+    tokens = [keyring.sign({"sub": str(n)}) for n in range(3)]
+    keyring.verify(tokens[0])
+    assert keyring.verify(tokens[0])["sub"] == "0"
+    assert (keyring.metrics()["hits"], keyring.metrics()["misses"]) == (1, 1)
+
+    keyring.verify(tokens[1])
+    keyring.verify(tokens[2])  # evicts tokens[0], the least recently used
+    assert keyring.metrics()["cached_tokens"] == 2
+    keyring.verify(tokens[0])
+    assert keyring.metrics()["misses"] == 4
+
+
+def test_token_for_another_user_is_forbidden(client, db):
+    owner, other = (models.User(name=name, email=f"{name}@example.com", password="", xp=0, streak=0, badges=[])
+                    for name in ("jwt-owner", "jwt-other"))
+    db.add_all([owner, other])
+    db.commit()
+    headers = {"Authorization": f"Bearer {jwt_keys.keyring.sign({'sub': str(owner.id)})}"}
+
+    assert client.get(f"/leveling/level/{owner.id}", headers=headers).status_code == 200
+    assert client.get(f"/leveling/level/{other.id}", headers=headers).status_code == 403
+
+
+def test_calls_without_a_token_are_counted(client, db):
+    user = models.User(name="jwt-anon", email="jwt-anon@example.com", password="", xp=0, streak=0, badges=[])
+    db.add(user)
+    db.commit()
+    before = jwt_keys.keyring.metrics()["unauthenticated_calls"].get("/leveling/level/{user_id}", 0)
+    assert client.get(f"/leveling/level/{user.id}").status_code == 200
+    assert jwt_keys.keyring.metrics()["unauthenticated_calls"]["/leveling/level/{user_id}"] == before + 1
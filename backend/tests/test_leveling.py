@@ -0,0 +1,39 @@
+# tests/test_leveling.py
+from app import models
+from app.utils import jwt_keys
+
+
+def make_users(db, *names):
+    users = [models.User(name=name, email=f"{name}@example.com", password="", xp=150, streak=1, badges=[])
+             for name in names]
+    db.add_all(users)
+    db.commit()
+    return users
+
+
+def bearer(user):
+    return {"Authorization": f"Bearer {jwt_keys.keyring.sign({'sub': str(user.id)})}"}
+
+
+def test_batch_needs_a_token(client, db):
+    (user,) = make_users(db, "lv-anon")
+    assert client.post("/leveling/batch", json={"user_ids": [user.id]}).status_code == 401
+
+
+def test_batch_rejects_other_users(client, db):
+    caller, other = make_users(db, "lv-caller", "lv-other")
+    response = client.post("/leveling/batch", json={"user_ids": [caller.id, other.id]}, headers=bearer(caller))
+    assert response.status_code == 403
+
+    response = client.post("/leveling/batch", json={"user_ids": [caller.id]}, headers=bearer(caller))
+    assert response.status_code == 200
+    assert [row[0] for row in response.json()["users"]] == [caller.id]
+
+
+def test_batch_for_teachers(client, db, monkeypatch):
+    teacher, student = make_users(db, "lv-teacher", "lv-student")
+    monkeypatch.setattr(jwt_keys, "TEACHER_USER_IDS", frozenset({teacher.id}))
+    response = client.post("/leveling/batch", json={"user_ids": [student.id, 10 ** 9]}, headers=bearer(teacher))
+    assert response.status_code == 200
+    assert [row[0] for row in response.json()["users"]] == [student.id]
+    assert response.json()["missing"] == [10 ** 9]
@@ -0,0 +1,136 @@
+# tests/test_log_buffer.py
+import glob
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from app.database import SessionLocal
+from app.utils.log_buffer import QuizLogBuffer
+
+
+def row(n: int):
+    return {"user_id": n, "question_id": n, "chosen_answer": "a", "correct": 1, "response_time": 2.0,
+            "subject": "LB", "difficulty": "easy", "synced": True, "timestamp": datetime(2024, 1, 1, 0, 0, n % 60)}
+
+
+class Recorder:
+    """A writer that keeps the batches it was given; fails for rows listed in `bad`."""
+
+    def __init__(self, bad=()):
+        self.batches = []
+        self.bad = set(bad)
+
+    def __call__(self, db, rows):
+        if self.bad & {r["user_id"] for r in rows}:
+            raise ValueError("bad row")
+        self.batches.append(rows)
+
+    @property
+    def rows(self):
+        return [r["user_id"] for batch in self.batches for r in batch]
+
+
+def wait_for(condition, seconds=5.0):
+    deadline = time.monotonic() + seconds
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_leftover_spool_is_replayed_at_start(tmp_path):
+    # a crash mid-flush left a swapped-out segment, including a torn last line
+    lines = [json.dumps(QuizLogBuffer._encode(row(n))) + "\n" for n in (1, 2)]
+    (tmp_path / f"quiz_logs.{os.getpid()}.jsonl.flushing").write_text("".join(lines) + '{"user_id": 3')
+    writer = Recorder()
+    buffer = QuizLogBuffer(spool_dir=str(tmp_path), enabled=True, flush_interval=60)
+    buffer.start(SessionLocal, writer)
+    try:
+        assert writer.rows == [1, 2]
+        assert writer.batches[0][0]["timestamp"] == row(1)["timestamp"]
+        assert not glob.glob(str(tmp_path / "*.flushing"))
+    finally:
+        buffer.stop()
+
+
+def test_flushes_on_size(tmp_path):
+    writer = Recorder()
+    buffer = QuizLogBuffer(spool_dir=str(tmp_path), enabled=True, flush_rows=3, flush_interval=60)
+    buffer.start(SessionLocal, writer)
+    try:
+        buffer.submit([row(1), row(2)])
+        time.sleep(0.1)
+        assert writer.rows == []
+        buffer.submit([row(3)])
+        wait_for(lambda: writer.rows == [1, 2, 3])
+        metrics = buffer.metrics()
+        assert (metrics["submitted_rows"], metrics["flushed_rows"], metrics["flushes"]) == (3, 3, 1)
+    finally:
+        buffer.stop()
+
+
+def test_flushes_on_time(tmp_path):
+    writer = Recorder()
+    buffer = QuizLogBuffer(spool_dir=str(tmp_path), enabled=True, flush_rows=1000, flush_interval=0.05)
+    buffer.start(SessionLocal, writer)
+    try:
+        buffer.submit([row(1)])
+        wait_for(lambda: writer.rows == [1], seconds=2)
+    finally:
+        buffer.stop()
+
+
+def test_failing_batch_goes_to_dead_letter(tmp_path):
+    writer = Recorder(bad={13})
+    buffer = QuizLogBuffer(spool_dir=str(tmp_path), enabled=True, flush_rows=1, flush_interval=0.01,
+                           flush_retries=2)
+    buffer.start(SessionLocal, writer)
+    try:
+        buffer.submit([row(13)])
+        wait_for(lambda: buffer.metrics()["dead_lettered_rows"] == 1)
+        buffer.submit([row(14)])
+        wait_for(lambda: writer.rows == [14])
+    finally:
+        buffer.stop()
+    assert buffer.metrics()["failed_flushes"] == 2
+    (dead,) = glob.glob(str(tmp_path / "dead_letter.*.jsonl"))
+    assert [json.loads(line)["user_id"] for line in open(dead)] == [13]
+    assert not glob.glob(str(tmp_path / "quiz_logs.*"))
+
+
+def test_stop_gives_up_after_timeout(tmp_path):
+    release = threading.Event()
+
+    def stuck_writer(db, rows):
+        release.wait()
+
+    buffer = QuizLogBuffer(spool_dir=str(tmp_path), enabled=True, flush_rows=1, flush_interval=60)
+    buffer.start(SessionLocal, stuck_writer)
+    buffer.submit([row(1)])
+    started = time.monotonic()
+    buffer.stop(timeout=0.1)
+    assert time.monotonic() - started < 2
+    assert not buffer.active
+    # the unwritten rows are still on disk for the next start
+    assert glob.glob(str(tmp_path / "quiz_logs.*"))
+    release.set()
+
+
+def test_failing_on_commit_hook_does_not_rewrite_the_batch(tmp_path):
+    writer = Recorder()
+
+    def on_commit(rows):
+        raise RuntimeError("hook failed")
+
+    buffer = QuizLogBuffer(spool_dir=str(tmp_path), enabled=True, flush_rows=1, flush_interval=0.01)
+    buffer.start(SessionLocal, writer, on_commit=on_commit)
+    try:
+        buffer.submit([row(1)])
+        wait_for(lambda: buffer.metrics()["flushed_rows"] == 1)
+        buffer.submit([row(2)])
+        wait_for(lambda: buffer.metrics()["flushed_rows"] == 2)
+    finally:
+        buffer.stop()
+    assert writer.rows == [1, 2]
+    assert buffer.metrics()["failed_flushes"] == 0
@@ -0,0 +1,40 @@
+# tests/test_migrations.py
+from sqlalchemy import create_engine, inspect
+
+from app.database import Base, engine
+from app.migrations import migrate
+
+
+def schema(bind):
+    inspector = inspect(bind)
+    return {
+        table: (
+            sorted((column["name"], str(column["type"])) for column in inspector.get_columns(table)),
+            sorted(index["name"] for index in inspector.get_indexes(table)),
+            inspector.get_pk_constraint(table)["constrained_columns"],
+        )
+        for table in inspector.get_table_names()
+        if table != "schema_migrations"
+    }
+
+
+def test_migrations_build_the_model_schema():
+    fresh = create_engine("sqlite://")
+    Base.metadata.create_all(bind=fresh)
+    assert schema(engine) == schema(fresh)
+
+
+def test_latest_log_query_uses_the_user_id_index():
+    with engine.connect() as conn:
+        plan = " ".join(row[3] for row in conn.exec_driver_sql(
+            "EXPLAIN QUERY PLAN SELECT * FROM quiz_logs WHERE user_id = 1 ORDER BY id DESC LIMIT 1"))
+    assert "ix_quiz_logs_user_id " in plan + " "
+
+
+def test_steps_replay_their_own_definitions(tmp_path):
+    # step 11 still creates the tombstones as they first were; step 14 rekeys them
+    old = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    migrate(old, target=13)
+    assert inspect(old).get_pk_constraint("question_tombstones")["constrained_columns"] == ["question_id"]
+    migrate(old)
+    assert schema(old) == schema(engine)
@@ -0,0 +1,31 @@
+# tests/test_offline_sync.py
+from app import models
+
+
+def test_replayed_ack_returns_the_original_result(client, db):
+    user = models.User(name="sync-ack", email="sync-ack@example.com", password="", xp=0, streak=0, badges=[])
+    db.add(user)
+    db.commit()
+    db.add_all([models.QuizLog(user_id=user.id, question_id=n, chosen_answer="a", correct=1, response_time=2.0,
+                               subject="math", difficulty="easy", synced=False) for n in range(4)])
+    db.commit()
+
+    page = client.get(f"/offline/sync/{user.id}/pending", params={"limit": 2}).json()
+    first = [log["id"] for log in page["attempts"]]
+    ack = client.post(f"/offline/sync/{user.id}/ack", json={"idempotency_key": "page-1", "ids": first})
+    assert ack.json()["acknowledged"] == 2
+
+    # the device never saw the reply and retries: same answer, not "0 acknowledged"
+    replay = client.post(f"/offline/sync/{user.id}/ack", json={"idempotency_key": "page-1", "ids": first})
+    assert replay.json() == ack.json()
+
+    # a reused key is answered from the record, without touching the other rows
+    rest = client.get(f"/offline/sync/{user.id}/pending", params={"after": page["next_after"]}).json()
+    rest_ids = [log["id"] for log in rest["attempts"]]
+    reused = client.post(f"/offline/sync/{user.id}/ack", json={"idempotency_key": "page-1", "ids": rest_ids})
+    assert reused.json() == ack.json()
+    assert client.get(f"/offline/sync/{user.id}/pending").json()["remaining"] == 2
+
+    ack = client.post(f"/offline/sync/{user.id}/ack", json={"idempotency_key": "page-2", "ids": rest_ids})
+    assert ack.json()["acknowledged"] == 2
+    assert ack.json()["last_acked_id"] == max(rest_ids)
@@ -0,0 +1,80 @@
+# tests/test_question_packs.py
+import msgpack
+
+from app import models
+from app.utils.answer_key import AnswerKeyCache
+from app.utils.question_packs import QuestionPackCache
+
+
+def pack(db, subject, difficulty, since=0):
+    return msgpack.unpackb(QuestionPackCache().get(db, subject, difficulty, since).raw)
+
+
+def add_question(db, subject, difficulty, **fields):
+    question = models.Question(subject=subject, difficulty=difficulty, question_text="?",
+                               options=["a", "b"], correct_answer="a", **fields)
+    db.add(question)
+    db.commit()
+    return question
+
+
+def test_question_moved_between_packs(db):
+    question = add_question(db, "QP-move", "easy")
+    add_question(db, "QP-move", "easy")
+    easy = pack(db, "QP-move", "easy")["version"]
+    hard = pack(db, "QP-move", "hard")["version"]
+
+    question.difficulty = "hard"
+    db.commit()
+
+    delta = pack(db, "QP-move", "easy", since=easy)
+    assert delta["deleted"] == [question.id]
+    assert delta["questions"] == []
+    assert [row[0] for row in pack(db, "QP-move", "hard", since=hard)["questions"]] == [question.id]
+
+    # and back again: live in "easy" once more, gone from "hard"
+    easy = delta["version"]
+    hard = pack(db, "QP-move", "hard")["version"]
+    question.difficulty = "easy"
+    db.commit()
+
+    delta = pack(db, "QP-move", "easy", since=easy)
+    assert delta["deleted"] == []
+    assert [row[0] for row in delta["questions"]] == [question.id]
+    assert pack(db, "QP-move", "hard", since=hard)["deleted"] == [question.id]
+
+
+def test_reused_id_deleted_twice(db):
+    question = add_question(db, "QP-reuse", "easy")
+    question_id = question.id
+    since = pack(db, "QP-reuse", "easy")["version"]
+
+    db.delete(question)
+    db.commit()
+    reused = add_question(db, "QP-reuse", "easy", id=question_id)
+
+    # deleted and re-added within the range: the delta ships it as live only
+    delta = pack(db, "QP-reuse", "easy", since=since)
+    assert delta["deleted"] == []
+    assert [row[0] for row in delta["questions"]] == [question_id]
+
+    db.delete(reused)
+    db.commit()
+
+    delta = pack(db, "QP-reuse", "easy", since=delta["version"])
+    assert delta["deleted"] == [question_id]
+    assert delta["questions"] == []
+
+
+def test_deleting_the_newest_question_advances_the_bank_revision(db):
+    # the tombstone is written before the row goes, so it outranks the question's own revision
+    question = add_question(db, "QP-delete", "easy")
+    question_id = question.id
+    cache = AnswerKeyCache()
+    cache.warm(db)
+    before = AnswerKeyCache.bank_revision(db)
+
+    db.delete(question)
+    db.commit()
+    assert AnswerKeyCache.bank_revision(db) > before
+    assert cache.lookup(db, [question_id]) == {}
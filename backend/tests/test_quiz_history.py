@@ -0,0 +1,51 @@
+# tests/test_quiz_history.py
+from datetime import datetime, timedelta
+
+from app import models
+from app.database import engine
+from app.routers.quiz_history import encode_cursor, history_queries
+
+
+def query_plan(stmt) -> str:
+    compiled = stmt.compile(engine, compile_kwargs={"literal_binds": True})
+    with engine.connect() as conn:
+        return " ".join(row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}"))
+
+
+def test_deep_pages_seek_the_history_index():
+    dated, _ = history_queries(1, cursor=encode_cursor(models.QuizLog(id=500, timestamp=datetime(2024, 1, 1))))
+    [undated] = history_queries(1, cursor=encode_cursor(models.QuizLog(id=9)))
+    # a range seek on (user_id, timestamp), not a walk over every newer row of the user
+    assert "ix_quiz_logs_user_id_timestamp (user_id=? AND timestamp<?)" in query_plan(dated.limit(10))
+    assert "ix_quiz_logs_user_id_timestamp (user_id=? AND timestamp=? AND id<?)" in query_plan(undated.limit(10))
+    for stmt in (dated, undated):
+        assert "TEMP B-TREE" not in query_plan(stmt.limit(10))
+
+
+def test_pages_cover_dated_rows_then_the_undated_tail(client, db):
+    user = models.User(name="historian", email="historian@example.com", password="", xp=0, streak=0, badges=[])
+    db.add(user)
+    db.commit()
+    start = datetime(2024, 1, 1)
+    db.add_all(
+        [models.QuizLog(user_id=user.id, question_id=i, chosen_answer="a", correct=1,
+                        timestamp=start + timedelta(minutes=i // 2)) for i in range(7)]
+        + [models.QuizLog(user_id=user.id, question_id=100 + i, chosen_answer="a", correct=0) for i in range(3)]
+    )
+    db.commit()
+    db.query(models.QuizLog).filter(models.QuizLog.user_id == user.id, models.QuizLog.question_id >= 100).update(
+        {models.QuizLog.timestamp: None})
+    db.commit()
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        page = client.get(f"/history/quiz-history/{user.id}", params=params).json()
+        seen += [row["question_id"] for row in page["quiz_history"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert seen == [6, 5, 4, 3, 2, 1, 0, 102, 101, 100]
+
+    streamed = client.get(f"/history/quiz-history/{user.id}", params={"format": "ndjson"}).text.splitlines()
+    assert len(streamed) == 10
@@ -0,0 +1,56 @@
+# tests/test_quiz_submit.py
+import asyncio
+
+from app import models
+from app.routers import leaderboard, quiz
+
+
+def test_submit_runs_off_the_event_loop():
+    # grading, ORM writes and the write-behind fsync block: FastAPI must run them on the threadpool
+    assert not asyncio.iscoroutinefunction(quiz.submit_quiz)
+
+
+def test_submit_quiz(client, db):
+    user = models.User(name="submitter", email="submitter@example.com", password="", xp=0, streak=0, badges=[])
+    question = models.Question(subject="QS", difficulty="easy", question_text="1+2?",
+                               options=["3", "4"], correct_answer="3")
+    db.add_all([user, question])
+    db.commit()
+
+    response = client.post("/quiz/quiz/submit", json={
+        "user_id": user.id, "subject": "QS", "current_difficulty": "easy",
+        "answers": [{"question_id": question.id, "chosen_answer": "3", "response_time": 4}],
+    })
+    assert response.status_code == 200
+    assert response.json()["score"] == 1
+
+
+def test_leaderboard_warms_on_the_threadpool(client, monkeypatch):
+    calls = []
+
+    async def fake_run_in_threadpool(fn, *args):
+        calls.append(fn)
+        return fn(*args)
+
+    monkeypatch.setattr(leaderboard, "run_in_threadpool", fake_run_in_threadpool)
+    monkeypatch.setattr(leaderboard.leaderboard_index, "warmed", False)
+    assert client.get("/leaderboard/").status_code == 200
+    assert calls == [leaderboard.leaderboard_index.ensure_warm]
+
+
+def test_submit_offline_uses_the_quiz_xp_rule(client, db, monkeypatch):
+    user = models.User(name="offline", email="offline@example.com", password="", xp=0, streak=0, badges=[])
+    question = models.Question(subject="QO", difficulty="easy", question_text="2+2?",
+                               options=["4", "5"], correct_answer="4")
+    db.add_all([user, question])
+    db.commit()
+    monkeypatch.setattr(quiz, "calculate_quiz_xp", lambda correct, total, fast_flag_count=0: 7 * correct + total)
+
+    response = client.post("/quiz/quiz/submit-offline", json={"user_id": user.id, "quizzes": [
+        {"subject": "QO", "current_difficulty": "easy", "answers": [
+            {"question_id": question.id, "chosen_answer": "4"},
+            {"question_id": question.id, "chosen_answer": "5"},
+        ]},
+    ]})
+    assert response.status_code == 200
+    assert response.json()["total_xp_gained"] == 7 * 1 + 2
@@ -0,0 +1,86 @@
+# tests/test_response_cache.py
+from starlette.requests import Request
+
+from app import models
+from app.utils import response_cache
+from app.utils.response_cache import UserResponseCache
+
+
+def request(etag: str = None) -> Request:
+    headers = [(b"if-none-match", etag.encode())] if etag else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def cached_body(cache, user_id, endpoint):
+    return cache.lookup(request(), user_id, endpoint).response
+
+
+def test_etag_revalidation(client, db):
+    user = models.User(name="rc-etag", email="rc-etag@example.com", password="", xp=42, streak=0, badges=[])
+    db.add(user)
+    db.commit()
+
+    first = client.get(f"/leveling/level/{user.id}")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    again = client.get(f"/leveling/level/{user.id}", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+
+    # an XP change invalidates the user: new body, new ETag
+    user.xp = 500
+    db.commit()
+    response_cache.user_responses.invalidate_user(user.id)
+    changed = client.get(f"/leveling/level/{user.id}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["xp"] == 500
+    assert changed.headers["ETag"] != etag
+
+
+def test_lru_keeps_within_the_byte_budget():
+    cache = UserResponseCache(ttl=60, max_bytes=30)
+    for user_id in (1, 2, 3):
+        cache.lookup(request(), user_id, "e").store({"v": "x" * 5})  # 13 bytes each
+    assert cached_body(cache, 1, "e") is None
+    assert cached_body(cache, 2, "e") is not None
+    assert cache.metrics()["bytes"] == 26
+
+    # 2 was just used, so 3 is the one evicted next
+    cache.lookup(request(), 4, "e").store({"v": "y" * 5})
+    assert cached_body(cache, 3, "e") is None
+    assert cached_body(cache, 2, "e") is not None
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: now[0])
+    cache = UserResponseCache(ttl=10, max_bytes=1024)
+    cache.lookup(request(), 1, "e").store({"v": 1})
+    now[0] += 9
+    assert cached_body(cache, 1, "e") is not None
+    now[0] += 2
+    assert cached_body(cache, 1, "e") is None
+    assert cache.metrics()["entries"] == 0
+
+
+def test_response_computed_before_an_invalidation_is_not_stored():
+    cache = UserResponseCache(ttl=60, max_bytes=1024)
+    slot = cache.lookup(request(), 1, "e")
+    cache.invalidate([1])
+    response = slot.store({"v": "stale"})
+    assert response.status_code == 200  # still served to this caller
+    assert cached_body(cache, 1, "e") is None
+
+    cache.lookup(request(), 1, "e").store({"v": "fresh"})
+    assert cached_body(cache, 1, "e") is not None
+
+
+def test_invalidation_stamps_are_pruned(monkeypatch):
+    monkeypatch.setattr(response_cache, "INVALIDATION_SLACK", 10)
+    cache = UserResponseCache(ttl=60, max_bytes=1024)
+    slot = cache.lookup(request(), 5, "e")
+    cache.invalidate(range(1000))
+    assert cache.metrics()["invalidation_stamps"] <= 11
+    # user 5's stamp was pruned, but the floor still rejects the stale store
+    slot.store({"v": "stale"})
+    assert cached_body(cache, 5, "e") is None
@@ -0,0 +1,34 @@
+# tests/test_score_rollups.py
+import random
+import statistics
+from collections import Counter
+
+import pytest
+
+from app.utils.score_distribution import score_bin
+
+QUIZ_ID = 9200
+
+
+def attempt(user_id, score):
+    return {"user_id": user_id, "quiz_id": QUIZ_ID, "score": score,
+            "start_time": "2024-05-01T10:00:00", "end_time": "2024-05-01T10:05:00", "questions": []}
+
+
+def test_rollup_matches_a_recomputation(client):
+    rng = random.Random(14)
+    scores = [round(rng.uniform(0, 10), 2) for _ in range(40)]
+    # two batches, so the second one is folded into existing rows
+    for first, last in ((0, 25), (25, 40)):
+        response = client.post("/quiz/quiz/offline/submit", json={"attempts": [
+            attempt(9000 + n, scores[n]) for n in range(first, last)
+        ]})
+        assert response.status_code == 200
+
+    summary = client.get(f"/analytics/analytics/quiz/{QUIZ_ID}").json()
+    assert summary["total_attempts"] == len(scores)
+    assert summary["average_score"] == pytest.approx(statistics.mean(scores))
+    assert summary["stddev_score"] == pytest.approx(statistics.stdev(scores))
+    assert (summary["min_score"], summary["max_score"]) == (min(scores), max(scores))
+    counts = Counter(score_bin(score) for score in scores)
+    assert {int(b["score_from"]): b["count"] for b in summary["distribution"]} == dict(counts)
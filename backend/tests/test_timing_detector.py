@@ -0,0 +1,56 @@
+# tests/test_timing_detector.py
+import random
+
+from app import crud, models
+from app.utils.timing_detector import TimingAnomalyDetector
+
+
+def test_warm_then_observe_matches_observe_only(client, db):
+    user = models.User(name="timer", email="timer@example.com", password="", xp=0, streak=0, badges=[])
+    question = models.Question(subject="TD", difficulty="easy", question_text="slow one",
+                               options=["a", "b"], correct_answer="a")
+    db.add_all([user, question])
+    db.commit()
+
+    live = TimingAnomalyDetector()
+    rng = random.Random(7)
+    times = [rng.uniform(15, 25) for _ in range(40)]
+    live.observe_many((question.id, seconds) for seconds in times)
+    crud.log_quiz_answers(db, user.id, "TD", "easy", [
+        {"question_id": question.id, "chosen_answer": "a", "correct": True, "response_time": seconds}
+        for seconds in times
+    ])
+    # offline uploads carry no timing and must not reach the distribution
+    response = client.post("/quiz/quiz/submit-offline", json={"user_id": user.id, "quizzes": [
+        {"subject": "TD", "current_difficulty": "easy",
+         "answers": [{"question_id": question.id, "chosen_answer": "a"}] * 20},
+    ]})
+    assert response.status_code == 200
+
+    restarted = TimingAnomalyDetector()
+    restarted.warm(db)
+    assert restarted.summary(question.id) == live.summary(question.id)
+    assert restarted.observe(question.id, 18) == live.observe(question.id, 18) is False
+
+
+def test_warm_leaves_flagged_answers_out(db):
+    user = models.User(name="timer2", email="timer2@example.com", password="", xp=0, streak=0, badges=[])
+    question = models.Question(subject="TD", difficulty="easy", question_text="slow two",
+                               options=["a", "b"], correct_answer="a")
+    db.add_all([user, question])
+    db.commit()
+
+    live = TimingAnomalyDetector()
+    rng = random.Random(11)
+    times = [rng.uniform(15, 25) for _ in range(40)] + [0.5, 0.4, 0.6] + [rng.uniform(15, 25) for _ in range(10)]
+    flags = live.observe_many((question.id, seconds) for seconds in times)
+    assert sum(flags) == 3
+    crud.log_quiz_answers(db, user.id, "TD", "easy", [
+        {"question_id": question.id, "chosen_answer": "a", "correct": True, "response_time": seconds}
+        for seconds in times
+    ])
+
+    restarted = TimingAnomalyDetector()
+    restarted.warm(db)
+    assert restarted.summary(question.id) == live.summary(question.id)
+    assert restarted.observe(question.id, 0.5) == live.observe(question.id, 0.5) is True